@@ -0,0 +1,60 @@
+import fcntl
+import os
+import tempfile
+
+
+def write_atomic(path, data):
+    """Writes a text file atomically.
+
+    The data is written to a temporary file in the same directory which then replaces the file in one step,
+    so readers never see a half-written file. The permissions and owner of an existing file are kept (the CLI
+    runs as root, but the files belong to the user).
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+
+        try:
+            stat = os.stat(path)
+            os.chmod(temp_path, stat.st_mode & 0o7777)
+            if hasattr(os, "chown"):
+                try:
+                    os.chown(temp_path, stat.st_uid, stat.st_gid)
+                except PermissionError:
+                    pass
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_path, 0o666 & ~umask)
+
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class FileLock:
+    """Exclusive advisory lock (flock) on a lock file next to the file it protects, for use as a context manager.
+
+    The lock file is separate because the protected file is replaced by write_atomic, and a lock on the
+    replaced file would not be seen by other processes.
+    """
+
+    def __init__(self, path):
+        self.path = path + ".lock"
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, "a")
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+        self.file = None
@@ -0,0 +1 @@
+"""Benchmarks of the CLI hot paths on synthetic libraries. Run with 'python -m benchmarks' from the cli directory."""
@@ -0,0 +1,175 @@
+"""Times the CLI hot paths on synthetic libraries and writes the results to JSON.
+
+Usage (from the cli directory):
+    python -m benchmarks [--sizes 1000 10000 100000] [--output results.json] [--compare previous.json]
+
+Runs headless: the UI is built against the generated library and data directory, its screen output is
+discarded and no keys are read, so no terminal, keyboard hook or root is needed. Libraries are generated
+once in the work directory and reused by later runs.
+
+Timed, per library size:
+    ui_init_cold       UI.__init__ without a library index (full scan of the wallpaper directory)
+    ui_init_warm       UI.__init__ with the index from the previous run
+    update_results     one keystroke: typing queries one character at a time, then deleting them
+    get_tags           the tags of every wallpaper name (used when naming and renaming)
+    sync_history       adding the wallpaper of the config file to the history
+    favorites_add      adding a favorite (under the file lock, rewriting the file)
+    favorites_remove   removing it again
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# The CLI modules are imported as top-level modules, like the scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.library_generator import generate_library
+from change_wallpaper import UI
+from latency import LatencyHistogram
+
+SIZES = (1000, 10000, 100000)
+# Typed one character at a time, covering plain, multi-word, ranked, filtered and list searches
+QUERIES = ["rain", "neon-city", "?tokyo night", "?sunst", "forest dur>10", "recent", "favorites"]
+PERCENTS = (50, 95, 99)
+SCREEN_COLUMNS = 120
+SCREEN_LINES = 40
+# A p50 this many times the previous run's is reported as a regression by --compare
+REGRESSION_RATIO = 1.25
+
+
+def timed(histogram, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    histogram.record(time.perf_counter() - start)
+    return result
+
+
+def benchmark_library(manifest, repeat):
+    """Runs every benchmark on a generated library.
+
+    Returns:
+        dict: benchmark name -> LatencyHistogram summary.
+    """
+    histograms = {name: LatencyHistogram() for name in [
+        "ui_init_cold", "ui_init_warm", "update_results", "get_tags", "sync_history", "favorites_add", "favorites_remove",
+    ]}
+
+    def make_ui():
+        return UI("0", manifest["wallpaper_dir"], manifest["data_dir"], manifest["config_file"])
+
+    cache_dir = os.path.join(manifest["data_dir"], "cache")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(cache_dir)
+    timed(histograms["ui_init_cold"], make_ui)
+    for _ in range(repeat):
+        ui = timed(histograms["ui_init_warm"], make_ui)
+
+    for query in QUERIES:
+        for end in [*range(1, len(query) + 1), *range(len(query) - 1, -1, -1)]:
+            ui.cur_input = query[:end]
+            timed(histograms["update_results"], ui.update_results)
+
+    for _ in range(repeat):
+        timed(histograms["get_tags"], ui.get_tags)
+    for _ in range(repeat * 4):
+        timed(histograms["sync_history"], ui.sync_history)
+
+    not_favorites = [name for name in manifest["names"] if name not in ui.favorites][:repeat * 4]
+    for name in not_favorites:
+        timed(histograms["favorites_add"], ui.favorites.add, name)
+    for name in not_favorites:
+        timed(histograms["favorites_remove"], ui.favorites.remove, name)
+
+    return {name: histogram.summary(PERCENTS) for name, histogram in histograms.items()}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current, ratio=REGRESSION_RATIO):
+    """Prints the p50 of each benchmark next to the previous run's.
+
+    Returns:
+        list: (size, benchmark) of the benchmarks whose p50 grew by more than ratio.
+    """
+    regressions = []
+    for size, results in current["sizes"].items():
+        for name, summary in results.items():
+            old = previous.get("sizes", {}).get(size, {}).get(name)
+            if old is None:
+                continue
+            change = summary["p50_ms"] / old["p50_ms"] if old["p50_ms"] > 0 else 1.0
+            flag = ""
+            if change > ratio:
+                regressions.append((size, name))
+                flag = "  [REGRESSION]"
+            print(f"{size:>8} {name:<18} p50 {old['p50_ms']:>10.3f} ms -> {summary['p50_ms']:>10.3f} ms ({change:.2f}x){flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the CLI hot paths on synthetic libraries.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="library sizes (wallpaper folders)")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions of the benchmarks that don't type queries")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "komorebi-benchmarks"), help="where the libraries are generated")
+    parser.add_argument("--output", default=None, help="the results file (default: data/cache/benchmarks/<time>.json)")
+    parser.add_argument("--compare", default=None, help="a previous results file to compare with")
+    args = parser.parse_args(argv)
+
+    # The UI sizes its results window to the terminal; use the same size on every machine
+    os.environ["COLUMNS"] = str(SCREEN_COLUMNS)
+    os.environ["LINES"] = str(SCREEN_LINES)
+
+    results = {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": {},
+    }
+    for size in args.sizes:
+        print(f"[BENCHMARK] Generating a library of {size} wallpapers ...")
+        manifest = generate_library(os.path.join(args.work_dir, str(size)), size)
+        print(f"[BENCHMARK] Running on {size} wallpapers ...")
+        # The UI draws its screen and prints warnings; none of it is wanted here
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results["sizes"][str(size)] = benchmark_library(manifest, args.repeat)
+        for name, summary in results["sizes"][str(size)].items():
+            print(f"{size:>8} {name:<18} p50 {summary['p50_ms']:>10.3f} ms  p95 {summary['p95_ms']:>10.3f} ms  ({summary['count']} runs)")
+
+    output = args.output
+    if output is None:
+        output = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cache", "benchmarks",
+            time.strftime("%Y%m%d-%H%M%S") + ".json",
+        )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"[BENCHMARK] Results written to {output}")
+
+    if args.compare is not None:
+        with open(args.compare, "r") as previous_file:
+            regressions = compare(json.load(previous_file), results)
+        if regressions:
+            print(f"[BENCHMARK] {len(regressions)} benchmarks regressed by more than {REGRESSION_RATIO}x")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
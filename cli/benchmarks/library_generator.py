@@ -0,0 +1,112 @@
+"""Generates synthetic Komorebi wallpaper libraries to benchmark the CLI with.
+
+A generated library lives in one directory:
+
+    wallpapers/<name>/config       video wallpaper config (see import_pipeline.build_wallpaper_config)
+    wallpapers/<name>/video.mp4    a placeholder, not a playable video
+    data/lists/history.txt         history in the current format (name, timestamp, monitor)
+    data/lists/favorites.txt
+    data/cache/                    the library index and metadata caches of the UI
+    .Komorebi0.prop                the config of monitor 0, showing one of the wallpapers
+
+Names are a few dash-separated words from a small vocabulary plus a unique number (e.g.,
+'rain-city-night-00042'), so searching and tag detection see realistic overlap between names.
+"""
+import json
+import os
+import random
+import time
+
+from history import HistoryEntry, format_line
+from import_pipeline import build_wallpaper_config
+
+WORDS = [
+    "rain", "city", "night", "neon", "forest", "ocean", "sunset", "anime", "lofi", "space", "galaxy", "mountain",
+    "snow", "winter", "autumn", "cyberpunk", "retro", "synthwave", "tokyo", "street", "car", "train", "cat",
+    "dragon", "fire", "water", "clouds", "sky", "stars", "moon", "aurora", "desert", "beach", "waves", "storm",
+    "lightning", "fog", "lake", "river", "bridge", "tower", "temple", "garden", "flowers", "cherry", "blossom",
+    "pixel", "abstract", "minimal", "dark", "blue", "red", "purple", "green", "gold", "slowed", "reverb", "loop",
+]
+VIDEO_FILE_NAME = "video.mp4"
+PLACEHOLDER_VIDEO = b"\x00\x00\x00\x18ftypmp42" + bytes(1000)
+# Written last, so an interrupted generation is generated again
+MANIFEST_FILE_NAME = "library.json"
+
+
+def wallpaper_names(count, seed=0):
+    rng = random.Random(seed)
+    width = len(str(count))
+    return ["-".join(rng.sample(WORDS, rng.randint(2, 4)) + [str(i).zfill(width)]) for i in range(count)]
+
+
+def generate_library(path, count, history_entries=None, favorites=None, seed=0):
+    """Generates a library, or reuses the one at path if it was generated with the same arguments.
+
+    Args:
+        path (str): The directory to generate it in.
+        count (int): The number of wallpaper folders.
+        history_entries (int): Lines in the history file. Defaults to 5 per wallpaper, at most 200,000.
+        favorites (int): Favorite wallpapers. Defaults to 1 in 20.
+        seed (int): Seed of the names, history and favorites.
+
+    Returns:
+        dict: The manifest: the paths ('wallpaper_dir', 'data_dir', 'config_file'), the arguments and the
+            names of the wallpapers ('names').
+    """
+    if history_entries is None:
+        history_entries = min(count * 5, 200_000)
+    if favorites is None:
+        favorites = count // 20
+    arguments = {"count": count, "history_entries": history_entries, "favorites": favorites, "seed": seed}
+
+    manifest_path = os.path.join(path, MANIFEST_FILE_NAME)
+    try:
+        with open(manifest_path, "r") as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest["arguments"] == arguments:
+            return manifest
+    except (OSError, ValueError, KeyError):
+        pass
+
+    rng = random.Random(seed)
+    names = wallpaper_names(count, seed)
+    wallpaper_dir = os.path.join(path, "wallpapers")
+    data_dir = os.path.join(path, "data")
+    lists_dir = os.path.join(data_dir, "lists")
+    os.makedirs(wallpaper_dir, exist_ok=True)
+    os.makedirs(lists_dir, exist_ok=True)
+    os.makedirs(os.path.join(data_dir, "cache"), exist_ok=True)
+
+    config_data = build_wallpaper_config(VIDEO_FILE_NAME).to_data()
+    for name in names:
+        folder_path = os.path.join(wallpaper_dir, name)
+        os.makedirs(folder_path, exist_ok=True)
+        with open(os.path.join(folder_path, "config"), "w") as config_file:
+            config_file.write(config_data)
+        with open(os.path.join(folder_path, VIDEO_FILE_NAME), "wb") as video_file:
+            video_file.write(PLACEHOLDER_VIDEO)
+
+    # Recent use is skewed towards a small set of wallpapers, like a real history
+    regulars = rng.sample(names, min(len(names), 100))
+    start = time.time() - history_entries * 3600
+    with open(os.path.join(lists_dir, "history.txt"), "w") as history_file:
+        for i in range(history_entries):
+            name = rng.choice(regulars) if rng.random() < 0.7 else rng.choice(names)
+            history_file.write(format_line(HistoryEntry(name, start + i * 3600, str(rng.randint(0, 1)))))
+    with open(os.path.join(lists_dir, "favorites.txt"), "w") as favorites_file:
+        favorites_file.writelines(f"{name}\n" for name in rng.sample(names, min(len(names), favorites)))
+
+    config_file_path = os.path.join(path, ".Komorebi0.prop")
+    with open(config_file_path, "w") as config_file:
+        config_file.write(f"[KomorebiProperties]\nWallpaperName={names[0]}\n")
+
+    manifest = {
+        "arguments": arguments,
+        "wallpaper_dir": wallpaper_dir,
+        "data_dir": data_dir,
+        "config_file": config_file_path,
+        "names": names,
+    }
+    with open(manifest_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+    return manifest
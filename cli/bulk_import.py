@@ -0,0 +1,156 @@
+"""Imports every video in one or more directories (or glob patterns) as wallpapers, without any prompts.
+
+Usage:
+    python bulk_import.py ~/Videos/loops "/mnt/clips/*.webm" --template some_wallpaper/config --jobs 4
+
+Wallpaper names are derived from the video file names. Videos whose contents are already in the library
+are skipped.
+"""
+import argparse
+import glob
+import os
+import shutil
+
+from dedup import Deduplicator, library_video_paths
+from import_pipeline import VIDEO_FILE_EXTENSIONS, ImportPipeline, build_wallpaper_config, imported_video_file_name
+from library_index import ILLEGAL_NAME_CHARS, KOMOREBI_WALLPAPER_DIRS_PATH, LibraryIndex
+
+
+def find_videos(sources):
+    """Finds the video files in directories (not recursive) and glob patterns.
+
+    Returns:
+        list: The absolute paths of the videos, without duplicates.
+    """
+    videos = []
+    for source in sources:
+        source = os.path.expanduser(source)
+        if os.path.isdir(source):
+            with os.scandir(source) as entries:
+                paths = [entry.path for entry in entries if entry.is_file()]
+        else:
+            paths = [path for path in glob.glob(source) if os.path.isfile(path)]
+        for path in sorted(paths):
+            if os.path.splitext(path)[1].lower() in VIDEO_FILE_EXTENSIONS:
+                videos.append(os.path.abspath(path))
+    return list(dict.fromkeys(videos))
+
+
+def derive_name(video_file_path, taken):
+    """Derives a wallpaper name from a video file name that is not in `taken` and has no illegal characters."""
+    name = os.path.splitext(os.path.basename(video_file_path))[0].strip()
+    for char in ILLEGAL_NAME_CHARS:
+        name = name.replace(char, "_")
+    if name == "":
+        name = "wallpaper"
+    unique_name = name
+    number = 2
+    while unique_name in taken:
+        unique_name = f"{name}_{number}"
+        number += 1
+    return unique_name
+
+
+def bulk_import(sources, wallpaper_dirs_path=KOMOREBI_WALLPAPER_DIRS_PATH, template_path=None, jobs=None, dry_run=False):
+    """Imports every video found in the sources as a new wallpaper.
+
+    Args:
+        sources (list): Directories and/or glob patterns.
+        wallpaper_dirs_path (str): The Komorebi wallpaper directory.
+        template_path (str): A wallpaper config to copy the settings from. Defaults to the default date/time settings.
+        jobs (int): The maximum number of videos processed at the same time. Defaults to the number of CPUs.
+            The copy (or transcode) and the thumbnail of a video run at the same time, so the pool has twice
+            as many workers.
+        dry_run (bool): Only print what would be imported.
+
+    Returns:
+        dict: Lists of the imported wallpaper names ('imported'), the skipped duplicate videos ('duplicates')
+            and the wallpaper names whose import failed ('failed').
+    """
+    jobs = jobs or os.cpu_count() or 1
+    summary = {"imported": [], "duplicates": [], "failed": []}
+
+    videos = find_videos(sources)
+    if len(videos) == 0:
+        print("[WARNING] No videos found.")
+        return summary
+
+    library = LibraryIndex(wallpaper_dirs_path)
+    library.load()
+
+    # Skip videos whose contents are already in the library, or that appear twice in the sources
+    library_videos = set(library_video_paths(library))
+    duplicates = set()
+    for group in Deduplicator(max_workers=jobs).find_duplicates(sorted(library_videos) + videos):
+        # Keep the first source video of a group, unless the library already has a copy
+        keep = 0 if group[0] in library_videos else 1
+        duplicates.update(path for path in group[keep:] if path not in library_videos)
+
+    to_import = []
+    for video in videos:
+        if video in duplicates:
+            print(f"[IMPORT] Skipping '{video}', already in library")
+            summary["duplicates"].append(video)
+        else:
+            to_import.append(video)
+
+    # Plain files in the wallpaper directory aren't wallpapers, but a folder can't be created with their name
+    taken = set(library.names) | set(os.listdir(wallpaper_dirs_path))
+    names = {}
+    for video in to_import:
+        names[video] = derive_name(video, taken)
+        if names[video] != derive_name(video, ()):
+            print(f"[IMPORT] '{derive_name(video, ())}' is taken, importing '{video}' as '{names[video]}'")
+        taken.add(names[video])
+
+    if dry_run:
+        for video in to_import:
+            print(f"[IMPORT] Would import '{video}' as '{names[video]}'")
+        return summary
+
+    with ImportPipeline(max_workers=2 * jobs) as pipeline:
+        import_jobs = []
+        created = []
+        for video in to_import:
+            wp_name = names[video]
+            wallpaper_dir = os.path.join(wallpaper_dirs_path, wp_name)
+            try:
+                os.mkdir(wallpaper_dir)
+            except OSError as e:
+                # E.g., created by something else since the names were picked
+                print(f"[WARNING] Skipping '{video}', could not create '{wallpaper_dir}': {e.strerror}")
+                summary["failed"].append(wp_name)
+                continue
+            created.append(video)
+            build_wallpaper_config(imported_video_file_name(wp_name, video), template_path=template_path).save_to_file(os.path.join(wallpaper_dir, "config"))
+            import_jobs.append(pipeline.submit(wp_name, video, wallpaper_dir))
+        imported = set(pipeline.wait(import_jobs))
+
+    for video in created:
+        wp_name = names[video]
+        if wp_name in imported:
+            summary["imported"].append(wp_name)
+        else:
+            # Don't leave half-imported wallpapers in the library
+            shutil.rmtree(os.path.join(wallpaper_dirs_path, wp_name), ignore_errors=True)
+            summary["failed"].append(wp_name)
+
+    print(f"[IMPORT] Imported {len(summary['imported'])}, skipped {len(summary['duplicates'])} duplicates, {len(summary['failed'])} failed")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import every video in directories or glob patterns as Komorebi wallpapers.")
+    parser.add_argument("sources", nargs="+", help="directories or glob patterns of video files")
+    parser.add_argument("--template", help="wallpaper config file to copy the settings from")
+    parser.add_argument("--jobs", type=int, default=None, help="videos processed at the same time, each with a copy and a thumbnail step (default: number of CPUs)")
+    parser.add_argument("--wallpaper-dir", default=KOMOREBI_WALLPAPER_DIRS_PATH, help="the Komorebi wallpaper directory")
+    parser.add_argument("--dry-run", action="store_true", help="only print what would be imported")
+    args = parser.parse_args(argv)
+
+    summary = bulk_import(args.sources, args.wallpaper_dir, args.template, args.jobs, args.dry_run)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,42 +1,88 @@
 import shutil
 import os
-import keyboard
-from random import choice
-from time import sleep
+import sys
+import time
 from termcolor import colored
 from pathlib import Path
+from library_index import ILLEGAL_NAME_CHARS, KOMOREBI_WALLPAPER_DIRS_PATH, LibraryIndex, index_file_path
+from search import SearchEngine
+from renderer import ScreenRenderer, result_window
+from komorebi_config import KomorebiConfig, locate_config_file
+from control import control_socket_path, reload_wallpaper
+from launcher import KomorebiLauncher
+from watcher import LibraryWatcher
+from history import HistoryStore
+from favorites import FavoritesStore
+from terminal_input import RawTerminal
+from latency import LatencyHistogram
+from tracing import span, traced
+from media_metadata import MediaMetadata, MetadataCache, parse_filters
+from shuffle import ShuffleEngine
+from dedup import Deduplicator, library_video_paths
+from import_pipeline import DEFAULT_DATETIME, ImportPipeline, build_wallpaper_config, imported_video_file_name
 
 class UI:
-    def __init__(self):
-        self.MONITOR_INDEX = input("Enter monitor index (0 for primary, 1 for secondary, etc.): ")
+    def __init__(self, monitor_index=None, wallpaper_dirs_path=KOMOREBI_WALLPAPER_DIRS_PATH, data_dir=None, config_file_path=None):
+        """
+        Args:
+            monitor_index (str): The monitor to manage. Asked for if None.
+            wallpaper_dirs_path (str): The Komorebi wallpaper directory.
+            data_dir (str): The directory of the lists (favorites, history, ...) and caches. Defaults to ./data.
+            config_file_path (str): The Komorebi config file of the monitor. Located in the home directories if None.
+        """
+        self.MONITOR_INDEX = monitor_index if monitor_index is not None else input("Enter monitor index (0 for primary, 1 for secondary, etc.): ")
         self.__HOME_PATH = Path.home()
         self.__PROJECT_DIR = os.path.dirname(os.path.realpath(__file__))
+        self.__DATA_DIR = data_dir if data_dir is not None else os.path.join(self.__PROJECT_DIR, "data")
         # For standard install
         # self.__KOMOREBI_APP_PATH = "/System/Applications/komorebi"
         self.__KOMOREBI_APP_PATH = os.path.join("/", "home", "c_byrne", "projects", "komorebi-pruned-nmonitors", "komorebi")
-        self.__KOMOREBI_WALLPAPER_DIRS_PATH = "/System/Resources/Komorebi"
+        self.__KOMOREBI_WALLPAPER_DIRS_PATH = wallpaper_dirs_path
         self.__KOMOREBI_CONFIG_FILE_NAME = f".Komorebi{self.MONITOR_INDEX}.prop"
-        self.__KOMOREBI_CONFIG_FILE_PATH = self.locate_config_file()
-        self.__HISTORY_FILE_PATH = os.path.join(self.__PROJECT_DIR, "data", "lists", "history.txt")
+        self.__KOMOREBI_CONFIG_FILE_PATH = config_file_path if config_file_path is not None else self.locate_config_file()
+        # Cached model of the config file, so redraws don't read the file
+        self.config = KomorebiConfig(self.__KOMOREBI_CONFIG_FILE_PATH)
+        self.launcher = KomorebiLauncher(self.__KOMOREBI_APP_PATH, os.path.dirname(self.__KOMOREBI_CONFIG_FILE_PATH), self.get_cur_user())
+        self.__HISTORY_FILE_PATH = os.path.join(self.__DATA_DIR, "lists", "history.txt")
         self.__MAX_RECENT_HISTORY = 25
+        self.__MAX_SHUFFLE_HISTORY = 100
+        self.__MAX_RANKED_RESULTS = 50
         self.MOST_RECENT_WALLPAPER = ""
-        self.__FAVORITES_FILE_PATH = os.path.join(self.__PROJECT_DIR, "data", "lists", "favorites.txt")
-        self.wallpapers = os.listdir(self.__KOMOREBI_WALLPAPER_DIRS_PATH)
+        self.__FAVORITES_FILE_PATH = os.path.join(self.__DATA_DIR, "lists", "favorites.txt")
+        # Wallpaper folders are read from the on-disk library index, which is only rescanned when the wallpaper directory changes
+        self.library = LibraryIndex(self.__KOMOREBI_WALLPAPER_DIRS_PATH, index_file_path(self.__KOMOREBI_WALLPAPER_DIRS_PATH, os.path.join(self.__DATA_DIR, "cache")))
+        self.wallpapers = self.library.load()
+        self.search_engine = SearchEngine(self.wallpapers)
         self.cur_input = ""
 
         # Sync history file with most recent wallpaper used by last instance of Komorebi
         if not os.path.exists(self.__HISTORY_FILE_PATH):
             print(f"[WARNING] Could not find history file at {self.__HISTORY_FILE_PATH}. Creating new history file.")
             open(self.__HISTORY_FILE_PATH, "w").close()
+        # Only the end of the history file is read, and it is compacted when it gets too big
+        self.history = HistoryStore(self.__HISTORY_FILE_PATH)
         self.sync_history()
 
-        # Read favorites file
-        self.favorites = []
+        # Read favorites file (kept as an ordered set, changes are merged with other sessions under a file lock)
+        self.favorites = FavoritesStore(self.__FAVORITES_FILE_PATH)
         if not os.path.exists(self.__FAVORITES_FILE_PATH):
             print(f"[WARNING] Could not find favorites file at {self.__FAVORITES_FILE_PATH}. Creating new favorites file.")
             open(self.__FAVORITES_FILE_PATH, "w").close()
         self.read_favorites()
 
+        # Ranked search prefers recently used and favorite wallpapers
+        self.search_engine.set_boosts(self.read_recent_history(), self.favorites)
+
+        # TAB picks with this: favorites are more likely and recently used wallpapers are not repeated
+        self.shuffle = ShuffleEngine(self.wallpapers, self.get_favorites(), self.history.recent(self.__MAX_SHUFFLE_HISTORY))
+
+        # Media metadata of the videos, only read once a search uses a media filter (see media)
+        self._media = None
+        self.__MEDIA_PROBE_WORKERS = 2
+
+        # Keeps the wallpaper list, search index and favorites up to date with changes made by any program
+        self.watcher = LibraryWatcher(self.__KOMOREBI_WALLPAPER_DIRS_PATH, [self.__FAVORITES_FILE_PATH, self.__HISTORY_FILE_PATH])
+
         self.instructions = "\n".join([
             "Start typing to search for wallpapers",
             f"{colored('ENTER', 'blue'):<25}{'Select first item in results':<35}",
@@ -46,62 +92,33 @@ class UI:
             "",
             f"{colored('recent', 'cyan'):<25}{'Show recently used':<35}",
             f"{colored('favorites', 'cyan'):<25}{'Show favorites':<35}",
+            f"{colored('?query', 'cyan'):<25}{'Ranked fuzzy/tag search':<35}",
+            f"{colored('res<=1080', 'cyan'):<25}{'Filter by video (res, fps, codec, dur, size, ...)':<35}",
             f"{colored('edit', 'magenta'):<25}{'Enter edit mode (editing current wallpaper)':<35}",
             "",
             "Pressing ENTER or TAB on an empty list selects from all",
             ""
         ])
         self.prompt_char = "> "
-        self.shift_pressed = False
-        self.ignore_keys = ["alt", "ctrl", "esc", "cmd", "left", "right", "caps lock", "page up", "page down", "home", "end", "insert", "f1", "f2", "f3", "f4", "f5", "f6", "f7", "f8", "f10", "f11", "f12", "f13", "f14", "f15", "f16", "f17", "f18", "f19"]
-        self.shift_variants = {
-            "1": "!",
-            "2": "@",
-            "3": "#",
-            "4": "$",
-            "5": "%",
-            "6": "^",
-            "7": "&",
-            "8": "*",
-            "9": "(",
-            "0": ")",
-            "-": "_",
-            "−": "_",
-            "=": "+",
-            "[": "{",
-            "]": "}",
-            "\\": "|",
-            ";": ":",
-            "'": "\"",
-            ",": "<",
-            ".": ">",
-            "/": "?"
-        }
-        self.datetime = {
-            "Visible": False,
-            "Parallax": False,
-            "MarginTop": 0,
-            "MarginRight": 0,
-            "MarginLeft": 0,
-            "MarginBottom": 0,
-            "RotationX": 0,
-            "RotationY": 0,
-            "RotationZ": 0,
-            "Position": "center",
-            "Alignment": "center",
-            "AlwaysOnTop": True,
-            "Color": "#dd22dd22dd22",
-            "Alpha": 255,
-            "ShadowColor": "#dd22dd22dd22",
-            "ShadowAlpha": 255,
-            "TimeFont": "Lato Light 30",
-            "DateFont": "Lato Light 20"
-        }
+        self.datetime = dict(DEFAULT_DATETIME)
         
         # To allow for quick random selection - On init, the search results will be all wallpapers (although none will be shown)
         self.cur_results = self.wallpapers
         self.cur_result_index = 0
 
+        # Only the lines that changed are redrawn on each key press
+        self.renderer = ScreenRenderer()
+        # The terminal keys are read from, set while the UI is running (see start)
+        self.terminal = None
+        # Whether the last search was cancelled, so the results are older than the input
+        self.search_pending = False
+        # Keys arriving within this many seconds of each other are handled as one batch
+        self.__SEARCH_DEBOUNCE = 0.008
+        # Time from reading a batch of keys to drawing its results
+        self.latency = LatencyHistogram()
+        # Whether the last redraw waited for input in edit mode, which isn't latency
+        self.waited_for_input = False
+
         self.print_prompt_and_cur_input()
 
     # ----------------------------
@@ -111,7 +128,7 @@ class UI:
         print("What should the wallpaper be called?")
         print("ENTER nothing to default to the video file name")
         print(self.prompt_char, end="", flush=True)
-        wp_name = self.input_shift_buffer("edit").strip()
+        wp_name = input().strip()
 
         # Get path from user
         self.clear()
@@ -124,28 +141,46 @@ class UI:
         # replace aliases with full path
         video_file_path = os.path.abspath(video_file_path)
 
+        # Warn if the library already has a wallpaper with the same video
+        with span("create.find_duplicates"):
+            copies = [group for group in Deduplicator().find_duplicates([video_file_path] + library_video_paths(self.library)) if video_file_path in group]
+        if copies:
+            existing = [os.path.basename(os.path.dirname(path)) for path in copies[0] if path != video_file_path]
+            self.clear()
+            print(f"The video is already used by '{colored(', '.join(existing), 'green')}'. Import anyway? (y/n)")
+            print(self.prompt_char, end="", flush=True)
+            if input().lower() != "y":
+                return
+
         # Update wallpaper name with the video file path if the name was not specified
         if wp_name == "":
-            wp_name = os.path.basename(self.video_file_path).split(".")[0]
+            wp_name = os.path.basename(video_file_path).split(".")[0]
         
         # Create the wallpaper folder    
         os.mkdir(f"{self.__KOMOREBI_WALLPAPER_DIRS_PATH}/{wp_name}")
 
-        # Generate the datetime config
-        self.generate_datetime_config()
+        with ImportPipeline() as pipeline:
+            # Copy (or convert to mp4) and create the thumbnail in the background while the datetime config is asked for
+            job = pipeline.submit(wp_name, video_file_path, f"{self.__KOMOREBI_WALLPAPER_DIRS_PATH}/{wp_name}")
 
-        # Create the new wallpaper folders's config file
-        self.create_wp_config(wp_name, video_file_path)
+            # Generate the datetime config
+            self.generate_datetime_config()
 
-        # copy the video file to the wp_folder
-        shutil.copy(video_file_path, f"{self.__KOMOREBI_WALLPAPER_DIRS_PATH}/{wp_name}")
+            # Create the new wallpaper folders's config file, pointing to the video file as it will be named in the folder
+            with span("create.write_config"):
+                self.create_wp_config(wp_name, imported_video_file_name(wp_name, video_file_path))
 
-        # convert to mp4 if necessary
-        if video_file_path.split(".")[-1] != "mp4":
-            os.system(f"ffmpeg -i '{video_file_path}' '{self.__KOMOREBI_WALLPAPER_DIRS_PATH}/{wp_name}/{wp_name}.mp4'")
-
-        # create thumbnail from 2 seconds into video using ffmpeg
-        os.system(f"ffmpeg -i '{video_file_path}' -ss 00:00:02.000 -vframes 1 {self.__KOMOREBI_WALLPAPER_DIRS_PATH}/{wp_name}/wallpaper.jpg")
+            self.clear()
+            print(f"Importing '{colored(wp_name, 'green')}' ...")
+            # Only the part of the import that is still running after the questions were answered
+            with span("create.wait_for_import"):
+                imported = pipeline.wait([job])
+
+        if wp_name not in imported:
+            # Don't leave the half-made folder (and its config) behind, the library would see it as a wallpaper
+            shutil.rmtree(f"{self.__KOMOREBI_WALLPAPER_DIRS_PATH}/{wp_name}", ignore_errors=True)
+            print(f"[ERROR] Could not import '{wp_name}'. Check that ffmpeg is installed and the video file is valid.")
+            return
 
         # refresh with new wallpaper
         self.refresh_with_new(wp_name)
@@ -180,38 +215,15 @@ class UI:
 
         """
 
-        # create file called config in the wp_folder
-        config_file = open(f"{self.__KOMOREBI_WALLPAPER_DIRS_PATH}/{wp_name}/config", "w")
-
-        # write the config file based on the template, replacing the values with the user's choices
-        config_file.write("[Info]\n")
-        config_file.write(f"WallpaperType=video\n")
-        config_file.write(f"VideoFileName={os.path.basename(video_file_path)}\n\n")
-        config_file.write("[DateTime]\n")
-        config_file.write(f"Visible={str(self.datetime['Visible']).lower()}\n")
-        config_file.write(f"Parallax={str(self.datetime['Parallax']).lower()}\n")
-        config_file.write(f"MarginTop={self.datetime['MarginTop']}\n")
-        config_file.write(f"MarginRight={self.datetime['MarginRight']}\n")
-        config_file.write(f"MarginLeft={self.datetime['MarginLeft']}\n")
-        config_file.write(f"MarginBottom={self.datetime['MarginBottom']}\n")
-        config_file.write(f"RotationX={self.datetime['RotationX']}\n")
-        config_file.write(f"RotationY={self.datetime['RotationY']}\n")
-        config_file.write(f"RotationZ={self.datetime['RotationZ']}\n")
-        config_file.write(f"Position={self.datetime['Position']}\n")
-        config_file.write(f"Alignment={self.datetime['Alignment']}\n")
-        config_file.write(f"AlwaysOnTop={str(self.datetime['AlwaysOnTop']).lower()}\n")
-        config_file.write(f"Color={self.datetime['Color']}\n")
-        config_file.write(f"Alpha={self.datetime['Alpha']}\n")
-        config_file.write(f"ShadowColor={self.datetime['ShadowColor']}\n")
-        config_file.write(f"ShadowAlpha={self.datetime['ShadowAlpha']}\n")
-        config_file.write(f"TimeFont={self.datetime['TimeFont']}\n")
-        config_file.write(f"DateFont={self.datetime['DateFont']}\n")
-
-        config_file.close()
+        # Build the config file based on the template, replacing the values with the user's choices
+        config = build_wallpaper_config(os.path.basename(video_file_path), self.datetime)
+
+        # Write the config file called config in the wp_folder in one go
+        config.save_to_file(f"{self.__KOMOREBI_WALLPAPER_DIRS_PATH}/{wp_name}/config")
 
     def _input(self):
         print(self.prompt_char, end="", flush=True) 
-        ret = self.input_shift_buffer("edit")
+        ret = input()
         return ret
     
     def generate_datetime_config(self):
@@ -356,12 +368,25 @@ class UI:
         Returns:
             str: The name of the currently active wallpaper. If no wallpaper is active, returns an empty string.
         """
-        with open(self.__KOMOREBI_CONFIG_FILE_PATH, "r") as config_file:
-            config_file_lines = config_file.readlines()
-        for line in config_file_lines:
-            if "WallpaperName=" in line:
-                return line.split("=")[1].strip()
-        return ""
+        return self.config.get_wallpaper_name()
+
+    @property
+    def media(self):
+        """Duration, resolution, codec, ... of the videos, for filters like 'res<=1080 codec=h264'.
+
+        Made when a search first uses a media filter, so starting the UI doesn't stat and probe the whole library.
+        The cached values are loaded then; the rest is probed in the background by a couple of ffprobe processes,
+        so the probing doesn't take the CPU from Komorebi and the search.
+        """
+        if self._media is None:
+            self._media = MediaMetadata(
+                self.library,
+                MetadataCache(os.path.join(self.__DATA_DIR, "cache", "media_metadata.sqlite")),
+                max_workers=self.__MEDIA_PROBE_WORKERS,
+            )
+            self._media.load()
+            self._media.start()
+        return self._media
 
     def locate_config_file(self):
         """Locates the Komorebi config file.
@@ -369,75 +394,31 @@ class UI:
         Returns:
             str: The path to the Komorebi config file.
         """
-        
-        # Get system users
-        users = []
-        if os.name == "nt":
-            # Windows
-            import winreg
-            reg = winreg.ConnectRegistry(None, winreg.HKEY_LOCAL_MACHINE)
-            reg_key = winreg.OpenKey(reg, r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\ProfileList")
-            for i in range(1024):
-                try:
-                    users.append(winreg.EnumKey(reg_key, i))
-                except:
-                    break
-        else:
-            # Linux
-            users = [f.name for f in os.scandir("/home") if f.is_dir()]
-        
-        for user in users:
-            if os.name == "nt":
-                # Windows
-                home_dir = os.path.join("C:\\", "Users", user)
-            else:
-                # Linux
-                home_dir = os.path.join("/home", user)
-            
-            # Check for default location before declaring other possible locations
-            default_location = os.path.join(home_dir, self.__KOMOREBI_CONFIG_FILE_NAME)
-            if os.path.exists(default_location):
-                return default_location
-        
-            other_possible_locations = [
-                [home_dir, ".config", "Komorebi", self.__KOMOREBI_CONFIG_FILE_NAME],
-                [home_dir, ".local", "share", "Komorebi", self.__KOMOREBI_CONFIG_FILE_NAME],
-                [home_dir, ".Komorebi", self.__KOMOREBI_CONFIG_FILE_NAME],
-                [home_dir, ".config", self.__KOMOREBI_CONFIG_FILE_NAME],
-                ["/", self.__KOMOREBI_CONFIG_FILE_NAME],
-            ]
-
-            # Add Windows-specific locations
-            if os.name == "nt":
-                other_possible_locations += [
-                    [home_dir, "AppData", "Local", "Komorebi", self.__KOMOREBI_CONFIG_FILE_NAME],
-                    [home_dir, "AppData", "Roaming", "Komorebi", self.__KOMOREBI_CONFIG_FILE_NAME],
-                    [home_dir, "AppData", "Local", self.__KOMOREBI_CONFIG_FILE_NAME],
-                ]
-
-            for location in other_possible_locations:
-                if os.path.exists(os.path.join(*location)):
-                    return os.path.join(*location)
-                
-        
-        # No config found
-        default_location = os.path.join(self.__HOME_PATH, self.__KOMOREBI_CONFIG_FILE_NAME)
-        print(f"[WARNING] Could not find a Komorebi config file. Using default location {default_location}.")
-        print(f"[WARNING] Make sure config file is named '.Komorebi$I.prop' where $I is the monitor index (e.g., '.Komorebi0")
-        print(f"[WARNING] Note that this is the config for the application, not the config for a wallpaper (which is named 'config' and is located in each wallpaper folder)")
-        return default_location
+        return locate_config_file(self.__KOMOREBI_CONFIG_FILE_NAME, self.__HOME_PATH)
 
     def read_favorites(self):
-        with open(self.__FAVORITES_FILE_PATH, "r") as favorites_file:
-            favorites = favorites_file.readlines()
-        
+        self.favorites.load()
+
         # Ensure each line corresponds to a wallpaper that exists
-        for favorite in favorites:
-            favorite = favorite.strip("\n")
-            if favorite not in self.wallpapers:
+        for favorite in self.favorites:
+            if favorite not in self.library:
                 print(f"[WARNING] Favorite '{favorite}' in favorites file {self.__FAVORITES_FILE_PATH} does not exist in {self.__KOMOREBI_WALLPAPER_DIRS_PATH}. Consider updating favorites file.")
-            else:
-                self.favorites.append(favorite)
+
+    def get_favorites(self):
+        """Gets the favorites that exist in the library.
+
+        Returns:
+            list: The favorite wallpapers, in the order they were added.
+        """
+        return [favorite for favorite in self.favorites if favorite in self.library]
+
+    def read_recent_history(self):
+        """Reads the most recently used wallpapers from the history file.
+
+        Returns:
+            list: Up to the max number of recent wallpapers, most recent first, each only once.
+        """
+        return self.history.recent(self.__MAX_RECENT_HISTORY)
 
     def sync_history(self):
         """Adds the most recent wallpaper used by the last instance of Komorebi to the history file.
@@ -452,13 +433,7 @@ class UI:
             return
         
         # Check the current wallpaper in the config file (most recent wallpaper used by the last instance of Komorebi)
-        with open(self.__KOMOREBI_CONFIG_FILE_PATH, "r") as config_file:
-            config_file_lines = config_file.readlines()
-        wallpaper = ""
-        for line in config_file_lines:
-            if "WallpaperName=" in line:
-                wallpaper = line.split("=")[1].strip()
-                break
+        wallpaper = self.config.get_wallpaper_name()
 
         # If somehow the wallpaper name can't be found, abort and don't update history
         if wallpaper == "":
@@ -466,21 +441,13 @@ class UI:
             return
         
         # If the current wallpaper is not already the most recent item in the history file, add it
-        with open(self.__HISTORY_FILE_PATH, "r") as history_file:
-            history_file_lines = history_file.readlines()
-            # Get most recent non-empty line
-            most_recent_line = ""
-            while most_recent_line == "" or most_recent_line == "\n":
-                # Ensure lines are not empty
-                if len(history_file_lines) == 0:
-                    break
-                most_recent_line = history_file_lines.pop().strip("\n").strip()  
-
-            if most_recent_line == "":
-                print("[WARNING] History file is empty.")
+        most_recent = self.history.last()
+        most_recent_line = "" if most_recent is None else most_recent.name
+        if most_recent_line == "":
+            print("[WARNING] History file is empty.")
 
         # Update most recent wallpaper variable
-        if wallpaper in self.wallpapers:
+        if wallpaper in self.library:
             self.MOST_RECENT_WALLPAPER = wallpaper 
 
         # If (1) the most recent wallpaper is not already the most recent wallpaper in the history file, or
@@ -489,9 +456,8 @@ class UI:
         if wallpaper != most_recent_line or most_recent_line == "":
 
             # Only add if wallpaper is in the list of wallpapers (in case the wallpaper has been deleted since last time running Komorebi)
-            if wallpaper in self.wallpapers:
-                with open(self.__HISTORY_FILE_PATH, "a") as history_file:
-                    history_file.write(wallpaper + "\n")
+            if wallpaper in self.library:
+                self.history.append(wallpaper, self.MONITOR_INDEX)
             else:
                 print(f"[WARNING] Attempted to update history but the most recent wallpaper used by Komorebi ('{wallpaper}') is no longer in {self.__KOMOREBI_WALLPAPER_DIRS_PATH}. It may have been deleted since last time running Komorebi.")
 
@@ -500,35 +466,10 @@ class UI:
         print(colored_text)
 
     def clear(self):
-        os.system("clear")
-
-    def get_shift_variant(self, key):
-        # if a letter, return uppercase
-        if key.isalpha():
-            return key.upper()
-        # if a number or symbol, return the shifted variant
-        elif key in self.shift_variants:
-            return self.shift_variants[key]
-        # if not a letter, number, or symbol, return the key
-        else:
-            return key
-        
-    def set_wallpaper(self, wallpaper):
-        config_file = open(self.__KOMOREBI_CONFIG_FILE_PATH, "r")
-        config_file_lines = config_file.readlines()
-        config_file.close()
-
-        new_lines = []
-        for line in config_file_lines:
-            if "WallpaperName=" in line:
-                new_lines.append(f"WallpaperName={wallpaper}\n")
-            else:
-                new_lines.append(line)
+        self.renderer.clear()
 
-        config_file = open(self.__KOMOREBI_CONFIG_FILE_PATH, "w")
-        for line in new_lines:
-            config_file.write(line)    
-        config_file.close()
+    def set_wallpaper(self, wallpaper):
+        self.config.set_wallpaper_name(wallpaper)
 
     def get_cur_user(self):
         if os.name == "nt":
@@ -536,82 +477,184 @@ class UI:
         else:
             return self.__PROJECT_DIR.split("/")[2]
 
-    def update_results(self):
-        self.clear()
+    def apply_library_changes(self):
+        """Applies the changes the watcher saw in the wallpaper directory and the list files since the last call."""
+        events = self.watcher.drain()
+        if len(events) == 0:
+            return
+
+        changed = set()
+        for event in events:
+            if event.kind == "added":
+                if self.library.add(event.name) is not None:
+                    self.search_engine.add(event.name)
+                    self.shuffle.add(event.name)
+                    if self._media is not None:
+                        self._media.add(event.name)
+            elif event.kind == "changed":
+                changed.add(event.name)
+            elif event.kind == "removed":
+                self.library.remove(event.name)
+                self.search_engine.remove(event.name)
+                self.shuffle.remove(event.name)
+                if self._media is not None:
+                    self._media.remove(event.name)
+            elif event.kind == "renamed":
+                self.library.rename(event.name, event.new_name)
+                self.search_engine.rename(event.name, event.new_name)
+                self.shuffle.rename(event.name, event.new_name)
+                if self._media is not None:
+                    self._media.rename(event.name, event.new_name)
+            elif event.kind == "list_changed" and event.name == self.__FAVORITES_FILE_PATH:
+                self.read_favorites()
+                self.shuffle.set_favorites(self.get_favorites())
+            elif event.kind == "list_changed" and event.name == self.__HISTORY_FILE_PATH:
+                self.history.reload()
+            elif event.kind == "rescan":
+                # The watcher missed changes, so the whole library has to be read again
+                self.wallpapers = self.library.load()
+                self.search_engine = SearchEngine(self.wallpapers)
+                self.shuffle = ShuffleEngine(self.wallpapers, self.get_favorites(), self.history.recent(self.__MAX_SHUFFLE_HISTORY))
+                if self._media is not None:
+                    self._media.start()
+
+        # New folders are read as soon as they are created, before their config and video are written
+        changed = [name for name in changed if name in self.library]
+        if changed:
+            self.library.update(changed)
+            if self._media is not None:
+                self._media.start(changed)
+
+        self.search_engine.set_boosts(self.read_recent_history(), self.favorites)
+
+    @traced("update_results")
+    def update_results(self, cancellable=False):
+        """Searches for the current input and redraws the screen.
+
+        Args:
+            cancellable (bool): Give up the search (and the redraw) as soon as more keys are waiting, since their
+                search replaces this one. Set when nothing depends on the results being current.
+
+        Returns:
+            bool: False if the search was cancelled.
+        """
+        with span("apply_library_changes"):
+            self.apply_library_changes()
         self.cur_results = []
+        header = None
 
-        # If cur input is 'edit', exit normal mode and enter edit mode
+        # If cur input is 'edit', leave normal mode for edit mode, then come back to an empty search
         if self.cur_input.lower() == "edit":
-            keyboard.unhook_all() 
+            self.cur_input = ""
+            self.clear()
+            # Edit mode reads whole lines with input() (headless, e.g. in the benchmarks, there is no terminal)
+            if self.terminal is not None:
+                self.terminal.restore()
             try:
                 self.edit_mode()
+                input("\nPress ENTER to return to the search")
             except KeyboardInterrupt:
                 # Stop listening for key events
                 exit("\nProgram stopped.")
-
-            exit()
+            if self.terminal is not None:
+                self.terminal.start()
+            self.clear()
+            self.renderer.invalidate()
+            self.waited_for_input = True
 
         # If current input is "recent", cur_results is history file items
-        elif self.cur_input.lower() == "recent":
-            print("Recent wallpapers:")
-            with open(self.__HISTORY_FILE_PATH, "r") as history_file:
-                history_file_lines = history_file.readlines()
-                history_file_lines.reverse()
-
-                for item in history_file_lines:
-                    # Don't display more than the max number of recent items
-                    if len(self.cur_results) >= self.__MAX_RECENT_HISTORY:
-                        break
-                    
-                    # Don't add empty lines
-                    if item.strip("\n") != "":
-                        self.cur_results.append(item.strip("\n"))
-                    
+        if self.cur_input.lower() == "recent":
+            header = "Recent wallpapers:"
+            self.cur_results = self.read_recent_history()
 
         # If current input is "favorites", cur_results is favorites file items
         elif self.cur_input.lower() == "favorites":
-            print("Favorite wallpapers:")
-            for item in self.favorites:
-                self.cur_results.append(item)
+            header = "Favorite wallpapers:"
+            self.cur_results = self.get_favorites()
+
+        # If current input starts with "?", cur_results is the best ranked search results
+        elif self.cur_input.startswith("?"):
+            with span("search.ranked"):
+                query, filters = parse_filters(self.cur_input[1:])
+                if filters and query.strip() == "":
+                    # Only filters: rank nothing, filter the whole library
+                    results = self.search_engine.search("")
+                else:
+                    # Filters drop results, so rank everything and keep the best that pass
+                    results = self.search_engine.ranked_search(query, len(self.wallpapers) if filters else self.__MAX_RANKED_RESULTS)
+                self.cur_results = (self.media.filter(results, filters) if filters else results)[:self.__MAX_RANKED_RESULTS]
 
-        # If normal search, cur_results if search results
+        # If normal search, cur_results if search results (only the ones matching the media filters, if any)
         else:
-            for wallpaper in self.wallpapers:
-                if self.cur_input.lower() in wallpaper.lower():
-                    self.cur_results.append(wallpaper)
-        
-        self.print_results()
-        print()
-        self.print_prompt_and_cur_input()
-    
-    def print_results(self):
+            with span("search"):
+                query, filters = parse_filters(self.cur_input)
+                results = self.search_engine.search(query, self.terminal.has_input if cancellable else None)
+                if results is None:
+                    self.search_pending = True
+                    return False
+                self.cur_results = self.media.filter(results, filters) if filters else results
+        self.search_pending = False
+
+        with span("render"):
+            prompt_lines = self.get_prompt_lines()
+            lines = [] if header is None else [header]
+            # Results get whatever space is left on the screen after the header, a blank line and the prompt
+            columns, rows = self.renderer.size()
+            lines += self.get_result_lines(rows - len(lines) - len(prompt_lines) - 1, columns)
+            lines.append("")
+            lines += prompt_lines
+            self.renderer.render(lines)
+        return True
+
+    def get_result_lines(self, height, width):
+        """Gets the lines of the results window, which shows as many results around the highlighted result as fit on screen.
+
+        Args:
+            height (int): The maximum number of lines.
+            width (int): The width of the terminal. Longer names are cut off so they do not wrap.
+
+        Returns:
+            list: The lines to display.
+        """
         # Ensure that the current result index is within the bounds of the current results
         if self.cur_result_index >= len(self.cur_results):
             self.cur_result_index = 0
-        
-        # If no results, print message
+
+        # If no results, show message
         if len(self.cur_results) == 0:
-            print("No wallpaper folder found that starts with that input.")
-            return
-        
-        # Segment the results into 3 parts (before, current selected line, after)
-        if self.cur_result_index == 0:
-            self.print_highlighted(self.cur_results[self.cur_result_index])
-            print("\n".join(self.cur_results[self.cur_result_index + 1:]))
-        else:
-            print("\n".join(self.cur_results[:self.cur_result_index]))
-            self.print_highlighted(self.cur_results[self.cur_result_index])
-            if self.cur_result_index != len(self.cur_results) - 1:
-                print("\n".join(self.cur_results[self.cur_result_index + 1:]))
-    
+            return ["No wallpaper folder found that starts with that input."]
+
+        start, end = result_window(len(self.cur_results), self.cur_result_index, max(height, 1))
+        lines = []
+        for index in range(start, end):
+            wallpaper = self.cur_results[index][:width - 1]
+            if index == self.cur_result_index:
+                lines.append(colored(wallpaper, 'red', 'on_black'))
+            else:
+                lines.append(wallpaper)
+        return lines
+
+    @traced("refresh_with_new")
     def refresh_with_new(self, wallpaper):
         print(f"[REFRESH] Setting wallpaper to '{colored(wallpaper, 'green')}' ...")
-        print("[REFRESH] Killing any active Komorebi processes ...")
-        self.kill_komorebi()
         print("[REFRESH] Updating Config")
-        self.set_wallpaper(wallpaper)
-        print("[REFRESH] Starting Komorebi ...")
-        self.start_komorebi()
+        with span("refresh.set_wallpaper"):
+            self.set_wallpaper(wallpaper)
+        with span("refresh.history"):
+            self.history.append(wallpaper, self.MONITOR_INDEX)
+            self.shuffle.record(wallpaper)
+        print("[REFRESH] Reloading Komorebi ...")
+        with span("refresh.reload_komorebi"):
+            reloaded = self.reload_komorebi()
+        if not reloaded:
+            # Fall back to restarting every instance if this monitor's instance isn't running (or is too old to have a control socket)
+            print("[REFRESH] Komorebi did not respond. Killing any active Komorebi processes ...")
+            with span("refresh.kill_komorebi"):
+                self.kill_komorebi()
+            print("[REFRESH] Starting Komorebi ...")
+            with span("refresh.start_komorebi"):
+                self.start_komorebi()
+        self.renderer.invalidate()
         self.update_results()
 
     def select_from_results(self, index):
@@ -624,6 +667,8 @@ class UI:
             str: The name of the selected wallpaper.
         """
 
+        # Printing directly means the renderer has to redraw the whole screen next time
+        self.renderer.invalidate()
         print(f"Selecting {'random' if index == -1 else 'highlighted'} wallpaper from current results ...")
         # Ensure that there are results to select from
         if len(self.cur_results) == 0:
@@ -632,13 +677,14 @@ class UI:
             return False
     
         if index == -1:
-            wallpaper = choice(self.cur_results)
+            # An empty input means all wallpapers, which the shuffle picks from without looking at every result
+            wallpaper = self.shuffle.pick(None if self.cur_input == "" else self.cur_results)
         else:
             try:
                 wallpaper = self.cur_results[index]
             except IndexError:
                 print(f"[WARNING] Index {index} is out of bounds of current results.\n[WARNING] Selecting random wallpaper from current results ...")
-                wallpaper = choice(self.cur_results)
+                wallpaper = self.shuffle.pick(self.cur_results)
 
         return wallpaper
 
@@ -666,13 +712,13 @@ class UI:
         valid_inputs = ["rename", "fav", "unfav", "delete", "pcurrent", "create-new", "mark"]
 
         print(self.prompt_char, end="", flush=True)
-        edit_input = self.input_shift_buffer("edit").lower()
+        edit_input = input().lower()
 
         while edit_input not in valid_inputs:
             print(f"Invalid input '{edit_input}'")
             print(f"Valid inputs are: {', '.join(valid_inputs)}")
             print(self.prompt_char, end="", flush=True)
-            edit_input = self.input_shift_buffer("edit").lower()
+            edit_input = input().lower()
 
         if edit_input == "rename":
             self.rename_wallpaper(self.get_active_wallpaper())
@@ -691,18 +737,17 @@ class UI:
 
     def queue_edit(self, wallpaper):
         # Add to file if it's not already in there
-        with open(os.path.join(self.__PROJECT_DIR, "data", "lists", "to-edit.txt"), "r") as to_edit_file:
+        with open(os.path.join(self.__DATA_DIR, "lists", "to-edit.txt"), "r") as to_edit_file:
             to_edit_file_lines = [line.strip("\n") for line in to_edit_file.readlines()]
             if wallpaper in to_edit_file_lines:
                 print(f"[WARNING] Wallpaper '{wallpaper}' is already in to-edit.txt")
                 print(f"[WARNING] Aborting add to to-edit.txt")
                 return
             
-        with open(os.path.join(self.__PROJECT_DIR, "data", "lists", "to-edit.txt"), "a") as to_edit_file:
+        with open(os.path.join(self.__DATA_DIR, "lists", "to-edit.txt"), "a") as to_edit_file:
             to_edit_file.write(wallpaper + "\n")
 
         print(f"Added '{colored(wallpaper, 'green')}' to to-edit.txt")
-        exit()
 
     def delete_wallpaper(self, wallpaper):
         self.clear()
@@ -711,79 +756,64 @@ class UI:
         print("Delete the wallpaper listed above? (y/n)")
 
         print(self.prompt_char, end="", flush=True)
-        delete_input = self.input_shift_buffer("edit").lower()
+        delete_input = input().lower()
 
         if delete_input == "y":
             print("Are you sure you want to delete this wallpaper? (y/n)")
-            confirmation_input = self.input_shift_buffer("edit").lower()
+            confirmation_input = input().lower()
             if confirmation_input != "y":
                 print("Aborting delete")
                 return
             else:
-                self.ask_for_backup(wallpaper)
+                if not self.ask_for_backup(wallpaper):
+                    print("Aborting delete")
+                    return
                 print(f"Deleting '{colored(wallpaper, 'green')}' ...")
 
                 self.kill_komorebi()
                 # If the wallpaper was in favorites, remove it from favorites and update favorites file
-                if wallpaper in self.favorites:
-                    self.remove_from_favorites(wallpaper)
+                self.favorites.remove(wallpaper)
 
                 # Set new replacement wallpaper as random from favorites
                 print("Setting replacement ...")
                 print("Choosing random wallpaper from favorites ...")
-                if len(self.favorites) == 0:
+                self.shuffle.remove(wallpaper)
+                favorites = self.get_favorites()
+                replacement = self.shuffle.pick(favorites) if len(favorites) > 0 else None
+                if replacement is None:
                     print("No favorites to choose from. Selecting random from all ...")
-                    replacement = choice(self.wallpapers)
+                    replacement = self.shuffle.pick()
+                if replacement is None:
+                    # The library is empty now: nothing to show, so Komorebi is left stopped
+                    print("[WARNING] No other wallpaper to replace it with. Komorebi is not restarted.")
                 else:
-                    replacement = choice(self.favorites)
-                print(f"Setting replacement to '{colored(replacement, 'green')}' ...")
-                self.set_wallpaper(choice(self.favorites))
+                    print(f"Setting replacement to '{colored(replacement, 'green')}' ...")
+                    self.set_wallpaper(replacement)
 
                 # Delete the wallpaper folder
                 shutil.rmtree(f"{self.__KOMOREBI_WALLPAPER_DIRS_PATH}/{wallpaper}")
                 print(f"Deleted '{colored(wallpaper, 'green')}'")
 
-                self.start_komorebi()
-                exit()
+                if replacement is not None:
+                    self.start_komorebi()
         else:
             print("Aborting delete")
-            exit()
 
     def remove_from_favorites(self, wallpaper):
-        if wallpaper not in self.favorites:
+        if not self.favorites.remove(wallpaper):
             print(f"[WARNING] Wallpaper '{wallpaper}' is not in favorites")
             print(f"[WARNING] Aborting remove from favorites")
             return
-        
-        with open(self.__FAVORITES_FILE_PATH, "w") as favorites_file:
-            for favorite in self.favorites:
-                if favorite != wallpaper:
-                    favorites_file.write(favorite + "\n")
-        
-        self.favorites.remove(wallpaper)
+
         print(f"Removed '{colored(wallpaper, 'green')}' from favorites")
-        exit()
 
     def add_to_favorites(self, wallpaper):
-        if wallpaper in self.favorites:
+        if not self.favorites.add(wallpaper):
             print(f"[WARNING] Wallpaper '{wallpaper}' is already in favorites")
             print(f"[WARNING] Aborting add to favorites")
             return
-        
-        with open(self.__FAVORITES_FILE_PATH, "a") as favorites_file:
-            favorites_file.write(wallpaper + "\n")
-        
-        self.favorites.append(wallpaper)
-        print(f"Added '{colored(wallpaper, 'green')}' to favorites")
-        exit()
 
-    def input_shift_buffer(self, buffer):
-        ret = input()
-        # use buffer as if it is a newline character in stdin
-        if buffer != "" and buffer in ret:
-            ret = ret.split(buffer)[-1]
-
-        return ret
+        print(f"Added '{colored(wallpaper, 'green')}' to favorites")
 
     def print_and_pipe_cur_wp_path(self):
         """
@@ -833,6 +863,11 @@ class UI:
             print("[ERROR] Otherwise, copy the path manually from the terminal window")
 
     def ask_for_backup(self, wallpaper):
+        """Offers to back up a wallpaper folder before it is modified.
+
+        Returns:
+            bool: False if the backup failed and the modification should be aborted.
+        """
         self.clear()
         print(f"Wallpaper: {colored(wallpaper, 'green')}")
         
@@ -840,16 +875,17 @@ class UI:
         print("Would you like to create a backup of the wallpaper folder in the project directory? (y/n)")
 
         print(self.prompt_char, end="", flush=True)
-        backup_input = self.input_shift_buffer("edit").lower()
+        backup_input = input().lower()
 
         if backup_input == "y":
             success = self.backup_wallpaper_folder(wallpaper)
             if not success:
                 print("Backup failed. Continue anyway? (y/n)")
                 print(self.prompt_char, end="", flush=True)
-                backup_input = self.input_shift_buffer("edit").lower()
+                backup_input = input().lower()
                 if backup_input != "y":
-                    exit()
+                    return False
+        return True
 
     def backup_wallpaper_folder(self, wallpaper):
         print(f"Creating a backup of {wallpaper} in {os.path.dirname(os.path.realpath(__file__))}/backups")
@@ -919,23 +955,25 @@ class UI:
 
         print(f"Enter new name for '{colored(wallpaper, 'green')}'")
         print(self.prompt_char, end="", flush=True)
-        new_name = self.input_shift_buffer("edit").strip()
-        illegal_chars = ["\\", "/", ":", "*", "?", "\"", "<", ">", "|"]
-        while new_name == "" or new_name in self.wallpapers or any(char in new_name for char in illegal_chars):
+        new_name = input().strip()
+        illegal_chars = ILLEGAL_NAME_CHARS
+        while new_name == "" or new_name in self.library or any(char in new_name for char in illegal_chars):
             if new_name == "":
                 print("Name cannot be empty")
-            elif new_name in self.wallpapers:
+            elif new_name in self.library:
                 print("Name already exists")
             elif any(char in new_name for char in illegal_chars):
                 print("Name cannot contain any of the following characters: " + ", ".join(illegal_chars))
             print("Try again")
             print(self.prompt_char, end="", flush=True)
-            new_name = self.input_shift_buffer("edit").strip()
+            new_name = input().strip()
         
         print(f"Renaming '{wallpaper}' to '{new_name}' ...")
 
         # Ask if user wants to make a backup copy of the wallpaper folder in project directory
-        self.ask_for_backup(wallpaper)
+        if not self.ask_for_backup(wallpaper):
+            print("Aborting rename")
+            return
 
         print(f"Renaming '{colored(wallpaper, 'green')}' to '{colored(new_name, 'green')}'\n")
         self.kill_komorebi()
@@ -946,97 +984,138 @@ class UI:
         # Update references to the wallpaper in the favorites file if it is in favorites
         if wallpaper in self.favorites:
             print(f"Updating references to '{colored(wallpaper, 'green')}' in favorites file ...")
-            self.favorites.remove(wallpaper)
-            self.favorites.append(new_name)
-            with open(self.__FAVORITES_FILE_PATH, "w") as favorites_file:
-                for favorite in self.favorites:
-                    favorites_file.write(favorite + "\n")
+            self.favorites.rename(wallpaper, new_name)
 
         print("Done.\n")
 
     # ----------------------------
 
+    def get_prompt_lines(self):
+        return [
+            f"Active Wallpaper: {colored(self.get_active_wallpaper(), 'green')}",
+            *self.instructions.split("\n"),
+            self.prompt_char + self.cur_input,
+        ]
+
     def print_prompt_and_cur_input(self):
-        print(f"Active Wallpaper: {colored(self.get_active_wallpaper(), 'green')}")
-        print(self.instructions)
-        print(self.prompt_char + self.cur_input, end="", flush=True)
+        print("\n".join(self.get_prompt_lines()), end="", flush=True)
 
-    def on_key_press(self, event):
-        if event.name in self.ignore_keys:
-            return
-        
-        if event.event_type == keyboard.KEY_DOWN:
-            # Shift Down turns on shift_pressed flag
-            if event.name == 'shift':
-                self.shift_pressed = True
-            return
+    def handle_keys(self, keys):
+        """Handles a batch of keys read from the terminal.
 
-        if event.event_type == keyboard.KEY_UP:
-            # Shift Up turns off shift_pressed flag
-            if event.name == 'shift':
-                self.shift_pressed = False
+        Typing only changes the input; the search and the redraw run once for the whole batch, so a burst of
+        keys costs one search instead of one per key. Keys that use the results (ENTER, TAB, UP, DOWN) first
+        bring the results up to date with what was typed before them. The last search is cancelled if more
+        keys arrive while it runs; the next batch searches for the newest input instead.
 
-            # Check if the pressed key is backspace or delete and remove the last letter from the current input
-            elif event.name == 'backspace' or event.name == 'delete':
+        Returns:
+            bool: True if the screen was redrawn with the results of the newest input.
+        """
+        # stale: the results don't match the input yet, redraw: the screen doesn't match the state yet
+        stale = redraw = self.search_pending
+        for key in keys:
+            if key in ("backspace", "delete"):
                 self.cur_input = self.cur_input[:-1]
-                self.update_results()
+                stale = redraw = True
 
             # TAB and ENTER for selection
-            elif event.name == 'enter' or event.name == 'return' or event.name == 'tab':
-                wallpaper = self.select_from_results(-1 if event.name == 'tab' else self.cur_result_index)
+            elif key in ("enter", "tab"):
+                if stale:
+                    self.update_results()
+                    stale = redraw = False
+                wallpaper = self.select_from_results(-1 if key == "tab" else self.cur_result_index)
                 if wallpaper:
                     # Current input is cleared after a successful selection
                     self.cur_input = ""
-                    
+
                     self.refresh_with_new(wallpaper)
 
             # Check if pressed key is up or down arrow and change the current result index
-            elif event.name == 'up':
-                if self.cur_result_index > 0:
+            elif key in ("up", "down"):
+                if stale:
+                    self.update_results()
+                    stale = False
+                if key == "up" and self.cur_result_index > 0:
                     self.cur_result_index -= 1
-                self.update_results()
-            elif event.name == 'down':
-                if self.cur_result_index < len(self.cur_results) - 1:
+                elif key == "down" and self.cur_result_index < len(self.cur_results) - 1:
                     self.cur_result_index += 1
-                self.update_results()
+                redraw = True
 
+            # Add typed characters to the current input, other named keys (e.g., 'left' or 'esc') are ignored
+            elif len(key) == 1:
+                self.cur_input += key
+                stale = redraw = True
 
-            # Catch all other keys and add them to the current input
-            else:
-                if self.shift_pressed:
-                    self.cur_input += self.get_shift_variant(event.name)
-                else:
-                    self.cur_input += event.name
-                self.update_results()
+        if redraw:
+            return self.update_results(cancellable=True)
+        return False
+
+    def reload_komorebi(self):
+        """Tells the running Komorebi instance of this monitor to switch to the wallpaper in its config file.
+
+        Only this monitor's instance is touched and it keeps its window and video player.
+
+        Returns:
+            bool: True if the instance switched the wallpaper, False if it isn't running.
+        """
+        return reload_wallpaper(control_socket_path(self.__KOMOREBI_CONFIG_FILE_PATH))
 
     def kill_komorebi(self):
-        print("Killing any running instances of Komorebi ...")
-        os.system("killall komorebi")
+        print("Killing running instances of Komorebi ...")
+        if not self.launcher.stop_all():
+            # Instances started before the launcher tracked PIDs (or by something else) are unknown
+            print("[WARNING] No tracked Komorebi instances. Killing all processes named komorebi ...")
+            os.system("killall komorebi")
 
     def start_komorebi(self):
         print("Starting Komorebi ...")
-        # Start for each monitor
-        config_files = [f for f in os.listdir(self.__KOMOREBI_CONFIG_FILE_PATH.split(self.__KOMOREBI_CONFIG_FILE_NAME)[0]) if ".Komorebi" in f and ".prop" in f]
-        for config_file in config_files:
-            # run as the user because the script is run as root, but root user does not have same configs as user
-            os.system(f"sudo -u {self.get_cur_user()} nohup {self.__KOMOREBI_APP_PATH} {config_file.split('.prop')[0][-1]} > /dev/null 2>&1 &")
-        # os.system(f"sudo -u {self.get_cur_user()} nohup {self.__KOMOREBI_APP_PATH} {self.MONITOR_INDEX} > /dev/null 2>&1 &")
+        # Start for each monitor (all at once) and wait until each instance is ready
+        statuses = self.launcher.start_all()
+        ready = [index for index, status in statuses.items() if status in ("ready", "started")]
+        print(f"Komorebi ready on {len(ready)}/{len(statuses)} monitors")
 
     def start(self):
-        sleep(.25)
-        keyboard.hook(self.on_key_press)
+        self.watcher.start()
         try:
-            keyboard.wait()
-        except KeyboardInterrupt:
-            # Stop listening for key events
-            keyboard.unhook_all()
+            # Only keys typed into this terminal are read, so no root is needed
+            with RawTerminal() as self.terminal:
+                first_key_time = None
+                while True:
+                    keys = self.terminal.read_keys()
+                    if first_key_time is None:
+                        first_key_time = time.perf_counter()
+                    while True:
+                        more_keys = self.terminal.read_keys(self.__SEARCH_DEBOUNCE)
+                        if len(more_keys) == 0:
+                            break
+                        keys += more_keys
+
+                    if self.handle_keys(keys) and not self.waited_for_input:
+                        self.latency.record(time.perf_counter() - first_key_time)
+                    self.waited_for_input = False
+                    # A cancelled search is still measured from the first of its keys
+                    if not self.search_pending:
+                        first_key_time = None
+        except (KeyboardInterrupt, EOFError):
+            self.print_latency()
             exit("\nProgram stopped.")
+        finally:
+            self.watcher.stop()
+
+    def print_latency(self):
+        if self.latency.count == 0:
+            return
+        summary = self.latency.summary()
+        print(f"\nKey to results latency: p50 {summary['p50_ms']} ms, p99 {summary['p99_ms']} ms, max {summary['max_ms']} ms ({summary['count']} redraws)")
 
 
 if __name__ == "__main__":
-    # assure script is run as root
-    if os.geteuid() != 0:
-        exit("Please run this script as root.")
+    # Any arguments run a non-interactive command (see commands.py)
+    if len(sys.argv) > 1:
+        from commands import main
+        exit(main())
+    if not sys.stdin.isatty():
+        exit("The interactive UI needs a terminal. Run 'python change_wallpaper.py --help' for the non-interactive commands.")
     ui = UI()
     ui.start()
 
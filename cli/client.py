@@ -0,0 +1,141 @@
+"""Thin client for the wallpaper daemon (daemon.py). Only imports the standard library, so it starts in milliseconds
+and can be bound to window manager keys.
+
+Usage:
+    python client.py shuffle --monitor 1
+    python client.py set citystreet
+    python client.py search rain --json
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+
+DAEMON_SOCKET_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data", "cache", "daemon.sock")
+DAEMON_TIMEOUT = 30.0
+
+
+class ClientError(Exception):
+    """Raised when the daemon is not running or replies with an error."""
+
+
+def request(command, args=None, socket_path=DAEMON_SOCKET_PATH, timeout=DAEMON_TIMEOUT):
+    """Sends a command to the daemon and waits for its result.
+
+    Args:
+        command (str): The WallpaperService method to run (e.g., 'search' or 'set').
+        args (dict): Its keyword arguments.
+
+    Returns:
+        The result of the command (plain JSON data).
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.settimeout(timeout)
+            connection.connect(socket_path)
+            connection.sendall(json.dumps({"command": command, "args": args or {}}).encode() + b"\n")
+            reply = b""
+            while not reply.endswith(b"\n"):
+                data = connection.recv(65536)
+                if not data:
+                    break
+                reply += data
+    except OSError as e:
+        raise ClientError(f"Could not reach the daemon at {socket_path}: {e}") from e
+
+    try:
+        response = json.loads(reply)
+    except ValueError as e:
+        raise ClientError("Invalid reply from the daemon") from e
+    if not response.get("ok"):
+        raise ClientError(response.get("error", "Unknown error"))
+    return response["result"]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Control the wallpaper daemon.")
+    parser.add_argument("--socket", default=DAEMON_SOCKET_PATH, help="the daemon socket")
+    add_commands(parser)
+    return parser
+
+
+def add_commands(parser):
+    """Adds --json and a subcommand for each WallpaperService command to a parser.
+
+    Returns:
+        The subparsers action, to add more commands to.
+    """
+    parser.add_argument("--json", action="store_true", help="print the raw result as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name, **kwargs):
+        command = commands.add_parser(name, **kwargs)
+        # --json is also accepted after the command (e.g., 'search rain --json')
+        command.add_argument("--json", action="store_true", default=argparse.SUPPRESS, help="print the raw result as JSON")
+        return command
+
+    search = add_command("search", help="find wallpapers by name")
+    search.add_argument("query", nargs="?", default="")
+    search.add_argument("--ranked", action="store_true", help="ranked fuzzy/tag search")
+    search.add_argument("--limit", type=int, default=None)
+
+    for name, help_text in [("set", "set the wallpaper of a monitor"), ("fav", "add to favorites"), ("unfav", "remove from favorites"), ("delete", "delete a wallpaper folder")]:
+        command = add_command(name, help=help_text)
+        command.add_argument("wallpaper")
+        if name == "set":
+            command.add_argument("--monitor", default="0")
+
+    shuffle = add_command("shuffle", help="set a random wallpaper")
+    shuffle.add_argument("query", nargs="?", default=None, help="pick only from the results of this search")
+    shuffle.add_argument("--monitor", default="0")
+
+    rename = add_command("rename", help="rename a wallpaper")
+    rename.add_argument("wallpaper")
+    rename.add_argument("new_name")
+
+    recent = add_command("recent", help="show recently used wallpapers")
+    recent.add_argument("--count", type=int, default=25)
+    recent.add_argument("--monitor", default=None)
+
+    active = add_command("active", help="show the wallpaper of a monitor")
+    active.add_argument("--monitor", default="0")
+
+    thumbnail = add_command("thumbnail", help="get the path of a thumbnail of a wallpaper")
+    thumbnail.add_argument("wallpaper")
+    thumbnail.add_argument("--size", choices=["small", "medium", "large"], default="medium")
+    thumbnail.add_argument("--wait", action="store_true", help="wait for a missing thumbnail instead of printing 'path: None'")
+
+    add_command("status", help="show the wallpapers, favorites and the wallpaper of each monitor")
+    return commands
+
+
+def print_result(result, as_json=False):
+    if as_json:
+        print(json.dumps(result, indent=2))
+    elif isinstance(result, list):
+        for item in result:
+            print(item)
+    elif isinstance(result, dict):
+        for key, value in result.items():
+            print(f"{key}: {value}")
+    else:
+        print(result)
+
+
+def main(argv=None):
+    args = vars(build_parser().parse_args(argv))
+    command = args.pop("command")
+    as_json = args.pop("json")
+    socket_path = args.pop("socket")
+    try:
+        result = request(command, args, socket_path)
+    except ClientError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    print_result(result, as_json)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,85 @@
+"""Non-interactive commands, for scripts, cron and tests. Each runs in one short process, without the keyboard
+hook, and does not need root.
+
+Usage:
+    python commands.py set citystreet --monitor 1
+    python commands.py shuffle rain --json
+    python commands.py import ~/Videos/loops --jobs 4
+
+The same commands are also available from change_wallpaper.py (e.g., 'python change_wallpaper.py recent'), and
+from client.py when the daemon is running.
+"""
+import argparse
+import contextlib
+import sys
+
+from client import add_commands, print_result
+from library_index import KOMOREBI_WALLPAPER_DIRS_PATH
+from service import ServiceError, WallpaperService
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Change, search and manage Komorebi wallpapers without the interactive UI.")
+    parser.add_argument("--wallpaper-dir", default=KOMOREBI_WALLPAPER_DIRS_PATH, help="the Komorebi wallpaper directory")
+    parser.add_argument("--lists-dir", default=None, help="the directory of favorites.txt and history.txt (default: data/lists)")
+    commands = add_commands(parser)
+
+    import_command = commands.add_parser("import", help="import every video in directories or glob patterns")
+    import_command.add_argument("sources", nargs="+", help="directories or glob patterns of video files")
+    import_command.add_argument("--template", help="wallpaper config file to copy the settings from")
+    import_command.add_argument("--jobs", type=int, default=None, help="videos processed at the same time (default: number of CPUs)")
+    import_command.add_argument("--dry-run", action="store_true", help="only print what would be imported")
+    import_command.add_argument("--json", action="store_true", default=argparse.SUPPRESS, help="print the raw result as JSON")
+    return parser
+
+
+def run(command, args, wallpaper_dirs_path=KOMOREBI_WALLPAPER_DIRS_PATH, lists_dir=None):
+    """Runs a command.
+
+    Args:
+        command (str): The command name (e.g., 'set').
+        args (dict): Its arguments, as parsed by build_parser.
+        wallpaper_dirs_path (str): The Komorebi wallpaper directory.
+        lists_dir (str): The directory of favorites.txt and history.txt. Defaults to data/lists.
+
+    Returns:
+        The result of the command (plain JSON data).
+    """
+    if command == "import":
+        # Imported here so the other commands don't load the import pipeline
+        from bulk_import import bulk_import
+        return bulk_import(args["sources"], wallpaper_dirs_path, args["template"], args["jobs"], args["dry_run"])
+    service = WallpaperService(wallpaper_dirs_path, lists_dir)
+    try:
+        return getattr(service, command)(**args)
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    args = vars(build_parser().parse_args(argv))
+    command = args.pop("command")
+    as_json = args.pop("json")
+    wallpaper_dirs_path = args.pop("wallpaper_dir")
+    lists_dir = args.pop("lists_dir")
+
+    # With --json, stdout only gets the result; progress and warnings go to stderr
+    output = sys.stderr if as_json else sys.stdout
+    try:
+        with contextlib.redirect_stdout(output):
+            result = run(command, args, wallpaper_dirs_path, lists_dir)
+    except (ServiceError, OSError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+
+    if command == "import":
+        # bulk_import already printed its progress and summary
+        if as_json:
+            print_result(result, as_json)
+        return 1 if result["failed"] else 0
+    print_result(result, as_json)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
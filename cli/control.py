@@ -0,0 +1,111 @@
+import os
+import socket
+import threading
+
+from keyfile import KeyFile
+
+CONTROL_SOCKET_TIMEOUT = 2.0
+
+
+def control_socket_path(config_file_path):
+    """Gets the path of the control socket of the Komorebi instance that reads a config file.
+
+    Komorebi opens the socket next to its config file, named after it: .Komorebi{N}.prop -> .Komorebi{N}.sock
+    (see ControlChannel.controlSocketPath in src/ControlChannel.vala). It is not looked up in $HOME, since the
+    CLI may run as root for another user.
+
+    Args:
+        config_file_path (str): The path to the config file of the instance (.Komorebi{N}.prop).
+
+    Returns:
+        str: The path to the socket.
+    """
+    stem = config_file_path[:-len(".prop")] if config_file_path.endswith(".prop") else config_file_path
+    return stem + ".sock"
+
+
+def send_command(socket_path, command, timeout=CONTROL_SOCKET_TIMEOUT):
+    """Sends a command to a running Komorebi instance and waits for the reply.
+
+    Args:
+        socket_path (str): The path to the control socket.
+        command (str): The command (e.g., 'ping' or 'reload').
+        timeout (float): Seconds to wait for the instance.
+
+    Returns:
+        str: The reply, or None if no instance is listening on the socket.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.settimeout(timeout)
+            connection.connect(socket_path)
+            connection.sendall(command.encode() + b"\n")
+            reply = b""
+            while not reply.endswith(b"\n"):
+                data = connection.recv(4096)
+                if not data:
+                    break
+                reply += data
+    except OSError:
+        return None
+    return reply.decode().strip()
+
+
+def reload_wallpaper(socket_path, timeout=CONTROL_SOCKET_TIMEOUT):
+    """Tells a running Komorebi instance to re-read its config file and switch to the wallpaper set there.
+
+    Returns:
+        bool: True if the instance switched the wallpaper, False if there is no running instance or it failed.
+    """
+    reply = send_command(socket_path, "reload", timeout)
+    return reply is not None and reply.startswith("ok")
+
+
+class StandInControlServer:
+    """Stand-in for the control channel of a Komorebi instance, for trying the CLI without Komorebi running.
+
+    Speaks the same protocol as src/ControlChannel.vala: 'ping' replies 'ready', and 'reload' re-reads the
+    WallpaperName from the config file and replies 'ok <name>'. Every wallpaper it switched to is kept in `loaded`.
+    """
+
+    def __init__(self, socket_path, config_file_path):
+        self.socket_path = socket_path
+        self.config_file_path = config_file_path
+        self.loaded = []
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        self._server.listen()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def handle_command(self, command):
+        if command == "ping":
+            return "ready"
+        if command == "reload":
+            wallpaper = KeyFile.from_file(self.config_file_path).get_string("KomorebiProperties", "WallpaperName")
+            self.loaded.append(wallpaper)
+            return f"ok {wallpaper}"
+        return f"error unknown command '{command}'"
+
+    def _serve(self):
+        while self._server is not None:
+            try:
+                connection, _ = self._server.accept()
+            except OSError:
+                return
+            with connection:
+                command = connection.makefile("r").readline().strip()
+                connection.sendall(self.handle_command(command).encode() + b"\n")
@@ -0,0 +1,125 @@
+"""Long-running wallpaper service. Keeps the library index, search index, history, favorites and monitor configs
+in memory and runs the commands of client.py over a Unix socket, so each command costs a few milliseconds
+instead of a full CLI startup. Does not need root.
+
+Usage:
+    python daemon.py [--rotate-every 15 --monitor 0 --monitor 1]
+
+Protocol: one JSON object per line, {"command": "set", "args": {"wallpaper": "citystreet", "monitor": "0"}},
+answered by {"ok": true, "result": ...} or {"ok": false, "error": "..."}.
+"""
+import argparse
+import json
+import os
+import socketserver
+import threading
+
+from client import DAEMON_SOCKET_PATH
+from library_index import KOMOREBI_WALLPAPER_DIRS_PATH
+from service import ServiceError, WallpaperService
+from tracing import span
+
+# The WallpaperService methods clients may call
+COMMANDS = frozenset(["search", "set", "shuffle", "active", "recent", "fav", "unfav", "rename", "delete", "thumbnail", "status"])
+
+
+class WallpaperDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves a WallpaperService on a Unix socket. Commands run one at a time, after applying the changes the
+    service's watcher saw."""
+
+    daemon_threads = True
+
+    def __init__(self, service, socket_path=DAEMON_SOCKET_PATH):
+        self.service = service
+        self.socket_path = socket_path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+
+    def handle_command(self, request):
+        """Runs a command.
+
+        Args:
+            request (dict): {"command": name, "args": {keyword arguments}}.
+
+        Returns:
+            dict: The response.
+        """
+        command = request.get("command")
+        if command not in COMMANDS:
+            return {"ok": False, "error": f"Unknown command '{command}'"}
+        args = request.get("args") or {}
+        with self.lock, span(f"command.{command}"):
+            try:
+                self.service.apply_changes()
+                return {"ok": True, "result": getattr(self.service, command)(**args)}
+            except (ServiceError, OSError, TypeError) as e:
+                return {"ok": False, "error": str(e)}
+            except Exception as e:
+                # A bug in one command must not kill the connection (the client would only see it close)
+                return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                request = None
+            if not isinstance(request, dict):
+                response = {"ok": False, "error": "Invalid request"}
+            else:
+                response = self.server.handle_command(request)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the wallpaper daemon.")
+    parser.add_argument("--socket", default=DAEMON_SOCKET_PATH, help="the socket to listen on")
+    parser.add_argument("--wallpaper-dir", default=KOMOREBI_WALLPAPER_DIRS_PATH, help="the Komorebi wallpaper directory")
+    parser.add_argument("--rotate-every", type=float, default=None, help="also change the wallpaper of each monitor every N minutes")
+    parser.add_argument("--monitor", action="append", help="monitor to rotate (can be given more than once, default: 0)")
+    args = parser.parse_args(argv)
+
+    service = WallpaperService(args.wallpaper_dir)
+    service.watch()
+    server = WallpaperDaemon(service, args.socket)
+
+    stop_rotation = threading.Event()
+    if args.rotate_every is not None:
+        threading.Thread(
+            target=_rotate, args=(server, args.monitor or ["0"], args.rotate_every * 60, stop_rotation), daemon=True
+        ).start()
+
+    print(f"[DAEMON] Listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[DAEMON] Stopped.")
+    finally:
+        stop_rotation.set()
+        server.server_close()
+        service.close()
+
+
+def _rotate(server, monitors, interval, stop_event):
+    # Goes through handle_command so rotation and client commands never change the state at the same time
+    while not stop_event.wait(interval):
+        for monitor in monitors:
+            response = server.handle_command({"command": "shuffle", "args": {"monitor": monitor}})
+            if response["ok"]:
+                print(f"[DAEMON] Monitor {monitor}: '{response['result']['wallpaper']}'")
+            else:
+                print(f"[WARNING] Monitor {monitor}: {response['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Finds wallpapers whose videos have the same contents, and optionally hard-links the copies together.
+
+Usage:
+    python dedup.py [--hardlink] [--json] [--jobs 8]
+
+Only videos of the same size are hashed. Those are first compared by a partial hash (the first and last
+64 KiB), and only the ones that still collide are hashed in full. Hashes are cached by (size, mtime), so
+repeated scans only hash new or modified videos.
+"""
+import argparse
+import hashlib
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from file_cache import FileCache
+from library_index import KOMOREBI_WALLPAPER_DIRS_PATH, LibraryIndex
+
+PARTIAL_HASH_BYTES = 64 * 1024
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def partial_hash(path, size):
+    """Hashes the size and the first and last PARTIAL_HASH_BYTES of a file."""
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as file:
+        digest.update(file.read(PARTIAL_HASH_BYTES))
+        if size > 2 * PARTIAL_HASH_BYTES:
+            file.seek(-PARTIAL_HASH_BYTES, os.SEEK_END)
+            digest.update(file.read(PARTIAL_HASH_BYTES))
+        elif size > PARTIAL_HASH_BYTES:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def full_hash(path):
+    """Hashes the whole contents of a file, reading it in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class HashCache(FileCache):
+    """Partial and full hashes of files, kept in a SQLite file and valid as long as the size and mtime match."""
+
+    def __init__(self, cache_path=None):
+        if cache_path is None:
+            cache_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data", "cache", "video_hashes.sqlite")
+        super().__init__(cache_path, "hashes", [("partial", "TEXT"), ("full", "TEXT")])
+
+    def get(self, path, size, mtime, kind):
+        """Gets a cached hash ('partial' or 'full') of a file, or None if it is not cached or the file changed."""
+        values = self.get_values(path, size, mtime)
+        if values is None:
+            return None
+        return values[0] if kind == "partial" else values[1]
+
+    def put(self, path, size, mtime, kind, digest):
+        self.put_value(path, size, mtime, "partial" if kind == "partial" else "full", digest)
+
+
+class Deduplicator:
+    """Groups video files by their contents, hashing as little as possible."""
+
+    def __init__(self, cache=None, max_workers=None):
+        self.cache = cache if cache is not None else HashCache()
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+
+    def find_duplicates(self, paths):
+        """Groups the files that have the same contents.
+
+        Args:
+            paths (list): The paths of the files. Files that can't be read are ignored.
+
+        Returns:
+            list: Lists of two or more paths with identical contents, each in the order given.
+        """
+        paths = list(dict.fromkeys(paths))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            stats = dict(zip(paths, executor.map(_try_stat, paths)))
+
+            by_size = defaultdict(list)
+            for path in paths:
+                if stats[path] is not None:
+                    by_size[stats[path].st_size].append(path)
+            candidates = [path for group in by_size.values() if len(group) > 1 for path in group]
+
+            groups = self._group_by_hash(executor, candidates, stats, "partial")
+            candidates = [path for group in groups if len(group) > 1 for path in group]
+            groups = self._group_by_hash(executor, candidates, stats, "full")
+
+        self.cache.save()
+        order = {path: position for position, path in enumerate(paths)}
+        return sorted((group for group in groups if len(group) > 1), key=lambda group: order[group[0]])
+
+    def find_library_duplicates(self, library):
+        """Groups the wallpapers of a library whose videos have the same contents.
+
+        Args:
+            library (LibraryIndex): The loaded library index.
+
+        Returns:
+            list: Lists of two or more video paths with identical contents.
+        """
+        return self.find_duplicates(library_video_paths(library))
+
+    def hardlink(self, group):
+        """Replaces every file of a duplicate group with a hard link to the first one.
+
+        The link is created next to the file and renamed over it, so a file is never missing.
+
+        Returns:
+            int: The number of bytes freed.
+        """
+        original = group[0]
+        original_stat = os.stat(original)
+        freed = 0
+        for path in group[1:]:
+            path_stat = os.stat(path)
+            if (path_stat.st_dev, path_stat.st_ino) == (original_stat.st_dev, original_stat.st_ino):
+                continue
+            temp_path = path + ".dedup-tmp"
+            os.link(original, temp_path)
+            try:
+                os.replace(temp_path, path)
+            except OSError:
+                os.remove(temp_path)
+                raise
+            if path_stat.st_nlink == 1:
+                freed += path_stat.st_size
+        return freed
+
+    # ----------------------------
+
+    def _group_by_hash(self, executor, paths, stats, kind):
+        hash_function = self._partial_hash if kind == "partial" else self._full_hash
+        digests = executor.map(lambda path: hash_function(path, stats[path]), paths)
+        groups = defaultdict(list)
+        for path, digest in zip(paths, digests):
+            if digest is not None:
+                groups[digest].append(path)
+        return list(groups.values())
+
+    def _partial_hash(self, path, stat):
+        return self._cached_hash(path, stat, "partial", lambda: partial_hash(path, stat.st_size))
+
+    def _full_hash(self, path, stat):
+        # Files no bigger than the partial hash window were already read completely
+        if stat.st_size <= 2 * PARTIAL_HASH_BYTES:
+            return self._partial_hash(path, stat)
+        return self._cached_hash(path, stat, "full", lambda: full_hash(path))
+
+    def _cached_hash(self, path, stat, kind, compute):
+        digest = self.cache.get(path, stat.st_size, stat.st_mtime_ns, kind)
+        if digest is None:
+            try:
+                digest = compute()
+            except OSError:
+                return None
+            self.cache.put(path, stat.st_size, stat.st_mtime_ns, kind, digest)
+        return digest
+
+
+def library_video_paths(library):
+    """Gets the paths of the videos of every wallpaper in a loaded LibraryIndex."""
+    return [
+        os.path.join(library.root_path, entry.name, entry.video_file)
+        for entry in library.entries.values()
+        if entry.video_file != ""
+    ]
+
+
+def _try_stat(path):
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find wallpapers whose videos have the same contents.")
+    parser.add_argument("--wallpaper-dir", default=KOMOREBI_WALLPAPER_DIRS_PATH, help="the Komorebi wallpaper directory")
+    parser.add_argument("--hardlink", action="store_true", help="replace the duplicate videos with hard links to one copy")
+    parser.add_argument("--json", action="store_true", help="print the duplicate groups as JSON")
+    parser.add_argument("--jobs", type=int, default=None, help="files hashed at the same time")
+    args = parser.parse_args(argv)
+
+    library = LibraryIndex(args.wallpaper_dir)
+    library.load()
+    deduplicator = Deduplicator(max_workers=args.jobs)
+    groups = deduplicator.find_library_duplicates(library)
+
+    freed = 0
+    if args.hardlink:
+        for group in groups:
+            try:
+                freed += deduplicator.hardlink(group)
+            except OSError as e:
+                print(f"[ERROR] Could not hard-link the copies of '{group[0]}': {e}")
+
+    if args.json:
+        print(json.dumps({"duplicates": groups, "freed_bytes": freed}, indent=2))
+        return 0
+
+    if len(groups) == 0:
+        print("No duplicate videos found.")
+        return 0
+    for group in groups:
+        print(f"{os.path.getsize(group[0]) / 1024 / 1024:.1f} MB, {len(group)} copies:")
+        for path in group:
+            print(f"    {path}")
+    print(f"\n{len(groups)} duplicate groups, {sum(len(group) - 1 for group in groups)} extra copies")
+    if args.hardlink:
+        print(f"Freed {freed / 1024 / 1024:.1f} MB by hard-linking the copies")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,91 @@
+import os
+
+from atomic_file import FileLock, write_atomic
+
+
+class FavoritesStore:
+    """The favorite wallpapers (data/lists/favorites.txt, one name per line), as an ordered set.
+
+    Every change is made under a lock on the file and starts from what is on disk, so changes made by other
+    CLI sessions (e.g., one per monitor) at the same time are merged instead of overwritten. The file is
+    replaced atomically, so it is never left truncated.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Used as an ordered set: name -> None, in the order the favorites were added
+        self._names = {}
+
+    def load(self):
+        """Reads the favorites file.
+
+        Returns:
+            list: The favorites, in the order they were added.
+        """
+        self._names = self._read()
+        return list(self._names)
+
+    def add(self, name):
+        """Adds a favorite.
+
+        Returns:
+            bool: False if it already was a favorite.
+        """
+        with FileLock(self.path):
+            names = self._read()
+            added = name not in names
+            if added:
+                names[name] = None
+                self._write(names)
+        self._names = names
+        return added
+
+    def remove(self, name):
+        """Removes a favorite.
+
+        Returns:
+            bool: False if it was not a favorite.
+        """
+        with FileLock(self.path):
+            names = self._read()
+            removed = names.pop(name, False) is not False
+            if removed:
+                self._write(names)
+        self._names = names
+        return removed
+
+    def rename(self, old_name, new_name):
+        """Renames a favorite, keeping its position.
+
+        Returns:
+            bool: False if old_name was not a favorite.
+        """
+        with FileLock(self.path):
+            names = self._read()
+            renamed = old_name in names
+            if renamed:
+                names = {new_name if name == old_name else name: None for name in names}
+                self._write(names)
+        self._names = names
+        return renamed
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __iter__(self):
+        return iter(list(self._names))
+
+    def __len__(self):
+        return len(self._names)
+
+    # ----------------------------
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as favorites_file:
+                return {line.strip("\n"): None for line in favorites_file if line.strip("\n") != ""}
+        except FileNotFoundError:
+            return {}
+
+    def _write(self, names):
+        write_atomic(self.path, "".join(name + "\n" for name in names))
@@ -0,0 +1,95 @@
+"""Values computed from files (hashes, media metadata), cached in SQLite by (path, size, mtime).
+
+A cached row is valid as long as the size and mtime of the file match, so only new or modified files are
+read again. Every row is loaded into memory when the cache is opened; put only changes memory, and save
+writes the rows changed since the last save.
+"""
+import os
+import sqlite3
+import threading
+
+
+class FileCache:
+    """A SQLite table of per-file values: path (the primary key), size, mtime and the given value columns. Thread safe."""
+
+    def __init__(self, cache_path, table, columns):
+        """
+        Args:
+            cache_path (str): The SQLite file, created (with its directory) on first use.
+            table (str): The name of the table.
+            columns (list): (name, SQLite type) of each value column, e.g., [("partial", "TEXT")].
+        """
+        self.cache_path = cache_path
+        self.table = table
+        self.columns = [name for name, _ in columns]
+        self.column_types = [column_type for _, column_type in columns]
+        # path -> (size, mtime, values)
+        self.rows = {}
+        self.dirty = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    def get_values(self, path, size, mtime):
+        """Gets the cached values of a file (a tuple in column order), or None if it is not cached or the file changed."""
+        row = self.rows.get(path)
+        if row is None or row[0] != size or row[1] != mtime:
+            return None
+        return row[2]
+
+    def put_values(self, path, size, mtime, values):
+        """Caches all the values of a file."""
+        with self._lock:
+            self.rows[path] = (size, mtime, tuple(values))
+            self.dirty.add(path)
+
+    def put_value(self, path, size, mtime, column, value):
+        """Caches one value of a file, keeping its other values if the file didn't change (otherwise they are None)."""
+        index = self.columns.index(column)
+        with self._lock:
+            row = self.rows.get(path)
+            if row is None or row[0] != size or row[1] != mtime:
+                values = [None] * len(self.columns)
+            else:
+                values = list(row[2])
+            values[index] = value
+            self.rows[path] = (size, mtime, tuple(values))
+            self.dirty.add(path)
+
+    def save(self):
+        """Writes the values added since the last save."""
+        with self._lock:
+            rows = [(path, self.rows[path][0], self.rows[path][1], *self.rows[path][2]) for path in self.dirty]
+            self.dirty.clear()
+        if not rows:
+            return
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (path, size, mtime, {', '.join(self.columns)})"
+                    f" VALUES ({', '.join('?' * (len(self.columns) + 3))})",
+                    rows,
+                )
+        finally:
+            connection.close()
+
+    # ----------------------------
+
+    def _load(self):
+        connection = self._connect()
+        try:
+            for path, size, mtime, *values in connection.execute(
+                f"SELECT path, size, mtime, {', '.join(self.columns)} FROM {self.table}"
+            ):
+                self.rows[path] = (size, mtime, tuple(values))
+        finally:
+            connection.close()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        connection = sqlite3.connect(self.cache_path)
+        value_columns = ", ".join(f"{name} {column_type}" for name, column_type in zip(self.columns, self.column_types))
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, {value_columns})"
+        )
+        return connection
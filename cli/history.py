@@ -0,0 +1,172 @@
+import os
+import time
+from collections import OrderedDict, namedtuple
+
+from atomic_file import FileLock, write_atomic
+
+HistoryEntry = namedtuple("HistoryEntry", ["name", "timestamp", "monitor"])
+
+MAX_HISTORY_BYTES = 1024 * 1024
+COMPACTED_ENTRIES = 5000
+READ_BLOCK_BYTES = 8192
+
+
+def parse_line(line):
+    """Parses a history line: 'name' (old format) or 'name<TAB>timestamp<TAB>monitor'.
+
+    Returns:
+        HistoryEntry: The entry, or None if the line is empty.
+    """
+    fields = line.rstrip("\n").split("\t")
+    name = fields[0].strip()
+    if name == "":
+        return None
+    timestamp = None
+    if len(fields) > 1 and fields[1] != "":
+        try:
+            timestamp = float(fields[1])
+        except ValueError:
+            pass
+    monitor = fields[2] if len(fields) > 2 and fields[2] != "" else None
+    return HistoryEntry(name, timestamp, monitor)
+
+
+def format_line(entry):
+    timestamp = "" if entry.timestamp is None else f"{entry.timestamp:.0f}"
+    monitor = "" if entry.monitor is None else str(entry.monitor)
+    return f"{entry.name}\t{timestamp}\t{monitor}\n"
+
+
+class HistoryStore:
+    """Append-only history of the wallpapers that were used (data/lists/history.txt).
+
+    Only the end of the file is ever read: lines are read backwards in blocks from the end, so reading the
+    most recent entries costs the same however long the history is. Once the file grows past max_bytes it
+    is rewritten with only its last `compacted_entries` entries. The deduplicated most-recently-used view
+    is kept in memory and updated on append.
+
+    Lines of the old format (only the wallpaper name) are still read; they have no timestamp or monitor.
+    """
+
+    def __init__(self, path, max_bytes=MAX_HISTORY_BYTES, compacted_entries=COMPACTED_ENTRIES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compacted_entries = compacted_entries
+        # name -> HistoryEntry, least recent first; None until first needed
+        self._mru = None
+        self._mru_complete = False
+
+    def last(self):
+        """Gets the most recent entry.
+
+        Returns:
+            HistoryEntry: The entry, or None if the history is empty.
+        """
+        for entry in self.iter_reversed():
+            return entry
+        return None
+
+    def tail(self, count):
+        """Gets the last entries, duplicates included.
+
+        Returns:
+            list: Up to count HistoryEntry, most recent first.
+        """
+        entries = []
+        for entry in self.iter_reversed():
+            if len(entries) >= count:
+                break
+            entries.append(entry)
+        return entries
+
+    def recent(self, count, monitor=None):
+        """Gets the most recently used wallpapers, each only once.
+
+        Args:
+            count (int): The maximum number of wallpapers.
+            monitor (str): Only wallpapers used on this monitor (entries without a monitor always count).
+
+        Returns:
+            list: Up to count wallpaper names, most recent first.
+        """
+        self._fill_mru(count)
+        names = []
+        for entry in reversed(self._mru.values()):
+            if len(names) >= count:
+                break
+            if monitor is None or entry.monitor is None or entry.monitor == str(monitor):
+                names.append(entry.name)
+        if len(names) < count and not self._mru_complete and monitor is not None:
+            # Filtering by monitor may need entries further back
+            self._fill_mru(None)
+            return self.recent(count, monitor)
+        return names
+
+    def append(self, name, monitor=None, timestamp=None):
+        """Adds an entry at the end of the history, compacting the file if it got too big."""
+        entry = HistoryEntry(name, time.time() if timestamp is None else timestamp, None if monitor is None else str(monitor))
+        with self._lock():
+            # A single write with O_APPEND, so entries of several processes never interleave
+            with open(self.path, "a") as history_file:
+                history_file.write(format_line(entry))
+                size = history_file.tell()
+            if size > self.max_bytes:
+                self._compact()
+
+        if self._mru is not None:
+            self._mru.pop(name, None)
+            self._mru[name] = entry
+        return entry
+
+    def reload(self):
+        """Forgets the in-memory view, e.g., after another process appended to the file."""
+        self._mru = None
+        self._mru_complete = False
+
+    def iter_reversed(self):
+        """Iterates over the entries from the most recent one, reading the file backwards in blocks."""
+        try:
+            history_file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with history_file:
+            position = history_file.seek(0, os.SEEK_END)
+            rest = b""
+            while position > 0:
+                read_size = min(READ_BLOCK_BYTES, position)
+                position -= read_size
+                history_file.seek(position)
+                lines = (history_file.read(read_size) + rest).split(b"\n")
+                # The first line may continue in the previous block
+                rest = lines.pop(0)
+                for line in reversed(lines):
+                    entry = parse_line(line.decode("utf-8", errors="replace"))
+                    if entry is not None:
+                        yield entry
+            entry = parse_line(rest.decode("utf-8", errors="replace"))
+            if entry is not None:
+                yield entry
+
+    # ----------------------------
+
+    def _fill_mru(self, count):
+        # Reads backwards until count different wallpapers are known (count None reads everything)
+        if self._mru is not None and (self._mru_complete or (count is not None and len(self._mru) >= count)):
+            return
+        newest_first = OrderedDict()
+        self._mru_complete = True
+        for entry in self.iter_reversed():
+            if entry.name not in newest_first:
+                if count is not None and len(newest_first) >= count:
+                    self._mru_complete = False
+                    break
+                newest_first[entry.name] = entry
+        self._mru = OrderedDict((name, newest_first[name]) for name in reversed(newest_first))
+
+    def _compact(self):
+        entries = self.tail(self.compacted_entries)
+        write_atomic(self.path, "".join(format_line(entry) for entry in reversed(entries)))
+
+    def _lock(self):
+        return FileLock(self.path)
+
@@ -0,0 +1,176 @@
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from keyfile import KeyFile
+
+THUMBNAIL_FILE_NAME = "wallpaper.jpg"
+THUMBNAIL_SECONDS = 2
+VIDEO_FILE_EXTENSIONS = frozenset([".mp4", ".webm", ".mov", ".avi", ".wmv", ".flv", ".mkv", ".m4v", ".mpg", ".mpeg", ".m2v", ".3gp", ".3g2", ".mxf", ".roq", ".nsv", ".f4v", ".f4p", ".f4a", ".f4b"])
+
+# Default [DateTime] section of a wallpaper config (date and time hidden)
+DEFAULT_DATETIME = {
+    "Visible": False,
+    "Parallax": False,
+    "MarginTop": 0,
+    "MarginRight": 0,
+    "MarginLeft": 0,
+    "MarginBottom": 0,
+    "RotationX": 0,
+    "RotationY": 0,
+    "RotationZ": 0,
+    "Position": "center",
+    "Alignment": "center",
+    "AlwaysOnTop": True,
+    "Color": "#dd22dd22dd22",
+    "Alpha": 255,
+    "ShadowColor": "#dd22dd22dd22",
+    "ShadowAlpha": 255,
+    "TimeFont": "Lato Light 30",
+    "DateFont": "Lato Light 20"
+}
+
+
+def copy_video(video_file_path, destination_path):
+    shutil.copy(video_file_path, destination_path)
+    return destination_path
+
+
+def transcode_video(video_file_path, destination_path):
+    """Converts a video to mp4 with ffmpeg."""
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-i", video_file_path, destination_path],
+        check=True, stdin=subprocess.DEVNULL,
+    )
+    return destination_path
+
+
+def create_thumbnail(video_file_path, destination_path, seconds=THUMBNAIL_SECONDS):
+    """Saves a frame of a video as an image with ffmpeg.
+
+    -ss is given before -i so ffmpeg seeks in the input instead of decoding every frame up to that point.
+    """
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-ss", str(seconds), "-i", video_file_path, "-frames:v", "1", destination_path],
+        check=True, stdin=subprocess.DEVNULL,
+    )
+    return destination_path
+
+
+def build_wallpaper_config(video_file_name, datetime=None, template_path=None):
+    """Builds the config file of a video wallpaper.
+
+    Args:
+        video_file_name (str): The name of the video file in the wallpaper folder.
+        datetime (dict): The [DateTime] settings. Defaults to DEFAULT_DATETIME.
+        template_path (str): A config file to copy every other setting from. If given, datetime is ignored.
+
+    Returns:
+        KeyFile: The config.
+    """
+    if template_path is not None:
+        config = KeyFile.from_file(template_path)
+    else:
+        config = KeyFile()
+        config.set_string("Info", "WallpaperType", "video")
+    config.set_string("Info", "VideoFileName", video_file_name)
+    if template_path is None:
+        for key, value in (datetime if datetime is not None else DEFAULT_DATETIME).items():
+            config.set("DateTime", key, value)
+    return config
+
+
+def imported_video_file_name(wp_name, video_file_path):
+    """Gets the name the video file will have in the wallpaper folder (videos that aren't mp4 are converted to mp4).
+
+    Returns:
+        str: The file name.
+    """
+    if video_file_path.split(".")[-1] != "mp4":
+        return f"{wp_name}.mp4"
+    return os.path.basename(video_file_path)
+
+
+class ImportJob:
+    """The queued steps of importing one video into a wallpaper folder."""
+
+    def __init__(self, wp_name, futures):
+        self.wp_name = wp_name
+        # future -> step name ('copy', 'transcode' or 'thumbnail')
+        self.futures = futures
+
+
+class ImportPipeline:
+    """Runs the copy, transcode and thumbnail steps of importing videos as jobs in a thread pool.
+
+    The steps of one video run at the same time (the thumbnail is made from the source video), and many
+    videos can be queued at once so a batch import uses every core. The work is done by cp and ffmpeg
+    subprocesses, so threads that wait for them are enough; a process pool would also fork the UI while its
+    watcher and search threads may hold locks.
+    """
+
+    def __init__(self, max_workers=None):
+        # One ffmpeg per core, like a process pool would run
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def submit(self, wp_name, video_file_path, wallpaper_dir):
+        """Queues the import of a video into an existing wallpaper folder.
+
+        Args:
+            wp_name (str): The name of the wallpaper (and of its folder).
+            video_file_path (str): The path to the source video.
+            wallpaper_dir (str): The path to the wallpaper folder.
+
+        Returns:
+            ImportJob: The queued job.
+        """
+        video_destination = os.path.join(wallpaper_dir, imported_video_file_name(wp_name, video_file_path))
+        futures = {}
+        if video_file_path.split(".")[-1] != "mp4":
+            futures[self.executor.submit(transcode_video, video_file_path, video_destination)] = "transcode"
+        else:
+            futures[self.executor.submit(copy_video, video_file_path, video_destination)] = "copy"
+        futures[self.executor.submit(create_thumbnail, video_file_path, os.path.join(wallpaper_dir, THUMBNAIL_FILE_NAME))] = "thumbnail"
+        return ImportJob(wp_name, futures)
+
+    def wait(self, jobs, on_progress=None):
+        """Waits until every step of the jobs finished.
+
+        Args:
+            jobs (list): The ImportJobs to wait for.
+            on_progress (function): Called after each step as on_progress(done, total, wp_name, step, error),
+                where error is None if the step succeeded. Defaults to printing the progress.
+
+        Returns:
+            list: The names of the wallpapers for which every step succeeded.
+        """
+        if on_progress is None:
+            on_progress = print_progress
+
+        steps = {future: (job, step) for job in jobs for future, step in job.futures.items()}
+        failed = set()
+        for done, future in enumerate(as_completed(steps), start=1):
+            job, step = steps[future]
+            error = future.exception()
+            if error is not None:
+                failed.add(job.wp_name)
+            on_progress(done, len(steps), job.wp_name, step, error)
+
+        return [job.wp_name for job in jobs if job.wp_name not in failed]
+
+
+def print_progress(done, total, wp_name, step, error):
+    if error is None:
+        print(f"[IMPORT] ({done}/{total}) {step} '{wp_name}' done")
+    else:
+        print(f"[ERROR] ({done}/{total}) {step} '{wp_name}' failed: {error}")
@@ -0,0 +1,219 @@
+from atomic_file import write_atomic
+
+
+class KeyFileError(Exception):
+    """Raised when a group or key is missing, or a value can't be converted (like GLib.KeyFileError)."""
+
+
+class KeyFile:
+    """Parser and writer for the key file format used by Komorebi (GLib's KeyFile).
+
+    Used for both the app config (.Komorebi{N}.prop) and the per-wallpaper `config` files, which Komorebi
+    reads with GLib.KeyFile in Utilities.vala. Comments, blank lines and the order of groups and keys are
+    kept, so a file that is loaded and saved again only changes where values were set.
+
+    Example:
+        [KomorebiProperties]
+        WallpaperName=citystreet
+        TimeTwentyFour=false
+    """
+
+    def __init__(self):
+        # group name -> list of lines, where a line is either a (key, raw value) tuple or a raw string (comment/blank)
+        self.groups = {}
+        # Comments and blank lines before the first group
+        self.header = []
+
+    # ----------------------------
+
+    @classmethod
+    def from_file(cls, path):
+        key_file = cls()
+        key_file.load_from_file(path)
+        return key_file
+
+    def load_from_file(self, path):
+        with open(path, "r") as key_file:
+            self.load_from_data(key_file.read())
+
+    def load_from_data(self, data):
+        self.groups = {}
+        self.header = []
+        lines = self.header
+        for line in data.splitlines():
+            stripped = line.strip()
+            if stripped.startswith("[") and stripped.endswith("]"):
+                lines = self.groups.setdefault(stripped[1:-1], [])
+            elif stripped == "" or stripped.startswith("#") or "=" not in stripped or lines is self.header:
+                lines.append(line)
+            else:
+                key, value = line.split("=", 1)
+                key = key.strip()
+                index = self._find(lines, key)
+                # Like GLib, a duplicate key overrides the earlier value
+                if index is not None:
+                    del lines[index]
+                lines.append((key, value.lstrip()))
+
+    def to_data(self):
+        """Gets the contents of the key file.
+
+        Returns:
+            str: The key file as text.
+        """
+        output = [line + "\n" for line in self.header]
+        for group, lines in self.groups.items():
+            output.append(f"[{group}]\n")
+            for line in lines:
+                if isinstance(line, tuple):
+                    output.append(f"{line[0]}={line[1]}\n")
+                else:
+                    output.append(line + "\n")
+        return "".join(output)
+
+    def save_to_file(self, path):
+        """Writes the key file atomically.
+
+        The data is written to a temporary file in the same directory which then replaces the file in one step,
+        so a running Komorebi never reads a half-written file. The permissions and owner of an existing file are kept.
+        """
+        write_atomic(path, self.to_data())
+
+    # ----------------------------
+
+    def get_groups(self):
+        return list(self.groups)
+
+    def get_keys(self, group):
+        return [line[0] for line in self._group(group) if isinstance(line, tuple)]
+
+    def has_group(self, group):
+        return group in self.groups
+
+    def has_key(self, group, key):
+        return group in self.groups and self._find(self.groups[group], key) is not None
+
+    def get_value(self, group, key):
+        """Gets the raw (escaped) value of a key."""
+        index = self._find(self._group(group), key)
+        if index is None:
+            raise KeyFileError(f"Key file does not have key '{key}' in group '{group}'")
+        return self.groups[group][index][1]
+
+    def set_value(self, group, key, value):
+        """Sets the raw (escaped) value of a key, creating the group and key if necessary."""
+        if group not in self.groups and len(self.groups) > 0:
+            # Separate a new group from the previous one with a blank line
+            last_lines = self.groups[list(self.groups)[-1]]
+            if len(last_lines) == 0 or last_lines[-1] != "":
+                last_lines.append("")
+        self._set_raw(self.groups.setdefault(group, []), key, value)
+
+    def remove_key(self, group, key):
+        lines = self._group(group)
+        index = self._find(lines, key)
+        if index is None:
+            raise KeyFileError(f"Key file does not have key '{key}' in group '{group}'")
+        del lines[index]
+
+    def get_string(self, group, key):
+        return unescape(self.get_value(group, key))
+
+    def set_string(self, group, key, value):
+        self.set_value(group, key, escape(value))
+
+    def get_boolean(self, group, key):
+        value = self.get_value(group, key).strip()
+        if value in ("true", "1"):
+            return True
+        if value in ("false", "0"):
+            return False
+        raise KeyFileError(f"Value '{value}' of key '{key}' in group '{group}' cannot be interpreted as a boolean")
+
+    def set_boolean(self, group, key, value):
+        self.set_value(group, key, "true" if value else "false")
+
+    def get_integer(self, group, key):
+        value = self.get_value(group, key).strip()
+        try:
+            return int(value)
+        except ValueError:
+            raise KeyFileError(f"Value '{value}' of key '{key}' in group '{group}' cannot be interpreted as a number")
+
+    def set_integer(self, group, key, value):
+        self.set_value(group, key, str(int(value)))
+
+    def get_double(self, group, key):
+        value = self.get_value(group, key).strip()
+        try:
+            return float(value)
+        except ValueError:
+            raise KeyFileError(f"Value '{value}' of key '{key}' in group '{group}' cannot be interpreted as a number")
+
+    def set_double(self, group, key, value):
+        self.set_value(group, key, repr(float(value)))
+
+    def set(self, group, key, value):
+        """Sets a value using the setter matching its Python type (bool, int, float or str)."""
+        if isinstance(value, bool):
+            self.set_boolean(group, key, value)
+        elif isinstance(value, int):
+            self.set_integer(group, key, value)
+        elif isinstance(value, float):
+            self.set_double(group, key, value)
+        else:
+            self.set_string(group, key, str(value))
+
+    # ----------------------------
+
+    def _group(self, group):
+        if group not in self.groups:
+            raise KeyFileError(f"Key file does not have group '{group}'")
+        return self.groups[group]
+
+    def _find(self, lines, key):
+        for index, line in enumerate(lines):
+            if isinstance(line, tuple) and line[0] == key:
+                return index
+        return None
+
+    def _set_raw(self, lines, key, value):
+        index = self._find(lines, key)
+        if index is not None:
+            lines[index] = (key, value)
+            return
+        # Add new keys after the last key of the group (before trailing blank lines and comments)
+        last_key = -1
+        for index, line in enumerate(lines):
+            if isinstance(line, tuple):
+                last_key = index
+        if last_key == -1:
+            lines.append((key, value))
+        else:
+            lines.insert(last_key + 1, (key, value))
+
+
+def escape(value):
+    """Escapes a string value the same way GLib's g_key_file_set_string does."""
+    value = value.replace("\\", "\\\\").replace("\n", "\\n").replace("\t", "\\t").replace("\r", "\\r")
+    if value.startswith(" "):
+        value = "\\s" + value[1:]
+    return value
+
+
+def unescape(value):
+    """Unescapes a string value the same way GLib's g_key_file_get_string does."""
+    if "\\" not in value:
+        return value
+    escapes = {"s": " ", "n": "\n", "t": "\t", "r": "\r", "\\": "\\"}
+    output = []
+    index = 0
+    while index < len(value):
+        char = value[index]
+        if char == "\\" and index + 1 < len(value) and value[index + 1] in escapes:
+            output.append(escapes[value[index + 1]])
+            index += 2
+        else:
+            output.append(char)
+            index += 1
+    return "".join(output)
@@ -0,0 +1,145 @@
+import os
+import time
+from pathlib import Path
+
+from keyfile import KeyFile
+
+KEY_FILE_GROUP = "KomorebiProperties"
+
+
+class KomorebiConfig:
+    """In-memory model of a Komorebi config file (.Komorebi{N}.prop).
+
+    The file is read once and cached. It is only read again when its mtime, inode or size changed,
+    which is checked at most once every `check_interval` seconds (or right away after invalidate()),
+    so callers that redraw on every key press do not touch the file.
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.key_file = KeyFile()
+        self.wallpaper_name = ""
+        self._stat_key = None
+        self._last_check = None
+
+    def get_wallpaper_name(self):
+        """Gets the name of the wallpaper set in the config file.
+
+        Returns:
+            str: The wallpaper name, or an empty string if the config file does not exist or has no wallpaper name.
+        """
+        now = time.monotonic()
+        if self._last_check is None or now - self._last_check >= self.check_interval:
+            self._last_check = now
+            if self._read_stat_key() != self._stat_key:
+                self.load()
+        return self.wallpaper_name
+
+    def set_wallpaper_name(self, wallpaper):
+        """Sets the wallpaper name in the config file and in the cache.
+
+        The other keys of the config file are kept and the file is replaced atomically. The file is checked
+        for changes first, whenever it was last checked, so keys Komorebi or another client just wrote are
+        not overwritten with the cached ones.
+        """
+        self.invalidate()
+        self.get_wallpaper_name()
+        self.key_file.set_string(KEY_FILE_GROUP, "WallpaperName", wallpaper)
+        self.key_file.save_to_file(self.path)
+
+        self.wallpaper_name = wallpaper
+        self._stat_key = self._read_stat_key()
+
+    def load(self):
+        """Reads the config file, replacing the cached values."""
+        self._stat_key = self._read_stat_key()
+        self.key_file = KeyFile()
+        self.wallpaper_name = ""
+        if self._stat_key is None:
+            return
+
+        self.key_file.load_from_file(self.path)
+        if self.key_file.has_key(KEY_FILE_GROUP, "WallpaperName"):
+            self.wallpaper_name = self.key_file.get_string(KEY_FILE_GROUP, "WallpaperName").strip()
+
+    def invalidate(self):
+        """Forces the next read to check the config file for changes (e.g., after a file system event)."""
+        self._last_check = None
+
+    def _read_stat_key(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def locate_config_file(config_file_name, home_path=None):
+    """Locates the Komorebi config file.
+
+    Args:
+        config_file_name (str): The name of the config file (e.g., '.Komorebi0.prop').
+        home_path (str): The home directory to fall back to if no config file is found. Defaults to the current user's.
+
+    Returns:
+        str: The path to the Komorebi config file.
+    """
+
+    # Get system users
+    users = []
+    if os.name == "nt":
+        # Windows
+        import winreg
+        reg = winreg.ConnectRegistry(None, winreg.HKEY_LOCAL_MACHINE)
+        reg_key = winreg.OpenKey(reg, r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\ProfileList")
+        for i in range(1024):
+            try:
+                users.append(winreg.EnumKey(reg_key, i))
+            except:
+                break
+    else:
+        # Linux
+        users = [f.name for f in os.scandir("/home") if f.is_dir()]
+
+    for user in users:
+        if os.name == "nt":
+            # Windows
+            home_dir = os.path.join("C:\\", "Users", user)
+        else:
+            # Linux
+            home_dir = os.path.join("/home", user)
+
+        # Check for default location before declaring other possible locations
+        default_location = os.path.join(home_dir, config_file_name)
+        if os.path.exists(default_location):
+            return default_location
+
+        other_possible_locations = [
+            [home_dir, ".config", "Komorebi", config_file_name],
+            [home_dir, ".local", "share", "Komorebi", config_file_name],
+            [home_dir, ".Komorebi", config_file_name],
+            [home_dir, ".config", config_file_name],
+            ["/", config_file_name],
+        ]
+
+        # Add Windows-specific locations
+        if os.name == "nt":
+            other_possible_locations += [
+                [home_dir, "AppData", "Local", "Komorebi", config_file_name],
+                [home_dir, "AppData", "Roaming", "Komorebi", config_file_name],
+                [home_dir, "AppData", "Local", config_file_name],
+            ]
+
+        for location in other_possible_locations:
+            if os.path.exists(os.path.join(*location)):
+                return os.path.join(*location)
+
+    # No config found
+    if home_path is None:
+        home_path = Path.home()
+    default_location = os.path.join(home_path, config_file_name)
+    print(f"[WARNING] Could not find a Komorebi config file. Using default location {default_location}.")
+    print(f"[WARNING] Make sure config file is named '.Komorebi$I.prop' where $I is the monitor index (e.g., '.Komorebi0")
+    print(f"[WARNING] Note that this is the config for the application, not the config for a wallpaper (which is named 'config' and is located in each wallpaper folder)")
+    return default_location
@@ -0,0 +1,60 @@
+import math
+
+
+class LatencyHistogram:
+    """Counts durations in logarithmic buckets, so percentiles can be read at any time in constant memory.
+
+    Each bucket is `growth` times wider than the previous one, starting at `smallest` seconds, so a
+    percentile is accurate to within that factor (about 10% by default), whatever the durations are.
+    """
+
+    def __init__(self, smallest=1e-5, growth=1.1):
+        self.smallest = smallest
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        # bucket index -> count. Bucket 0 holds everything up to `smallest`
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        if seconds <= self.smallest:
+            bucket = 0
+        else:
+            bucket = 1 + int(math.log(seconds / self.smallest) / self._log_growth)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent):
+        """Gets the duration that `percent` % of the recorded durations don't exceed.
+
+        Returns:
+            float: The upper bound of the bucket the percentile falls in (capped at the largest duration), or
+                0.0 if nothing was recorded.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.smallest * self.growth ** bucket, self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def summary(self, percents=(50, 99)):
+        """Gets the count, mean, max and percentiles, in milliseconds.
+
+        Returns:
+            dict: e.g., {'count': 120, 'mean_ms': 2.1, 'max_ms': 14.0, 'p50_ms': 1.8, 'p99_ms': 9.5}
+        """
+        summary = {"count": self.count, "mean_ms": round(self.mean() * 1000, 3), "max_ms": round(self.max * 1000, 3)}
+        for percent in percents:
+            summary[f"p{percent}_ms"] = round(self.percentile(percent) * 1000, 3)
+        return summary
@@ -0,0 +1,216 @@
+import json
+import os
+import signal
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from control import control_socket_path, send_command
+from tracing import traced
+
+READY_TIMEOUT = 10.0
+STOP_TIMEOUT = 3.0
+# How long an instance without a control socket must keep running to count as started
+STARTED_GRACE_TIME = 0.5
+# The GType name of src/ControlChannel.vala, found in every Komorebi binary that opens the control socket
+CONTROL_CHANNEL_MARKER = b"KomorebiControlChannel"
+
+
+def find_monitor_indexes(config_dir):
+    """Gets the monitor indexes that have a config file (.Komorebi{N}.prop) in a directory.
+
+    Returns:
+        list: The monitor indexes, as strings.
+    """
+    indexes = []
+    for file_name in os.listdir(config_dir):
+        if file_name.startswith(".Komorebi") and file_name.endswith(".prop"):
+            index = file_name[len(".Komorebi"):-len(".prop")]
+            if index.isdigit():
+                indexes.append(index)
+    return sorted(indexes, key=int)
+
+
+def has_control_socket(app_path):
+    """Checks whether a Komorebi binary opens the control socket, so the launcher knows whether to wait for it.
+
+    Builds without src/ControlChannel.vala never answer 'ready'. Returns True if the binary can't be read.
+    """
+    try:
+        with open(app_path, "rb") as app_file:
+            previous = b""
+            while True:
+                chunk = app_file.read(1024 * 1024)
+                if not chunk:
+                    return False
+                # The marker may span two chunks
+                if CONTROL_CHANNEL_MARKER in previous[-len(CONTROL_CHANNEL_MARKER):] + chunk:
+                    return True
+                previous = chunk
+    except OSError:
+        return True
+
+
+class KomorebiLauncher:
+    """Starts and stops one Komorebi instance per monitor.
+
+    All instances are started at once (without a shell) and the launcher then waits until each one answers
+    'ready' on its control socket (if the binary has one, see has_control_socket). The PIDs are kept in a
+    state file so that stopping only kills the instances started here instead of every process named
+    komorebi. Each instance runs in its own session, so it is stopped by signalling its whole process group
+    (including komorebi itself when it was started through sudo).
+    """
+
+    def __init__(self, app_path, config_dir, user=None, state_path=None):
+        self.app_path = app_path
+        self.config_dir = config_dir
+        self.user = user
+        if state_path is None:
+            state_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data", "cache", "komorebi_instances.json")
+        self.state_path = state_path
+
+    def monitor_indexes(self):
+        """Gets the monitor indexes that have a config file (.Komorebi{N}.prop) in the config directory.
+
+        Returns:
+            list: The monitor indexes, as strings.
+        """
+        return find_monitor_indexes(self.config_dir)
+
+    def start_all(self, timeout=READY_TIMEOUT):
+        """Starts an instance for every monitor with a config file and waits until they are ready.
+
+        The instances started earlier by this launcher are stopped first, so none are left running untracked.
+
+        Args:
+            timeout (float): Seconds to wait for each instance to report that it is ready.
+
+        Returns:
+            dict: Monitor index -> status ('ready', 'started' for a binary without a control socket, 'timeout'
+                or 'exited with code N').
+        """
+        self.stop_all()
+        wait_for_socket = has_control_socket(self.app_path)
+        processes = {index: self._spawn(index) for index in self.monitor_indexes()}
+        self._write_state({index: process.pid for index, process in processes.items()})
+
+        with ThreadPoolExecutor(max_workers=max(len(processes), 1)) as executor:
+            futures = {
+                index: executor.submit(self._wait_ready, index, process, timeout if wait_for_socket else STARTED_GRACE_TIME, wait_for_socket)
+                for index, process in processes.items()
+            }
+            statuses = {index: future.result() for index, future in futures.items()}
+
+        for index, status in statuses.items():
+            if status not in ("ready", "started"):
+                print(f"[WARNING] Komorebi for monitor {index} did not start: {status}")
+        return statuses
+
+    @traced("launcher.stop_all")
+    def stop_all(self, timeout=STOP_TIMEOUT):
+        """Stops the instances started by this launcher (SIGTERM, then SIGKILL after the timeout).
+
+        Returns:
+            bool: False if there was no state file, i.e., no instances are known.
+        """
+        state = self._read_state()
+        if state is None:
+            return False
+
+        pids = [pid for pid in state.values() if self._is_komorebi(pid)]
+        for pid in pids:
+            self._signal(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + timeout
+        while pids and time.monotonic() < deadline:
+            pids = [pid for pid in pids if self._is_alive(pid)]
+            if pids:
+                time.sleep(0.05)
+        for pid in pids:
+            self._signal(pid, signal.SIGKILL)
+
+        os.remove(self.state_path)
+        return True
+
+    # ----------------------------
+
+    @traced("launcher.spawn")
+    def _spawn(self, index):
+        command = [self.app_path, index]
+        # Run as the user because the script is run as root, but root does not have the same configs as the user
+        if self.user is not None and os.name != "nt" and os.geteuid() == 0:
+            command = ["sudo", "-u", self.user] + command
+        return subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+    @traced("launcher.wait_ready")
+    def _wait_ready(self, index, process, timeout, wait_for_socket=True):
+        # Without a control socket, an instance that is still running after the timeout has started
+        socket_path = control_socket_path(os.path.join(self.config_dir, f".Komorebi{index}.prop"))
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                return f"exited with code {process.returncode}"
+            if wait_for_socket and send_command(socket_path, "ping", timeout=0.5) == "ready":
+                return "ready"
+            time.sleep(0.05)
+        return "timeout" if wait_for_socket else "started"
+
+    def _read_state(self):
+        try:
+            with open(self.state_path, "r") as state_file:
+                return json.load(state_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_state(self, state):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w") as state_file:
+            json.dump(state, state_file)
+        os.replace(temp_path, self.state_path)
+
+    def _is_komorebi(self, pid):
+        # Guard against the PID having been reused by an unrelated process: it must still run app_path, either
+        # directly or through 'sudo -u user' (see _spawn). A script is run by its interpreter, which gets
+        # app_path as its first argument
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as cmdline_file:
+                argv = [arg.decode(errors="replace") for arg in cmdline_file.read().split(b"\0") if arg]
+        except FileNotFoundError:
+            # The leader (e.g., sudo) exited, but the rest of its group may still run. A PID is not given to a
+            # new process while a process group with that ID exists, so a living group is still ours
+            return self._is_alive(pid)
+        except OSError:
+            return self._is_alive(pid)
+        if len(argv) >= 3 and os.path.basename(argv[0]) == "sudo" and argv[1] == "-u":
+            argv = argv[3:]
+        app_path = os.path.realpath(self.app_path)
+        return any(os.path.realpath(arg) == app_path for arg in argv[:2])
+
+    def _is_alive(self, pid):
+        """Checks whether any process is left in the process group of an instance (its PID is the group ID)."""
+        # Reap the leader if it is our child, otherwise it would stay around as a zombie
+        try:
+            os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            pass
+        try:
+            os.killpg(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _signal(self, pid, sig):
+        # The whole group, since under root the tracked PID is sudo's, and sudo can't relay SIGKILL to komorebi
+        try:
+            os.killpg(pid, sig)
+        except ProcessLookupError:
+            pass
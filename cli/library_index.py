@@ -0,0 +1,236 @@
+import hashlib
+import os
+import sqlite3
+from collections import namedtuple
+
+from keyfile import KeyFile, KeyFileError
+
+KOMOREBI_WALLPAPER_DIRS_PATH = "/System/Resources/Komorebi"
+THUMBNAIL_FILE_NAME = "wallpaper.jpg"
+INDEX_VERSION = "1"
+# Characters that can't be used in wallpaper (folder) names
+ILLEGAL_NAME_CHARS = ["\\", "/", ":", "*", "?", "\"", "<", ">", "|"]
+
+WallpaperEntry = namedtuple("WallpaperEntry", ["name", "video_file", "thumbnail", "size", "mtime"])
+
+
+def index_file_path(root_path, cache_dir=None):
+    """Gets the path of the index file of a wallpaper directory.
+
+    Every directory has its own file, so indexing another directory (e.g., with --wallpaper-dir) neither
+    rescans nor overwrites the index of the main library. The Komorebi wallpaper directory keeps the plain
+    library_index.sqlite name.
+
+    Args:
+        root_path (str): The wallpaper directory.
+        cache_dir (str): Defaults to data/cache.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data", "cache")
+    real_path = os.path.realpath(root_path)
+    if real_path == os.path.realpath(KOMOREBI_WALLPAPER_DIRS_PATH):
+        return os.path.join(cache_dir, "library_index.sqlite")
+    return os.path.join(cache_dir, f"library_index-{hashlib.sha1(real_path.encode()).hexdigest()[:16]}.sqlite")
+
+
+class LibraryIndex:
+    """On-disk index of every wallpaper folder in the Komorebi wallpaper directory.
+
+    The index is stored in a SQLite file and is only rebuilt when the mtime of the wallpaper
+    directory changes (i.e., a folder was added, removed, or renamed). When rebuilding, folders
+    whose own mtime did not change are reused from the previous index instead of being re-read.
+
+    add, remove and rename only update the loaded entries (e.g., for changes reported by the watcher);
+    the file picks them up on the next load.
+    """
+
+    def __init__(self, root_path=KOMOREBI_WALLPAPER_DIRS_PATH, index_path=None):
+        self.root_path = root_path
+        if index_path is None:
+            index_path = index_file_path(root_path)
+        self.index_path = index_path
+        self.entries = {}
+        self.names = []
+
+    # ----------------------------
+
+    def load(self):
+        """Loads the index from disk, rescanning the wallpaper directory only if it changed since the last scan.
+
+        Returns:
+            list: The names of all wallpapers in the library.
+        """
+        root_mtime = os.stat(self.root_path).st_mtime_ns
+        connection = self._connect()
+        try:
+            meta = dict(connection.execute("SELECT key, value FROM meta").fetchall())
+            rows = connection.execute("SELECT name, video_file, thumbnail, size, mtime FROM wallpapers ORDER BY position").fetchall()
+            self._set_entries([WallpaperEntry(*row) for row in rows])
+
+            up_to_date = (
+                meta.get("version") == INDEX_VERSION
+                and meta.get("root_path") == self.root_path
+                and meta.get("root_mtime") == str(root_mtime)
+            )
+            if not up_to_date:
+                self._set_entries(self.scan())
+                self._save(connection, root_mtime)
+        finally:
+            connection.close()
+
+        return self.names
+
+    def scan(self):
+        """Scans the wallpaper directory, reusing entries of folders that have not been modified.
+
+        Returns:
+            list: A list of WallpaperEntry, one per wallpaper folder.
+        """
+        entries = []
+        with os.scandir(self.root_path) as folders:
+            for folder in folders:
+                if not folder.is_dir():
+                    continue
+                mtime = folder.stat().st_mtime_ns
+                previous = self.entries.get(folder.name)
+                if previous is not None and previous.mtime == mtime:
+                    entries.append(previous)
+                else:
+                    entries.append(self.read_entry(folder.name, mtime))
+        return entries
+
+    def read_entry(self, name, mtime=None):
+        """Reads a single wallpaper folder.
+
+        Args:
+            name (str): The name of the wallpaper folder.
+            mtime (int): The mtime (ns) of the folder. If None, it is read from disk.
+
+        Returns:
+            WallpaperEntry: The entry describing the wallpaper folder.
+        """
+        folder_path = os.path.join(self.root_path, name)
+        if mtime is None:
+            mtime = os.stat(folder_path).st_mtime_ns
+
+        video_file = ""
+        try:
+            video_file = KeyFile.from_file(os.path.join(folder_path, "config")).get_string("Info", "VideoFileName").strip()
+        except (OSError, UnicodeDecodeError, KeyFileError):
+            pass
+
+        size = 0
+        if video_file != "":
+            try:
+                size = os.stat(os.path.join(folder_path, video_file)).st_size
+            except OSError:
+                pass
+
+        thumbnail_path = os.path.join(folder_path, THUMBNAIL_FILE_NAME)
+        thumbnail = thumbnail_path if os.path.exists(thumbnail_path) else ""
+
+        return WallpaperEntry(name, video_file, thumbnail, size, mtime)
+
+    def add(self, name):
+        """Reads a wallpaper folder that was added to the library, without rescanning the others.
+
+        Returns:
+            WallpaperEntry: The entry, or None if the folder can't be read.
+        """
+        if name in self.entries:
+            return self.entries[name]
+        try:
+            entry = self.read_entry(name)
+        except OSError:
+            return None
+        self.entries[name] = entry
+        self.names.append(name)
+        return entry
+
+    def remove(self, name):
+        """Removes a wallpaper folder that was deleted from the library."""
+        if self.entries.pop(name, None) is not None:
+            self.names.remove(name)
+
+    def rename(self, old_name, new_name):
+        """Renames a wallpaper folder in the index, keeping its position."""
+        if new_name in self.entries:
+            self.remove(old_name)
+            return self.entries[new_name]
+        entry = self.entries.pop(old_name, None)
+        if entry is None:
+            return self.add(new_name)
+        thumbnail = os.path.join(self.root_path, new_name, THUMBNAIL_FILE_NAME) if entry.thumbnail != "" else ""
+        entry = entry._replace(name=new_name, thumbnail=thumbnail)
+        self.entries[new_name] = entry
+        self.names[self.names.index(old_name)] = new_name
+        return entry
+
+    def update(self, names):
+        """Re-reads wallpaper folders whose contents changed (e.g., a new VideoFileName) and saves them in the index.
+
+        Changes inside a folder don't change the mtime of the wallpaper directory, so load doesn't see them.
+        """
+        entries = []
+        for name in names:
+            if name in self.entries:
+                try:
+                    self.entries[name] = self.read_entry(name)
+                except OSError:
+                    continue
+                entries.append(self.entries[name])
+
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(
+                    "UPDATE wallpapers SET video_file = ?, thumbnail = ?, size = ?, mtime = ? WHERE name = ?",
+                    [(entry.video_file, entry.thumbnail, entry.size, entry.mtime, entry.name) for entry in entries],
+                )
+        finally:
+            connection.close()
+
+    def get(self, name):
+        """Gets the index entry of a wallpaper.
+
+        Returns:
+            WallpaperEntry: The entry, or None if the wallpaper is not in the library.
+        """
+        return self.entries.get(name)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    # ----------------------------
+
+    def _set_entries(self, entries):
+        self.entries = {entry.name: entry for entry in entries}
+        self.names = [entry.name for entry in entries]
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        connection = sqlite3.connect(self.index_path)
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS wallpapers ("
+            "name TEXT PRIMARY KEY, video_file TEXT, thumbnail TEXT, size INTEGER, mtime INTEGER, position INTEGER)"
+        )
+        return connection
+
+    def _save(self, connection, root_mtime):
+        with connection:
+            connection.execute("DELETE FROM wallpapers")
+            connection.executemany(
+                "INSERT INTO wallpapers (name, video_file, thumbnail, size, mtime, position) VALUES (?, ?, ?, ?, ?, ?)",
+                [(*self.entries[name], position) for position, name in enumerate(self.names)],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("version", INDEX_VERSION), ("root_path", self.root_path), ("root_mtime", str(root_mtime))],
+            )
@@ -0,0 +1,205 @@
+"""Checks every wallpaper folder in the Komorebi wallpaper directory and reports the broken ones.
+
+Usage:
+    python library_scanner.py [--json] [--fix] [--jobs 32]
+
+Problems found:
+    missing_config      the folder has no config file
+    bad_config          the config file can't be read
+    no_video            the config is of a video wallpaper but the folder has no video file at all
+    no_video_file_name  the config is of a video wallpaper but has no VideoFileName
+    video_file_missing  the VideoFileName in the config does not exist in the folder
+    no_thumbnail        the folder has no wallpaper.jpg
+
+With --fix, a missing config is created, a missing VideoFileName or one pointing to a missing file is pointed
+at the only video in the folder (if there is exactly one), and missing thumbnails are created with ffmpeg.
+
+With --delete-empty, folders whose config is of a video wallpaper but that have no video are deleted. Folders
+whose config is missing or can't be read are never deleted, since they may be image wallpapers.
+"""
+import argparse
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from import_pipeline import THUMBNAIL_FILE_NAME, VIDEO_FILE_EXTENSIONS, build_wallpaper_config, create_thumbnail
+from keyfile import KeyFile, KeyFileError
+from library_index import KOMOREBI_WALLPAPER_DIRS_PATH
+
+CONFIG_FILE_NAME = "config"
+
+
+class FolderReport:
+    """The result of checking one wallpaper folder."""
+
+    def __init__(self, name, problems, video_file="", video_files=None, wallpaper_type=""):
+        self.name = name
+        self.problems = problems
+        # The VideoFileName in the config
+        self.video_file = video_file
+        # The video files actually in the folder
+        self.video_files = video_files if video_files is not None else []
+        # The WallpaperType in the config ('' if the config is missing or can't be read)
+        self.wallpaper_type = wallpaper_type
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "problems": self.problems,
+            "video_file": self.video_file,
+            "video_files": self.video_files,
+        }
+
+
+def check_folder(folder_path):
+    """Checks a single wallpaper folder, listing it only once.
+
+    Returns:
+        FolderReport: The problems found in the folder (empty if it is fine).
+    """
+    video_files = []
+    file_names = set()
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            file_names.add(entry.name)
+            if os.path.splitext(entry.name)[1].lower() in VIDEO_FILE_EXTENSIONS:
+                video_files.append(entry.name)
+    video_files.sort()
+
+    problems = []
+    video_file = ""
+    wallpaper_type = ""
+    if CONFIG_FILE_NAME not in file_names:
+        problems.append("missing_config")
+    else:
+        try:
+            config = KeyFile.from_file(os.path.join(folder_path, CONFIG_FILE_NAME))
+            if config.has_key("Info", "WallpaperType"):
+                wallpaper_type = config.get_string("Info", "WallpaperType").strip()
+            if config.has_key("Info", "VideoFileName"):
+                video_file = config.get_string("Info", "VideoFileName").strip()
+        except (OSError, UnicodeDecodeError, KeyFileError):
+            wallpaper_type = ""
+            problems.append("bad_config")
+
+    # Only folders known to be video wallpapers need a video (image and web page wallpapers don't)
+    if wallpaper_type == "video":
+        if len(video_files) == 0:
+            problems.append("no_video")
+        elif video_file == "":
+            problems.append("no_video_file_name")
+        elif video_file not in file_names:
+            problems.append("video_file_missing")
+    if THUMBNAIL_FILE_NAME not in file_names:
+        problems.append("no_thumbnail")
+
+    return FolderReport(os.path.basename(folder_path), problems, video_file, video_files, wallpaper_type)
+
+
+def scan_library(root_path=KOMOREBI_WALLPAPER_DIRS_PATH, max_workers=32):
+    """Checks every wallpaper folder. Folders are checked in a thread pool because most of the time is spent waiting on storage.
+
+    Returns:
+        list: A FolderReport for every folder, in the order of the directory listing.
+    """
+    with os.scandir(root_path) as entries:
+        folder_paths = [entry.path for entry in entries if entry.is_dir()]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_try_check_folder, folder_paths))
+
+
+def fix_folder(root_path, report, repair=True, delete_empty=False):
+    """Fixes the problems of a folder that can be fixed without asking.
+
+    Args:
+        repair (bool): Create missing configs and thumbnails and point VideoFileName at the video.
+        delete_empty (bool): Delete the folder if its config is of a video wallpaper but it has no video.
+
+    Returns:
+        list: The actions that were taken (e.g., 'deleted', 'created thumbnail').
+    """
+    folder_path = os.path.join(root_path, report.name)
+    actions = []
+
+    if "no_video" in report.problems:
+        # no_video is only reported for configs that parsed as video wallpapers, never for missing or bad ones
+        if delete_empty and report.wallpaper_type == "video":
+            shutil.rmtree(folder_path)
+            return ["deleted"]
+        return []
+    if not repair:
+        return []
+
+    video_file = report.video_file
+    if "missing_config" in report.problems and len(report.video_files) == 1:
+        video_file = report.video_files[0]
+        build_wallpaper_config(video_file).save_to_file(os.path.join(folder_path, CONFIG_FILE_NAME))
+        actions.append(f"created config for '{video_file}'")
+
+    if ("video_file_missing" in report.problems or "no_video_file_name" in report.problems) and len(report.video_files) == 1:
+        video_file = report.video_files[0]
+        config_path = os.path.join(folder_path, CONFIG_FILE_NAME)
+        config = KeyFile.from_file(config_path)
+        config.set_string("Info", "VideoFileName", video_file)
+        config.save_to_file(config_path)
+        actions.append(f"set VideoFileName to '{video_file}'")
+
+    if "no_thumbnail" in report.problems:
+        if video_file == "" or not os.path.exists(os.path.join(folder_path, video_file)):
+            video_file = report.video_files[0] if report.video_files else ""
+        if video_file != "":
+            create_thumbnail(os.path.join(folder_path, video_file), os.path.join(folder_path, THUMBNAIL_FILE_NAME))
+            actions.append("created thumbnail")
+
+    return actions
+
+
+def _try_check_folder(folder_path):
+    try:
+        return check_folder(folder_path)
+    except OSError:
+        return FolderReport(os.path.basename(folder_path), ["unreadable"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check every Komorebi wallpaper folder and report the broken ones.")
+    parser.add_argument("--wallpaper-dir", default=KOMOREBI_WALLPAPER_DIRS_PATH, help="the Komorebi wallpaper directory")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--fix", action="store_true", help="repair configs and create missing thumbnails")
+    parser.add_argument("--delete-empty", action="store_true", help="delete folders whose config is of a video wallpaper but that have no video")
+    parser.add_argument("--jobs", type=int, default=32, help="folders checked at the same time")
+    args = parser.parse_args(argv)
+
+    reports = scan_library(args.wallpaper_dir, args.jobs)
+    broken = [report for report in reports if report.problems]
+
+    fixed = {}
+    if args.fix or args.delete_empty:
+        for report in broken:
+            try:
+                actions = fix_folder(args.wallpaper_dir, report, args.fix, args.delete_empty)
+            except Exception as e:
+                actions = [f"failed: {e}"]
+            if actions:
+                fixed[report.name] = actions
+
+    if args.json:
+        print(json.dumps({
+            "wallpaper_dir": args.wallpaper_dir,
+            "scanned": len(reports),
+            "broken": [report.to_dict() for report in broken],
+            "fixed": fixed,
+        }, indent=2))
+    else:
+        for report in broken:
+            print(f"{report.name}: {', '.join(report.problems)}")
+            for action in fixed.get(report.name, []):
+                print(f"    {action}")
+        print(f"\n{len(reports)} folders scanned, {len(broken)} with problems")
+
+    return 1 if broken and not (args.fix or args.delete_empty) else 0
+
+
+if __name__ == "__main__":
+    exit(main())
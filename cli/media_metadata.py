@@ -0,0 +1,375 @@
+"""Duration, resolution, codec, bitrate, frame rate and file size of the wallpaper videos, read with ffprobe.
+
+Usage:
+    python media_metadata.py [--jobs 8]                  Probe every video that isn't cached yet
+    python media_metadata.py "res<=1080 codec=h264"      List the wallpapers matching the filters
+    python media_metadata.py --json
+
+Each video is probed once; the results are cached by (path, size, mtime), so only new or modified videos are
+probed again. Searches filter on the cached values and never run ffprobe themselves.
+
+Filters are words of the form <field><op><value>, with op one of = : != < <= > >=:
+    res / height    res<=1080 (or res<=1080p)          width     width>=3840
+    fps             fps>=50                             codec     codec=h264, codec!=hevc
+    duration / dur  dur<30, dur<=2m (seconds, or m/h)   bitrate   bitrate<8m (bits/s, k/m/g)
+    size            size<100m (bytes, k/m/g)
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from file_cache import FileCache
+from library_index import KOMOREBI_WALLPAPER_DIRS_PATH, LibraryIndex
+
+MediaInfo = namedtuple("MediaInfo", ["duration", "width", "height", "codec", "bitrate", "fps", "size"])
+
+# field: op value, e.g., ('height', '<=', 1080)
+MediaFilter = namedtuple("MediaFilter", ["field", "op", "value"])
+
+FILTER_FIELDS = {
+    "res": "height",
+    "height": "height",
+    "width": "width",
+    "fps": "fps",
+    "duration": "duration",
+    "dur": "duration",
+    "bitrate": "bitrate",
+    "size": "size",
+    "codec": "codec",
+}
+FILTER_PATTERN = re.compile(r"^(" + "|".join(FILTER_FIELDS) + r")(<=|>=|!=|<|>|=|:)(\S+)$")
+UNIT_MULTIPLIERS = {"": 1, "k": 1000, "m": 1000 ** 2, "g": 1000 ** 3}
+SIZE_MULTIPLIERS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+DURATION_MULTIPLIERS = {"": 1, "s": 1, "m": 60, "h": 3600}
+# How many probed videos are written to the cache at a time, so an interrupted fill keeps its progress
+SAVE_EVERY = 200
+
+
+def probe(path):
+    """Reads the metadata of a video with ffprobe.
+
+    Returns:
+        MediaInfo: The metadata of the first video stream. Values ffprobe doesn't report are None.
+    """
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "stream=codec_name,width,height,avg_frame_rate,bit_rate:format=duration,bit_rate",
+            "-of", "json", path,
+        ],
+        check=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    output = json.loads(result.stdout or b"{}")
+    stream = (output.get("streams") or [{}])[0]
+    media_format = output.get("format") or {}
+    return MediaInfo(
+        duration=_to_number(media_format.get("duration"), float),
+        width=_to_number(stream.get("width"), int),
+        height=_to_number(stream.get("height"), int),
+        codec=stream.get("codec_name"),
+        bitrate=_to_number(stream.get("bit_rate") or media_format.get("bit_rate"), int),
+        fps=_frame_rate(stream.get("avg_frame_rate")),
+        size=os.path.getsize(path),
+    )
+
+
+def _to_number(value, number_type):
+    try:
+        return number_type(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _frame_rate(rate):
+    # ffprobe gives frame rates as fractions, e.g., '30000/1001'
+    numerator, _, denominator = (rate or "").partition("/")
+    numerator, denominator = _to_number(numerator, float), _to_number(denominator or "1", float)
+    if numerator is None or not denominator:
+        return None
+    return round(numerator / denominator, 3)
+
+
+class MetadataCache(FileCache):
+    """Media metadata of files, kept in a SQLite file and valid as long as the size and mtime match."""
+
+    def __init__(self, cache_path=None):
+        if cache_path is None:
+            cache_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data", "cache", "media_metadata.sqlite")
+        super().__init__(cache_path, "media", [
+            ("duration", "REAL"), ("width", "INTEGER"), ("height", "INTEGER"), ("codec", "TEXT"),
+            ("bitrate", "INTEGER"), ("fps", "REAL"), ("file_size", "INTEGER"),
+        ])
+
+    def get(self, path, size, mtime):
+        """Gets the cached metadata of a file, or None if it is not cached or the file changed."""
+        values = self.get_values(path, size, mtime)
+        return None if values is None else MediaInfo(*values)
+
+    def put(self, path, size, mtime, info):
+        self.put_values(path, size, mtime, info)
+
+
+class MediaMetadata:
+    """The media metadata of every wallpaper in a library, by wallpaper name.
+
+    load reads what is already cached (one stat per video, no probing). fill probes the rest in parallel,
+    and start does both in a background thread, so the metadata fills in while the library is used.
+    Queries (get, filter) only look at what is loaded and never probe.
+    """
+
+    def __init__(self, library, cache=None, max_workers=None):
+        """
+        Args:
+            library (LibraryIndex): The loaded library index.
+            cache (MetadataCache): Defaults to data/cache/media_metadata.sqlite.
+            max_workers (int): The maximum number of ffprobe processes at the same time. Defaults to the number of CPUs.
+        """
+        self.library = library
+        self.cache = cache if cache is not None else MetadataCache()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # wallpaper name -> MediaInfo
+        self.info = {}
+        # Names waiting for the background fill (None: the whole library)
+        self._queued = set()
+        self._queue_lock = threading.Lock()
+        self._thread = None
+
+    def get(self, name):
+        """Gets the metadata of a wallpaper's video, or None if it isn't known (yet)."""
+        return self.info.get(name)
+
+    def filter(self, names, filters):
+        """Keeps the wallpapers whose metadata matches every filter. Wallpapers without metadata are left out."""
+        if len(filters) == 0:
+            return names
+        return [name for name in names if matches(self.info.get(name), filters)]
+
+    def load(self, names=None):
+        """Loads the cached metadata of the wallpapers whose video didn't change.
+
+        Args:
+            names (list): Defaults to the whole library.
+
+        Returns:
+            list: The names of the wallpapers whose video has to be probed.
+        """
+        names = list(self.library.names if names is None else names)
+        with ThreadPoolExecutor(max_workers=min(32, self.max_workers * 4)) as executor:
+            stats = list(executor.map(self._stat, names))
+
+        missing = []
+        for name, stat in zip(names, stats):
+            if stat is None:
+                self.info.pop(name, None)
+                continue
+            path, size, mtime = stat
+            info = self.cache.get(path, size, mtime)
+            if info is None:
+                missing.append(name)
+            else:
+                self.info[name] = info
+        return missing
+
+    def fill(self, names=None, on_progress=None):
+        """Loads the cached metadata, then probes the videos that aren't cached, in parallel.
+
+        Args:
+            names (list): Defaults to the whole library.
+            on_progress (callable): Called with (done, total, name, error) after each probe.
+
+        Returns:
+            int: The number of videos probed.
+        """
+        missing = self.load(names)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for done, (name, error) in enumerate(executor.map(self._probe, missing), start=1):
+                if on_progress is not None:
+                    on_progress(done, len(missing), name, error)
+                if done % SAVE_EVERY == 0:
+                    self.cache.save()
+        self.cache.save()
+        return len(missing)
+
+    def start(self, names=None):
+        """Fills in the metadata in a background thread (see fill). Names given while a fill is running are
+        filled after it."""
+        with self._queue_lock:
+            if names is None:
+                self._queued = None
+            elif self._queued is not None:
+                self._queued.update(names)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._fill_queued, daemon=True)
+                self._thread.start()
+
+    def add(self, name):
+        self.start([name])
+
+    def remove(self, name):
+        self.info.pop(name, None)
+
+    def rename(self, old_name, new_name):
+        info = self.info.pop(old_name, None)
+        if info is not None:
+            self.info[new_name] = info
+        # The cache is keyed by path, so cache the video again under its new path
+        self.start([new_name])
+
+    # ----------------------------
+
+    def _fill_queued(self):
+        while True:
+            with self._queue_lock:
+                names = self._queued
+                if names is not None and len(names) == 0:
+                    self._thread = None
+                    return
+                self._queued = set()
+            self.fill(None if names is None else sorted(names))
+
+    def _video_path(self, name):
+        entry = self.library.entries.get(name)
+        if entry is None or entry.video_file == "":
+            return None
+        return os.path.join(self.library.root_path, name, entry.video_file)
+
+    def _stat(self, name):
+        path = self._video_path(name)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return path, stat.st_size, stat.st_mtime_ns
+
+    def _probe(self, name):
+        stat = self._stat(name)
+        if stat is None:
+            return name, "video not found"
+        path, size, mtime = stat
+        info = self.cache.get(path, size, mtime)
+        if info is None:
+            try:
+                info = probe(path)
+            except subprocess.CalledProcessError as e:
+                return name, f"ffprobe exited with status {e.returncode}"
+            except (OSError, ValueError) as e:
+                return name, str(e)
+            self.cache.put(path, size, mtime, info)
+        self.info[name] = info
+        return name, None
+
+
+def parse_filters(query):
+    """Splits the media filters (e.g., 'res<=1080 codec=h264') out of a search query.
+
+    Returns:
+        tuple: (text, filters) where text is the rest of the query and filters is a list of MediaFilter.
+    """
+    words = []
+    filters = []
+    for word in query.split(" "):
+        media_filter = parse_filter(word)
+        if media_filter is None:
+            words.append(word)
+        else:
+            filters.append(media_filter)
+    if len(filters) == 0:
+        return query, filters
+    return " ".join(words).strip(), filters
+
+
+def parse_filter(word):
+    """Parses one filter word (see the module docstring).
+
+    Returns:
+        MediaFilter: The filter, or None if the word isn't a valid filter.
+    """
+    match = FILTER_PATTERN.match(word.lower())
+    if match is None:
+        return None
+    field, op, value = FILTER_FIELDS[match.group(1)], match.group(2), match.group(3)
+    op = "=" if op == ":" else op
+    if field == "codec":
+        return MediaFilter(field, op, value) if op in ("=", "!=") else None
+
+    if field == "height":
+        value = value.removesuffix("p")
+    multipliers = {"size": SIZE_MULTIPLIERS, "bitrate": UNIT_MULTIPLIERS, "duration": DURATION_MULTIPLIERS}.get(field, {"": 1})
+    unit_match = re.fullmatch(r"(\d+(?:\.\d+)?)([a-z]?)", value)
+    if unit_match is None or unit_match.group(2) not in multipliers:
+        return None
+    return MediaFilter(field, op, float(unit_match.group(1)) * multipliers[unit_match.group(2)])
+
+
+def matches(info, filters):
+    """Checks whether metadata matches every filter. Unknown metadata (or unknown values) never match."""
+    if info is None:
+        return False
+    for media_filter in filters:
+        value = getattr(info, media_filter.field)
+        if value is None:
+            return False
+        if media_filter.field == "codec":
+            if (value.lower() == media_filter.value) != (media_filter.op == "="):
+                return False
+        elif not _compare(value, media_filter.op, media_filter.value):
+            return False
+    return True
+
+
+def _compare(value, op, target):
+    if op == "<":
+        return value < target
+    if op == "<=":
+        return value <= target
+    if op == ">":
+        return value > target
+    if op == ">=":
+        return value >= target
+    if op == "!=":
+        return value != target
+    return value == target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cache the media metadata of the wallpaper videos, or list the wallpapers matching filters.")
+    parser.add_argument("filters", nargs="?", default="", help="filters, e.g., 'res<=1080 codec=h264' (see the module docstring)")
+    parser.add_argument("--wallpaper-dir", default=KOMOREBI_WALLPAPER_DIRS_PATH, help="the Komorebi wallpaper directory")
+    parser.add_argument("--jobs", type=int, default=None, help="videos probed at the same time (default: number of CPUs)")
+    parser.add_argument("--json", action="store_true", help="print the metadata as JSON")
+    args = parser.parse_args(argv)
+
+    text, filters = parse_filters(args.filters)
+    if text != "":
+        parser.error(f"Invalid filter '{text}'")
+
+    library = LibraryIndex(args.wallpaper_dir)
+    library.load()
+    media = MediaMetadata(library, max_workers=args.jobs)
+
+    def print_progress(done, total, name, error):
+        if error is not None:
+            print(f"[WARNING] Could not probe '{name}': {error}")
+        elif done % 100 == 0 or done == total:
+            print(f"[PROBE] {done}/{total}")
+
+    media.fill(on_progress=None if args.json else print_progress)
+    names = media.filter(library.names, filters)
+    if args.json:
+        print(json.dumps({name: media.get(name)._asdict() for name in names if media.get(name) is not None}, indent=2))
+    elif filters:
+        for name in names:
+            print(name)
+    else:
+        print(f"[PROBE] Metadata of {len(media.info)}/{len(library.names)} wallpapers cached")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""Re-encodes the wallpaper videos into renditions that are cheap to decode on the monitors they play on.
+
+Usage:
+    python optimize.py [--jobs 2] [--resolution 1920x1080 --fps 60] [--dry-run]
+    python optimize.py --revert
+
+Komorebi decodes the video of a wallpaper continuously, so a 4K HEVC clip on a 1080p monitor costs a core
+for pixels that are never shown. Each video is scaled down to just cover the largest monitor, capped at
+its refresh rate, and encoded as H.264 tuned for fast decoding with closed GOPs and no audio, so it loops
+without a stall. Videos that already fit are left alone, and a rendition made for an earlier target that
+the original now fits is dropped again.
+
+The rendition is written next to the original (which is kept) and VideoFileName is pointed at it; the
+original is remembered as OriginalVideoFileName, which --revert switches back to. Finished wallpapers are
+recognised by their rendition file name, so an interrupted run picks up where it stopped.
+"""
+import argparse
+import os
+import re
+import subprocess
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from keyfile import KeyFile, KeyFileError
+from library_index import KOMOREBI_WALLPAPER_DIRS_PATH, LibraryIndex
+from media_metadata import MetadataCache, probe
+
+# The resolution and refresh rate of a monitor, or the target of a rendition
+MonitorMode = namedtuple("MonitorMode", ["width", "height", "fps"])
+
+CONFIG_FILE_NAME = "config"
+ORIGINAL_VIDEO_KEY = "OriginalVideoFileName"
+RENDITION_CRF = 20
+# Sources within this fraction of the target size are not worth re-encoding for their size alone
+SCALE_TOLERANCE = 0.05
+XRANDR_CONNECTED_PATTERN = re.compile(r"^\S+ connected (?:primary )?(\d+)x(\d+)\+\d+\+\d+")
+XRANDR_CURRENT_RATE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\*")
+
+
+def detect_monitor_modes():
+    """Gets the current resolution and refresh rate of every connected monitor with xrandr.
+
+    Returns:
+        list: A MonitorMode per monitor (empty if xrandr is not available).
+    """
+    try:
+        output = subprocess.run(["xrandr", "--current"], check=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return []
+
+    modes = []
+    geometry = None
+    for line in output.splitlines():
+        match = XRANDR_CONNECTED_PATTERN.match(line)
+        if match is not None:
+            geometry = (int(match.group(1)), int(match.group(2)))
+            continue
+        rate = XRANDR_CURRENT_RATE_PATTERN.search(line) if line.startswith(" ") else None
+        if geometry is not None and rate is not None:
+            modes.append(MonitorMode(*geometry, round(float(rate.group(1)))))
+            geometry = None
+    return modes
+
+
+def rendition_target(modes):
+    """Gets the rendition target for a set of monitors.
+
+    A wallpaper has one VideoFileName whichever monitor shows it, so the rendition has to suit the largest
+    monitor (and the fastest refresh rate).
+    """
+    return MonitorMode(max(mode.width for mode in modes), max(mode.height for mode in modes), max(mode.fps for mode in modes))
+
+
+def plan_rendition(info, target):
+    """Gets the size and frame rate of the rendition of a video.
+
+    The video is scaled (keeping its aspect ratio) so it just covers the target and never scaled up, and
+    its frame rate is capped at the target's.
+
+    Args:
+        info (MediaInfo): The metadata of the source video.
+        target (MonitorMode): The rendition target.
+
+    Returns:
+        MonitorMode: The size and frame rate of the rendition, or None if the video is already cheap to decode.
+    """
+    if not info.width or not info.height:
+        return None
+    scale = min(1.0, max(target.width / info.width, target.height / info.height))
+    fps = min(info.fps, target.fps) if info.fps else target.fps
+    if scale >= 1 - SCALE_TOLERANCE and info.codec == "h264" and (not info.fps or info.fps <= target.fps + 0.5):
+        return None
+    if scale >= 1 - SCALE_TOLERANCE:
+        scale = 1.0
+    # H.264 with 4:2:0 chroma needs even dimensions
+    width = max(2, int(info.width * scale) // 2 * 2)
+    height = max(2, int(info.height * scale) // 2 * 2)
+    return MonitorMode(width, height, fps)
+
+
+def rendition_file_name(video_file, target):
+    """Gets the file name of a video's rendition for a target (e.g., 'clip.1920x1080-60.mp4')."""
+    return f"{os.path.splitext(video_file)[0]}.{target.width}x{target.height}-{target.fps}.mp4"
+
+
+def encode_rendition(source_path, destination_path, mode, threads=0):
+    """Encodes a rendition with ffmpeg.
+
+    -tune fastdecode turns off the H.264 features that are most expensive to decode (CABAC, deblocking and
+    weighted prediction). Closed GOPs and a constant frame rate let the player seek back to the start
+    without decoding anything from the end.
+    """
+    gop = max(1, round(mode.fps)) * 2
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error", "-i", source_path,
+            "-map", "0:v:0", "-an", "-sn", "-dn",
+            "-vf", f"scale={mode.width}:{mode.height}:flags=lanczos,fps={mode.fps},format=yuv420p",
+            "-c:v", "libx264", "-preset", "slow", "-tune", "fastdecode", "-crf", str(RENDITION_CRF),
+            "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0", "-flags", "+cgop",
+            "-threads", str(threads), "-movflags", "+faststart", "-f", "mp4", destination_path,
+        ],
+        check=True, stdin=subprocess.DEVNULL,
+    )
+    return destination_path
+
+
+def optimize_video(source_path, rendition_path, target, info=None, threads=0):
+    """Makes the rendition of one video. Runs in a worker thread.
+
+    The rendition is written to a temporary file first, so an interrupted encode never looks finished.
+
+    Args:
+        info (MediaInfo): The metadata of the source video. Probed if None.
+
+    Returns:
+        tuple: (info, mode) where mode is the MonitorMode of the rendition, or None if the video already fits.
+    """
+    if info is None:
+        info = probe(source_path)
+    mode = plan_rendition(info, target)
+    if mode is None:
+        return info, None
+    temp_path = rendition_path + ".part"
+    try:
+        encode_rendition(source_path, temp_path, mode, threads)
+        os.replace(temp_path, rendition_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return info, mode
+
+
+def optimize_library(library, target, jobs=2, dry_run=False, names=None, cache=None):
+    """Makes a rendition of every wallpaper video that isn't cheap to decode on the target.
+
+    Args:
+        library (LibraryIndex): The loaded library index.
+        target (MonitorMode): The rendition target (see rendition_target).
+        jobs (int): The number of videos encoded at the same time. Each encode gets an equal share of the CPUs.
+        dry_run (bool): Only print what would be optimized.
+        names (list): Only optimize these wallpapers. Defaults to the whole library.
+        cache (MetadataCache): Metadata of the source videos. Defaults to the media metadata cache.
+
+    Returns:
+        dict: Lists of wallpaper names that were optimized ('optimized'), switched back to their original
+            because it fits now ('reverted'), already fit or were optimized by an earlier run ('skipped')
+            and failed ('failed').
+    """
+    cache = cache if cache is not None else MetadataCache()
+    summary = {"optimized": [], "reverted": [], "skipped": [], "failed": []}
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+
+    pending = []
+    for name in library.names if names is None else names:
+        config = _read_config(library, name)
+        if config is None:
+            # Image wallpapers and folders without a readable config have nothing to optimize
+            summary["skipped"].append(name)
+            continue
+        video_file = config.get_string("Info", "VideoFileName").strip()
+        original = config.get_string("Info", ORIGINAL_VIDEO_KEY).strip() if config.has_key("Info", ORIGINAL_VIDEO_KEY) else video_file
+        rendition = rendition_file_name(original, target)
+        folder_path = os.path.join(library.root_path, name)
+        if video_file == rendition and os.path.exists(os.path.join(folder_path, rendition)):
+            summary["skipped"].append(name)
+        else:
+            # uses_rendition: VideoFileName points at a rendition for another target
+            uses_rendition = video_file != original
+            pending.append((name, os.path.join(folder_path, original), os.path.join(folder_path, rendition), uses_rendition))
+
+    if dry_run:
+        for name, source_path, _, uses_rendition in pending:
+            info = _cached_info(cache, source_path)
+            mode = plan_rendition(info, target) if info is not None else None
+            if info is None:
+                print(f"[OPTIMIZE] Would probe '{name}' and encode it if it doesn't fit")
+            elif mode is None and uses_rendition:
+                print(f"[OPTIMIZE] Would switch '{name}' back to its original video, which already fits")
+            elif mode is None:
+                print(f"[OPTIMIZE] '{name}' already fits")
+            else:
+                print(f"[OPTIMIZE] Would encode '{name}' to {mode.width}x{mode.height} @ {mode.fps:g} fps")
+        return summary
+
+    # Threads only wait for ffmpeg, so there is nothing to gain from forking worker processes
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        # Only a few jobs are queued at a time, so an interrupted run leaves little unfinished work behind
+        queue = iter(pending)
+        running = {}
+        done = 0
+        while True:
+            for name, source_path, rendition_path, uses_rendition in queue:
+                info = _cached_info(cache, source_path)
+                future = executor.submit(optimize_video, source_path, rendition_path, target, info, threads)
+                running[future] = (name, source_path, rendition_path, uses_rendition)
+                if len(running) >= jobs * 2:
+                    break
+            if len(running) == 0:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, source_path, rendition_path, uses_rendition = running.pop(future)
+                done += 1
+                try:
+                    info, mode = future.result()
+                except subprocess.CalledProcessError as e:
+                    print(f"[ERROR] ({done}/{len(pending)}) '{name}' failed: {e.cmd[0]} exited with status {e.returncode}")
+                    summary["failed"].append(name)
+                    continue
+                except (OSError, ValueError) as e:
+                    print(f"[ERROR] ({done}/{len(pending)}) '{name}' failed: {e}")
+                    summary["failed"].append(name)
+                    continue
+                _cache_info(cache, source_path, info)
+                if mode is None and uses_rendition:
+                    # Like --revert: the rendition of an earlier target would only cost quality now
+                    _use_original(library, name)
+                    library.update([name])
+                    print(f"[OPTIMIZE] ({done}/{len(pending)}) '{name}' already fits, switched back to its original video")
+                    summary["reverted"].append(name)
+                    continue
+                if mode is None:
+                    print(f"[OPTIMIZE] ({done}/{len(pending)}) '{name}' already fits")
+                    summary["skipped"].append(name)
+                    continue
+                _use_rendition(library, name, os.path.basename(source_path), os.path.basename(rendition_path))
+                library.update([name])
+                print(f"[OPTIMIZE] ({done}/{len(pending)}) '{name}' -> {mode.width}x{mode.height} @ {mode.fps:g} fps")
+                summary["optimized"].append(name)
+            cache.save()
+
+    print(f"[OPTIMIZE] Optimized {len(summary['optimized'])}, reverted {len(summary['reverted'])}, skipped {len(summary['skipped'])}, {len(summary['failed'])} failed")
+    return summary
+
+
+def revert_library(library):
+    """Points VideoFileName back at the original video of every optimized wallpaper. Renditions are deleted.
+
+    Returns:
+        list: The names of the reverted wallpapers.
+    """
+    reverted = [name for name in library.names if _use_original(library, name)]
+    library.update(reverted)
+    return reverted
+
+
+def _read_config(library, name):
+    try:
+        config = KeyFile.from_file(os.path.join(library.root_path, name, CONFIG_FILE_NAME))
+    except (OSError, UnicodeDecodeError, KeyFileError):
+        return None
+    return config if config.has_key("Info", "VideoFileName") else None
+
+
+def _use_rendition(library, name, original, rendition):
+    folder_path = os.path.join(library.root_path, name)
+    config_path = os.path.join(folder_path, CONFIG_FILE_NAME)
+    config = KeyFile.from_file(config_path)
+    previous = config.get_string("Info", "VideoFileName").strip()
+    config.set_string("Info", "VideoFileName", rendition)
+    config.set_string("Info", ORIGINAL_VIDEO_KEY, original)
+    config.save_to_file(config_path)
+    # A rendition for an earlier target is replaced, never the original
+    if previous not in (original, rendition) and os.path.exists(os.path.join(folder_path, previous)):
+        os.remove(os.path.join(folder_path, previous))
+
+
+def _use_original(library, name):
+    # Returns whether the wallpaper had been optimized
+    config = _read_config(library, name)
+    if config is None or not config.has_key("Info", ORIGINAL_VIDEO_KEY):
+        return False
+    folder_path = os.path.join(library.root_path, name)
+    rendition = config.get_string("Info", "VideoFileName").strip()
+    original = config.get_string("Info", ORIGINAL_VIDEO_KEY).strip()
+    config.set_string("Info", "VideoFileName", original)
+    config.remove_key("Info", ORIGINAL_VIDEO_KEY)
+    config.save_to_file(os.path.join(folder_path, CONFIG_FILE_NAME))
+    if rendition != original and os.path.exists(os.path.join(folder_path, rendition)):
+        os.remove(os.path.join(folder_path, rendition))
+    return True
+
+
+def _cached_info(cache, path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return cache.get(path, stat.st_size, stat.st_mtime_ns)
+
+
+def _cache_info(cache, path, info):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return
+    cache.put(path, stat.st_size, stat.st_mtime_ns, info)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-encode wallpaper videos into renditions that are cheap to decode on your monitors.")
+    parser.add_argument("names", nargs="*", help="only optimize these wallpapers")
+    parser.add_argument("--resolution", help="target resolution, e.g. 1920x1080 (default: the largest connected monitor)")
+    parser.add_argument("--fps", type=int, default=None, help="target frame rate (default: the fastest monitor's refresh rate)")
+    parser.add_argument("--jobs", type=int, default=2, help="videos encoded at the same time")
+    parser.add_argument("--wallpaper-dir", default=KOMOREBI_WALLPAPER_DIRS_PATH, help="the Komorebi wallpaper directory")
+    parser.add_argument("--dry-run", action="store_true", help="only print what would be optimized")
+    parser.add_argument("--revert", action="store_true", help="switch every wallpaper back to its original video")
+    args = parser.parse_args(argv)
+
+    library = LibraryIndex(args.wallpaper_dir)
+    library.load()
+
+    if args.revert:
+        reverted = revert_library(library)
+        print(f"[OPTIMIZE] Reverted {len(reverted)} wallpapers to their original videos")
+        return 0
+
+    modes = detect_monitor_modes()
+    if args.resolution is not None:
+        match = re.fullmatch(r"(\d+)x(\d+)", args.resolution)
+        if match is None:
+            parser.error(f"Invalid resolution '{args.resolution}'")
+        modes = [MonitorMode(int(match.group(1)), int(match.group(2)), args.fps or max([mode.fps for mode in modes] or [60]))]
+    elif len(modes) == 0:
+        parser.error("Could not detect the monitors (is xrandr installed?). Give --resolution and --fps.")
+    target = rendition_target(modes)
+    if args.fps is not None:
+        target = target._replace(fps=args.fps)
+    print(f"[OPTIMIZE] Target: {target.width}x{target.height} @ {target.fps} fps")
+
+    names = args.names or None
+    if names is not None:
+        unknown = [name for name in names if name not in library]
+        if unknown:
+            parser.error(f"Unknown wallpapers: {', '.join(unknown)}")
+
+    try:
+        summary = optimize_library(library, target, max(1, args.jobs), args.dry_run, names)
+    except KeyboardInterrupt:
+        exit("\nStopped. Run again to continue where it stopped.")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,88 @@
+import re
+import shutil
+import sys
+
+ANSI_ESCAPE_PATTERN = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+
+class ScreenRenderer:
+    """Draws full-screen frames to the terminal, only rewriting the lines that changed since the last frame.
+
+    The renderer keeps the last frame it drew as a virtual screen buffer. Rendering a new frame writes
+    ANSI escape sequences that move the cursor to each changed line and rewrite it, so nothing is cleared
+    and no external `clear` process is spawned. Anything printed to the terminal outside of the renderer
+    makes the buffer stale, so callers should call invalidate() after printing directly.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stdout
+        self.lines = None
+
+    def size(self):
+        """Gets the size of the terminal.
+
+        Returns:
+            tuple: (columns, lines)
+        """
+        return shutil.get_terminal_size()
+
+    def clear(self):
+        """Clears the terminal and moves the cursor to the top left corner."""
+        self.stream.write("\x1b[2J\x1b[H")
+        self.stream.flush()
+        self.lines = []
+
+    def invalidate(self):
+        """Marks the screen as unknown so the next frame is drawn from scratch."""
+        self.lines = None
+
+    def render(self, lines):
+        """Draws a frame, leaving the cursor at the end of the last line.
+
+        Args:
+            lines (list): The lines of the frame (may contain ANSI color codes, but no newlines).
+        """
+        output = []
+        if self.lines is None:
+            output.append("\x1b[2J")
+            previous = []
+        else:
+            previous = self.lines
+
+        for row, line in enumerate(lines):
+            if row >= len(previous) or previous[row] != line:
+                output.append(f"\x1b[{row + 1};1H{line}\x1b[K")
+
+        # Put the cursor at the end of the last line (the prompt) and erase everything after it,
+        # which removes leftovers of a longer previous frame
+        if len(lines) > 0:
+            output.append(f"\x1b[{len(lines)};{visible_length(lines[-1]) + 1}H")
+        else:
+            output.append("\x1b[H")
+        output.append("\x1b[J")
+
+        self.stream.write("".join(output))
+        self.stream.flush()
+        self.lines = list(lines)
+
+
+def visible_length(text):
+    """Gets the number of characters of a string that are displayed (ignoring ANSI escape codes)."""
+    return len(ANSI_ESCAPE_PATTERN.sub("", text))
+
+
+def result_window(num_results, index, height):
+    """Gets the range of results to show so that the selected result is always visible.
+
+    Args:
+        num_results (int): The total number of results.
+        index (int): The index of the selected result.
+        height (int): The number of lines available for results.
+
+    Returns:
+        tuple: (start, end) indexes of the results to show.
+    """
+    if num_results <= height:
+        return 0, num_results
+    start = max(0, min(index - height // 2, num_results - height))
+    return start, start + height
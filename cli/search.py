@@ -0,0 +1,273 @@
+import bisect
+import heapq
+import re
+import threading
+
+# How many names a cancellable search checks between two calls of its cancelled callback
+CANCEL_CHECK_INTERVAL = 4096
+
+
+class SearchEngine:
+    """Case-insensitive substring search over the wallpaper names.
+
+    Names are lowercased once when the engine is created. A trigram index is built in a background
+    thread so startup is not blocked; until it is ready, queries fall back to a linear scan of the
+    pre-lowercased names. When a query extends the previous query (e.g., the user typed another
+    character), only the previous results are searched.
+
+    The engine also has a ranked mode (see ranked_search), which ranks fuzzy matches by tag hits,
+    recency and favorites and returns only the best results.
+
+    Names can be added, removed and renamed in place (see add, remove and rename), so the engine does not
+    have to be rebuilt when the library changes. Removed names keep their id but never match again.
+    """
+
+    def __init__(self, names, build_index=True):
+        self.names = list(names)
+        self.lowered = [name.lower() for name in self.names]
+        self.trigrams = None
+        # Guards the trigram index against names being added while it is built
+        self._lock = threading.Lock()
+        self._last_query = None
+        self._last_ids = None
+
+        # Ranked search state
+        self.ids = {name: index for index, name in enumerate(self.names)}
+        self.tags = [frozenset(tag for tag in name.split("-") if tag != "") if "-" in name else frozenset() for name in self.lowered]
+        self.tag_ids = {}
+        for index, tags in enumerate(self.tags):
+            for tag in tags:
+                self.tag_ids.setdefault(tag, set()).add(index)
+        self.char_masks = {}
+        self.boosts = {}
+        self.rank_order = sorted(range(len(self.names)), key=lambda index: len(self.lowered[index]))
+
+        if build_index:
+            threading.Thread(target=self.build_trigrams, daemon=True).start()
+
+    def build_trigrams(self):
+        """Builds the trigram index, which maps every 3 character sequence to the ids of the names that contain it."""
+        trigrams = {}
+        count = len(self.lowered)
+        for index in range(count):
+            self._add_trigrams(trigrams, index)
+        with self._lock:
+            # Names added while the index was built
+            for index in range(count, len(self.lowered)):
+                self._add_trigrams(trigrams, index)
+            self.trigrams = trigrams
+
+    def _add_trigrams(self, trigrams, index):
+        name = self.lowered[index]
+        for trigram in {name[i:i + 3] for i in range(len(name) - 2)}:
+            postings = trigrams.get(trigram)
+            if postings is None:
+                trigrams[trigram] = [index]
+            else:
+                postings.append(index)
+
+    def add(self, name):
+        """Adds a name to the index. Does nothing if the name is already in it."""
+        self._add(name)
+
+    def remove(self, name):
+        """Removes a name from the index. Does nothing if the name is not in it."""
+        with self._lock:
+            index = self.ids.pop(name, None)
+            if index is None:
+                return
+            # Stale trigram postings are harmless: the name never matches again
+            self.rank_order.remove(index)
+            self.names[index] = None
+            self.lowered[index] = ""
+            for tag in self.tags[index]:
+                self.tag_ids[tag].discard(index)
+            self.tags[index] = frozenset()
+            for char_mask in self.char_masks.values():
+                char_mask[index] = 0
+            self.boosts.pop(index, None)
+            self._last_query = None
+
+    def rename(self, old_name, new_name):
+        """Renames a name in the index, keeping its boost."""
+        boost = self.boosts.get(self.ids.get(old_name))
+        self.remove(old_name)
+        self._add(new_name, boost)
+
+    def _add(self, name, boost=None):
+        with self._lock:
+            if name in self.ids:
+                return
+            index = len(self.names)
+            lowered = name.lower()
+            self.names.append(name)
+            self.lowered.append(lowered)
+            self.ids[name] = index
+            tags = frozenset(tag for tag in lowered.split("-") if tag != "") if "-" in lowered else frozenset()
+            self.tags.append(tags)
+            for tag in tags:
+                self.tag_ids.setdefault(tag, set()).add(index)
+            for char, char_mask in self.char_masks.items():
+                char_mask.append(char in lowered)
+            if self.trigrams is not None:
+                self._add_trigrams(self.trigrams, index)
+            if boost:
+                self.boosts[index] = boost
+            bisect.insort(self.rank_order, index, key=self._rank_key)
+            self._last_query = None
+
+    def search(self, query, cancelled=None):
+        """Finds every name containing the query (case-insensitive).
+
+        Args:
+            query (str): The text to search for.
+            cancelled (callable): Checked while searching; if it returns True, the search stops (e.g., because
+                the user typed another key and this query's results would never be shown).
+
+        Returns:
+            list: The matching names, in library order, or None if the search was cancelled.
+        """
+        query = query.lower()
+        if query == "":
+            self._last_query = None
+            return [name for name in self.names if name is not None]
+
+        if self._last_query is not None and self._last_query in query:
+            # Narrowing: anything matching the new query also matched the previous one
+            candidates = self._last_ids
+        elif len(query) >= 3 and self.trigrams is not None:
+            candidates = self._trigram_candidates(query)
+        else:
+            candidates = range(len(self.lowered))
+
+        lowered = self.lowered
+        if cancelled is None:
+            ids = [index for index in candidates if query in lowered[index]]
+        else:
+            ids = []
+            for start in range(0, len(candidates), CANCEL_CHECK_INTERVAL):
+                if cancelled():
+                    return None
+                ids += [index for index in candidates[start:start + CANCEL_CHECK_INTERVAL] if query in lowered[index]]
+
+        self._last_query = query
+        self._last_ids = ids
+        return [self.names[index] for index in ids]
+
+    def _trigram_candidates(self, query):
+        # The rarest trigram of the query gives the smallest set of names that can possibly match
+        smallest = None
+        for i in range(len(query) - 2):
+            postings = self.trigrams.get(query[i:i + 3])
+            if postings is None:
+                return []
+            if smallest is None or len(postings) < len(smallest):
+                smallest = postings
+        return smallest
+
+    def set_boosts(self, recent, favorites, recency_weight=6.0, favorite_weight=4.0):
+        """Sets how much recently used and favorite wallpapers are preferred by ranked_search.
+
+        Args:
+            recent (list): Recently used wallpapers, most recent first.
+            favorites (list): Favorite wallpapers.
+            recency_weight (float): Boost of the most recent wallpaper. Older ones get linearly less.
+            favorite_weight (float): Boost of favorites.
+        """
+        boosts = {}
+        for rank, name in enumerate(recent):
+            index = self.ids.get(name)
+            if index is not None and index not in boosts:
+                boosts[index] = recency_weight * (1 - rank / len(recent))
+        for name in favorites:
+            index = self.ids.get(name)
+            if index is not None:
+                boosts[index] = boosts.get(index, 0.0) + favorite_weight
+        self.boosts = boosts
+
+        # Boosted names first (highest boost first), then all other names from shortest to longest
+        boosted = sorted(boosts, key=self._rank_key)
+        self.rank_order = boosted + [index for index in sorted(range(len(self.names)), key=lambda index: len(self.lowered[index])) if index not in boosts and self.names[index] is not None]
+
+    def ranked_search(self, query, limit=50):
+        """Finds the names that best match the query.
+
+        Matches are ranked by tier, then by boost (see set_boosts), then shortest name first. The tiers are:
+            1. Every word of the query is a tag of the name (tags are separated by a dash, like in UI.get_tags)
+            2. Every word of the query appears at the start of a word in the name
+            3. Every word of the query appears in the name
+            4. The characters of the query appear in the name in order (fuzzy subsequence)
+
+        Only the best `limit` results are computed: the tiers are filled in order and the search stops
+        as soon as enough results are found.
+
+        Args:
+            query (str): The text to search for. Spaces and dashes separate words.
+            limit (int): The maximum number of results.
+
+        Returns:
+            list: Up to limit names, best match first.
+        """
+        words = [word for word in re.split(r"[\s-]+", query.lower()) if word != ""]
+        chars = "".join(words)
+        if chars == "":
+            return [self.names[index] for index in heapq.nsmallest(limit, self.boosts, key=self._rank_key)]
+
+        results = []
+        seen = set()
+
+        def take(indexes):
+            for index in indexes:
+                if index not in seen:
+                    seen.add(index)
+                    results.append(index)
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        # Tier 1 comes straight from the tag index
+        tagged = set.intersection(*(self.tag_ids.get(word, set()) for word in words))
+        if take(heapq.nsmallest(limit, tagged, key=self._rank_key)):
+            return [self.names[index] for index in results]
+
+        # Only names containing every character of the query can match the remaining tiers
+        mask = self._char_mask(chars)
+        candidate_count = mask.count(1)
+        if candidate_count <= 4 * limit:
+            candidates = sorted((match.start() for match in re.finditer(b"\x01", mask)), key=self._rank_key)
+        else:
+            candidates = [index for index in self.rank_order if mask[index]]
+
+        lowered = self.lowered
+        if len(words) == 1:
+            word = words[0]
+            containing = [index for index in candidates if word in lowered[index]]
+        else:
+            containing = [index for index in candidates if all(word in lowered[index] for word in words)]
+        word_starts = [(word, "-" + word, "_" + word, " " + word) for word in words]
+        at_word_start = (
+            index for index in containing
+            if all(lowered[index].startswith(word) or dash in lowered[index] or underscore in lowered[index] or space in lowered[index] for word, dash, underscore, space in word_starts)
+        )
+        if take(at_word_start) or take(containing):
+            return [self.names[index] for index in results]
+
+        fuzzy = re.compile(".*?".join(re.escape(char) for char in chars)).search
+        take(index for index in candidates if index not in seen and fuzzy(lowered[index]) is not None)
+
+        return [self.names[index] for index in results]
+
+    def _rank_key(self, index):
+        return (-self.boosts.get(index, 0.0), len(self.lowered[index]), index)
+
+    def _char_mask(self, chars):
+        # One byte per name, 1 if the name contains every character in chars. The per-character masks are
+        # bytearrays so add and remove can update them in place
+        mask = None
+        for char in set(chars):
+            char_mask = self.char_masks.get(char)
+            if char_mask is None:
+                char_mask = bytearray(char in name for name in self.lowered)
+                self.char_masks[char] = char_mask
+            mask = char_mask if mask is None else (int.from_bytes(mask, "big") & int.from_bytes(char_mask, "big")).to_bytes(len(mask), "big")
+        return mask
@@ -0,0 +1,315 @@
+import os
+import shutil
+
+from control import control_socket_path, reload_wallpaper
+from favorites import FavoritesStore
+from history import HistoryStore
+from komorebi_config import KomorebiConfig, locate_config_file
+from launcher import find_monitor_indexes
+from media_metadata import MediaMetadata, parse_filters
+from library_index import ILLEGAL_NAME_CHARS, KOMOREBI_WALLPAPER_DIRS_PATH, LibraryIndex
+from search import SearchEngine
+from shuffle import ShuffleEngine
+from thumbnails import THUMBNAIL_WIDTHS, ThumbnailCache
+from watcher import LibraryWatcher
+
+MAX_RECENT_HISTORY = 25
+MAX_SHUFFLE_HISTORY = 100
+
+
+class ServiceError(Exception):
+    """Raised when a command can't be carried out (e.g., unknown wallpaper or a name that is taken)."""
+
+
+class WallpaperService:
+    """The wallpaper library, search index, history, favorites and per-monitor state, without any UI.
+
+    Every command returns plain data (lists, dicts, strings) so it can be printed, sent as JSON by the
+    daemon, or used from scripts. Commands are not thread safe; the daemon runs them one at a time.
+    """
+
+    def __init__(self, wallpaper_dirs_path=KOMOREBI_WALLPAPER_DIRS_PATH, lists_dir=None, home_path=None):
+        if lists_dir is None:
+            lists_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data", "lists")
+        self.wallpaper_dirs_path = wallpaper_dirs_path
+        self.home_path = home_path
+        self.favorites_path = os.path.join(lists_dir, "favorites.txt")
+        self.history_path = os.path.join(lists_dir, "history.txt")
+
+        self.library = LibraryIndex(wallpaper_dirs_path)
+        self.library.load()
+        self.history = HistoryStore(self.history_path)
+        self.favorites = FavoritesStore(self.favorites_path)
+        self.favorites.load()
+        # Built on first use, so one-shot commands (e.g., 'set' from a script) don't pay for them
+        self._search_engine = None
+        self._shuffle_engine = None
+        self._media = None
+        self._thumbnails = None
+        # monitor index -> KomorebiConfig, located on first use
+        self.configs = {}
+        self.watcher = None
+
+    @property
+    def search_engine(self):
+        if self._search_engine is None:
+            self._search_engine = SearchEngine(self.library.names)
+            self._search_engine.set_boosts(self.history.recent(MAX_RECENT_HISTORY), self.favorites)
+        return self._search_engine
+
+    @property
+    def shuffle_engine(self):
+        if self._shuffle_engine is None:
+            self._shuffle_engine = ShuffleEngine(self.library.names, self.get_favorites(), self.history.recent(MAX_SHUFFLE_HISTORY))
+        return self._shuffle_engine
+
+    @property
+    def media(self):
+        if self._media is None:
+            self._media = MediaMetadata(self.library)
+            missing = self._media.load()
+            # When watching, the missing ones are filled in the background (see watch)
+            if self.watcher is None and len(missing) > 0:
+                print(f"[WARNING] {len(missing)} wallpapers have no media metadata yet. Run media_metadata.py to probe them.")
+        return self._media
+
+    @property
+    def thumbnails(self):
+        if self._thumbnails is None:
+            self._thumbnails = ThumbnailCache()
+        return self._thumbnails
+
+    def watch(self):
+        """Starts watching the library and list files. Changes are applied before each command (see apply_changes).
+
+        Also fills in the media metadata of the library in the background.
+        """
+        self.watcher = LibraryWatcher(self.wallpaper_dirs_path, [self.favorites_path, self.history_path])
+        self.watcher.start()
+        self.media.start()
+
+    def close(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        if self._thumbnails is not None:
+            self._thumbnails.close()
+            self._thumbnails = None
+
+    def apply_changes(self):
+        """Applies the changes the watcher saw since the last call."""
+        events = self.watcher.drain() if self.watcher is not None else []
+        if len(events) == 0:
+            return
+
+        changed = set()
+        for event in events:
+            if event.kind == "added":
+                if self.library.add(event.name) is not None:
+                    self._each_engine("add", event.name)
+            elif event.kind == "changed":
+                changed.add(event.name)
+            elif event.kind == "removed":
+                self.library.remove(event.name)
+                self._each_engine("remove", event.name)
+            elif event.kind == "renamed":
+                self.library.rename(event.name, event.new_name)
+                self._each_engine("rename", event.name, event.new_name)
+            elif event.kind == "list_changed" and event.name == self.favorites_path:
+                self.favorites.load()
+                if self._shuffle_engine is not None:
+                    self._shuffle_engine.set_favorites(self.get_favorites())
+            elif event.kind == "list_changed" and event.name == self.history_path:
+                self.history.reload()
+            elif event.kind == "rescan":
+                self.library.load()
+                self._search_engine = self._shuffle_engine = None
+                if self._media is not None:
+                    self._media.start()
+
+        # New folders are read as soon as they are created, before their config and video are written
+        changed = [name for name in changed if name in self.library]
+        if changed:
+            self.library.update(changed)
+            if self._media is not None:
+                self._media.start(changed)
+
+        if self._search_engine is not None:
+            self._search_engine.set_boosts(self.history.recent(MAX_RECENT_HISTORY), self.favorites)
+
+    # ----------------------------
+
+    def search(self, query="", ranked=False, limit=None):
+        """Finds wallpapers by name (see SearchEngine.search and SearchEngine.ranked_search), keeping only the
+        ones that match the media filters in the query (e.g., 'rain res<=1080 codec=h264', see media_metadata).
+
+        Returns:
+            list: The matching wallpaper names.
+        """
+        query, filters = parse_filters(query)
+        if ranked and not (filters and query.strip() == ""):
+            # Filters drop results, so rank everything and keep the best that pass
+            results = self.search_engine.ranked_search(query, len(self.library) if filters else limit or 50)
+            limit = limit or 50
+        else:
+            # Also used for ranked searches that are only filters, which have nothing to rank by
+            results = self.search_engine.search(query)
+        if filters:
+            results = self.media.filter(results, filters)
+        return results if limit is None else results[:limit]
+
+    def set(self, wallpaper, monitor="0"):
+        """Sets the wallpaper of a monitor and tells its Komorebi instance to switch to it.
+
+        Returns:
+            dict: The wallpaper, the monitor and whether the running instance switched ('reloaded'). If it
+                didn't, the wallpaper is shown the next time Komorebi starts.
+        """
+        self._check_exists(wallpaper)
+        config = self.config(monitor)
+        config.set_wallpaper_name(wallpaper)
+        self.history.append(wallpaper, monitor)
+        if self._shuffle_engine is not None:
+            self._shuffle_engine.record(wallpaper)
+        reloaded = reload_wallpaper(control_socket_path(config.path))
+        return {"wallpaper": wallpaper, "monitor": str(monitor), "reloaded": reloaded}
+
+    def shuffle(self, monitor="0", query=None):
+        """Sets a random wallpaper (see ShuffleEngine), picked from the search results of query if given.
+
+        Returns:
+            dict: Like set.
+        """
+        wallpaper = self.shuffle_engine.pick(None if not query else self.search(query))
+        if wallpaper is None:
+            raise ServiceError("Nothing to pick from")
+        return self.set(wallpaper, monitor)
+
+    def active(self, monitor="0"):
+        """Gets the wallpaper set in the config of a monitor ('' if none)."""
+        return self.config(monitor).get_wallpaper_name()
+
+    def recent(self, count=MAX_RECENT_HISTORY, monitor=None):
+        return self.history.recent(count, monitor)
+
+    def get_favorites(self):
+        """Gets the favorites that exist in the library."""
+        return [favorite for favorite in self.favorites if favorite in self.library]
+
+    def fav(self, wallpaper):
+        self._check_exists(wallpaper)
+        added = self.favorites.add(wallpaper)
+        if self._shuffle_engine is not None:
+            self._shuffle_engine.set_favorites(self.get_favorites())
+        return {"wallpaper": wallpaper, "added": added}
+
+    def unfav(self, wallpaper):
+        removed = self.favorites.remove(wallpaper)
+        if self._shuffle_engine is not None:
+            self._shuffle_engine.set_favorites(self.get_favorites())
+        return {"wallpaper": wallpaper, "removed": removed}
+
+    def rename(self, wallpaper, new_name):
+        """Renames a wallpaper folder and updates the favorites and every monitor showing it.
+
+        Returns:
+            dict: The old and new names.
+        """
+        self._check_exists(wallpaper)
+        new_name = new_name.strip()
+        if new_name == "":
+            raise ServiceError("Name cannot be empty")
+        if new_name in self.library or os.path.exists(os.path.join(self.wallpaper_dirs_path, new_name)):
+            raise ServiceError(f"Name '{new_name}' already exists")
+        if any(char in new_name for char in ILLEGAL_NAME_CHARS):
+            raise ServiceError("Name cannot contain any of the following characters: " + ", ".join(ILLEGAL_NAME_CHARS))
+
+        os.rename(os.path.join(self.wallpaper_dirs_path, wallpaper), os.path.join(self.wallpaper_dirs_path, new_name))
+        self.library.rename(wallpaper, new_name)
+        self._each_engine("rename", wallpaper, new_name)
+        self.favorites.rename(wallpaper, new_name)
+
+        for monitor in self._monitors_showing(wallpaper):
+            config = self.config(monitor)
+            config.set_wallpaper_name(new_name)
+            reload_wallpaper(control_socket_path(config.path))
+        return {"wallpaper": wallpaper, "new_name": new_name}
+
+    def delete(self, wallpaper):
+        """Deletes a wallpaper folder. Monitors showing it switch to a random favorite (or any wallpaper).
+
+        Returns:
+            dict: The deleted wallpaper and monitor -> replacement wallpaper.
+        """
+        self._check_exists(wallpaper)
+        self.favorites.remove(wallpaper)
+        showing = self._monitors_showing(wallpaper)
+
+        shutil.rmtree(os.path.join(self.wallpaper_dirs_path, wallpaper))
+        self.library.remove(wallpaper)
+        self._each_engine("remove", wallpaper)
+
+        replacements = {}
+        for monitor in showing:
+            favorites = self.get_favorites()
+            replacement = self.shuffle_engine.pick(favorites if favorites else None)
+            if replacement is not None:
+                self.set(replacement, monitor)
+                replacements[monitor] = replacement
+        return {"wallpaper": wallpaper, "replacements": replacements}
+
+    def thumbnail(self, wallpaper, size="medium", wait=False):
+        """Gets a thumbnail of a wallpaper from the thumbnail cache (see thumbnails.py).
+
+        Without wait, a missing thumbnail is made in the background and 'path' is None until it is ready, so a
+        browser can show the others and ask again later.
+
+        Returns:
+            dict: The wallpaper, the size and the path of the thumbnail ('path', None if not ready).
+        """
+        self._check_exists(wallpaper)
+        if size not in THUMBNAIL_WIDTHS:
+            raise ServiceError(f"Unknown thumbnail size '{size}', expected one of {', '.join(THUMBNAIL_WIDTHS)}")
+        entry = self.library.get(wallpaper)
+        if entry.video_file == "":
+            raise ServiceError(f"Wallpaper '{wallpaper}' has no video")
+        video_file_path = os.path.join(self.wallpaper_dirs_path, wallpaper, entry.video_file)
+        return {"wallpaper": wallpaper, "size": size, "path": self.thumbnails.get(video_file_path, size, wait)}
+
+    def status(self):
+        return {
+            "wallpapers": len(self.library),
+            "favorites": len(self.get_favorites()),
+            "monitors": {monitor: self.active(monitor) for monitor in self.monitor_indexes()},
+        }
+
+    # ----------------------------
+
+    def config(self, monitor):
+        """Gets the cached config of a monitor, locating its config file the first time."""
+        monitor = str(monitor)
+        config = self.configs.get(monitor)
+        if config is None:
+            if not monitor.isdigit():
+                raise ServiceError(f"Invalid monitor index '{monitor}'")
+            path = locate_config_file(f".Komorebi{monitor}.prop", self.home_path)
+            config = self.configs[monitor] = KomorebiConfig(path)
+        return config
+
+    def monitor_indexes(self):
+        """Gets the monitors that have a config file, next to the config file of the primary monitor."""
+        return find_monitor_indexes(os.path.dirname(self.config("0").path))
+
+    def _each_engine(self, method, *args):
+        # Engines that weren't built yet will see the change when they are
+        for engine in (self._search_engine, self._shuffle_engine, self._media):
+            if engine is not None:
+                getattr(engine, method)(*args)
+
+    def _monitors_showing(self, wallpaper):
+        return [monitor for monitor in self.monitor_indexes() if self.config(monitor).get_wallpaper_name() == wallpaper]
+
+    def _check_exists(self, wallpaper):
+        if wallpaper not in self.library:
+            raise ServiceError(f"Wallpaper '{wallpaper}' does not exist in {self.wallpaper_dirs_path}")
+
@@ -0,0 +1,275 @@
+"""Weighted, non-repeating shuffle of the wallpaper library, and a rotation mode that changes the wallpaper
+of each monitor every N minutes.
+
+Usage:
+    python shuffle.py --every 15 --monitor 0 --monitor 1
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from control import control_socket_path, reload_wallpaper
+from favorites import FavoritesStore
+from history import HistoryStore
+from komorebi_config import KomorebiConfig, locate_config_file
+from library_index import KOMOREBI_WALLPAPER_DIRS_PATH, LibraryIndex
+
+# Weights are kept as integers so the sums in the Fenwick tree never drift
+WEIGHT_SCALE = 1000
+
+
+class FenwickSampler:
+    """Picks an index at random with probability proportional to its weight.
+
+    The weights are kept in a Fenwick (binary indexed) tree, so changing one weight, appending one and
+    picking are all O(log n).
+    """
+
+    def __init__(self, weights=()):
+        self.weights = [int(weight) for weight in weights]
+        size = len(self.weights)
+        self.tree = [0] * (size + 1)
+        for i in range(1, size + 1):
+            self.tree[i] += self.weights[i - 1]
+            parent = i + (i & -i)
+            if parent <= size:
+                self.tree[parent] += self.tree[i]
+
+    def __len__(self):
+        return len(self.weights)
+
+    def total(self):
+        return self._prefix_sum(len(self.weights))
+
+    def update(self, index, weight):
+        weight = int(weight)
+        delta = weight - self.weights[index]
+        if delta == 0:
+            return
+        self.weights[index] = weight
+        i = index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def append(self, weight):
+        """Adds an index with the given weight at the end.
+
+        Returns:
+            int: The new index.
+        """
+        weight = int(weight)
+        i = len(self.tree)
+        # The new node covers the indexes (i - lowbit(i), i]
+        self.tree.append(weight + self._prefix_sum(i - 1) - self._prefix_sum(i - (i & -i)))
+        self.weights.append(weight)
+        return i - 1
+
+    def sample(self, rng=random):
+        """Picks an index.
+
+        Returns:
+            int: The index, or None if every weight is 0.
+        """
+        total = self.total()
+        if total <= 0:
+            return None
+        target = rng.randrange(total)
+        position = 0
+        step = 1 << (len(self.weights).bit_length() - 1)
+        while step > 0:
+            if position + step <= len(self.weights) and self.tree[position + step] <= target:
+                position += step
+                target -= self.tree[position]
+            step >>= 1
+        return position
+
+    def _prefix_sum(self, count):
+        total = 0
+        while count > 0:
+            total += self.tree[count]
+            count -= count & -count
+        return total
+
+
+class ShuffleEngine:
+    """Picks random wallpapers, preferring favorites and avoiding the recently used ones.
+
+    The weight of a wallpaper is favorite_weight if it is a favorite (1 otherwise), multiplied by how long
+    ago it was used: the last `window` picks can't be picked again, and the others among the last
+    `recent_count` used wallpapers get a weight that grows linearly with how long ago they were used.
+    Every pick moves the weights of at most `recent_count` wallpapers, so picking stays O(log n) in the
+    size of the library.
+    """
+
+    def __init__(self, names, favorites=(), recent=(), window=20, recent_count=100, favorite_weight=3.0, rng=None):
+        """
+        Args:
+            names (list): Every wallpaper in the library.
+            favorites (iterable): The favorite wallpapers.
+            recent (list): The recently used wallpapers, most recent first (e.g., HistoryStore.recent).
+            window (int): How many of the last picks can't be picked again.
+            recent_count (int): How many of the last used wallpapers get a lower weight.
+            favorite_weight (float): How much more likely a favorite is to be picked.
+            rng (random.Random): The random number generator.
+        """
+        self.window = window
+        self.recent_count = max(recent_count, window)
+        self.favorite_weight = favorite_weight
+        self.rng = rng if rng is not None else random.Random()
+        self.favorites = set(favorites)
+        # Most recently used first, each name once
+        self.recent = deque()
+        for name in recent:
+            if name not in self.recent and len(self.recent) < self.recent_count:
+                self.recent.append(name)
+        self._recent_ranks = {name: rank for rank, name in enumerate(self.recent)}
+        self.names = list(dict.fromkeys(names))
+        self.ids = {name: index for index, name in enumerate(self.names)}
+        self.sampler = FenwickSampler(self._weight(name) for name in self.names)
+
+    def pick(self, candidates=None):
+        """Picks a random wallpaper without recording it (see record).
+
+        Args:
+            candidates (list): Pick only from these (e.g., the current search results). Defaults to the whole library.
+
+        Returns:
+            str: The wallpaper, or None if there is nothing to pick from.
+        """
+        if candidates is None:
+            index = self.sampler.sample(self.rng)
+            if index is not None:
+                return self.names[index]
+            candidates = self.names
+        else:
+            candidates = [name for name in candidates if name in self.ids]
+            weights = [self.sampler.weights[self.ids[name]] for name in candidates]
+            if sum(weights) > 0:
+                return self.rng.choices(candidates, weights=weights)[0]
+
+        # Everything was used too recently: fall back to the least recently used candidates
+        candidates = [name for name in candidates if name is not None]
+        if len(candidates) == 0:
+            return None
+        ranks = self._recent_ranks
+        oldest = max(ranks.get(name, len(self.recent)) for name in candidates)
+        return self.rng.choice([name for name in candidates if ranks.get(name, len(self.recent)) == oldest])
+
+    def record(self, name):
+        """Records that a wallpaper was used, so it is avoided by the next picks."""
+        if name in self.recent:
+            self.recent.remove(name)
+        self.recent.appendleft(name)
+        dropped = self.recent.pop() if len(self.recent) > self.recent_count else None
+        self._recent_ranks = {name: rank for rank, name in enumerate(self.recent)}
+        for recent_name in self.recent:
+            self._update_weight(recent_name)
+        if dropped is not None:
+            self._update_weight(dropped)
+
+    def set_favorites(self, favorites):
+        changed = self.favorites.symmetric_difference(favorites)
+        self.favorites = set(favorites)
+        for name in changed:
+            self._update_weight(name)
+
+    def add(self, name):
+        if name in self.ids:
+            return
+        self.ids[name] = self.sampler.append(0)
+        self.names.append(name)
+        self._update_weight(name)
+
+    def remove(self, name):
+        index = self.ids.pop(name, None)
+        if index is not None:
+            self.names[index] = None
+            self.sampler.update(index, 0)
+
+    def rename(self, old_name, new_name):
+        self.remove(old_name)
+        self.add(new_name)
+
+    def weight(self, name):
+        if name not in self.ids:
+            return 0.0
+        return self.sampler.weights[self.ids[name]] / WEIGHT_SCALE
+
+    # ----------------------------
+
+    def _update_weight(self, name):
+        index = self.ids.get(name)
+        if index is not None:
+            self.sampler.update(index, self._weight(name))
+
+    def _weight(self, name):
+        weight = self.favorite_weight if name in self.favorites else 1.0
+        rank = self._recent_ranks.get(name)
+        if rank is not None:
+            weight = 0.0 if rank < self.window else weight * (rank + 1) / (self.recent_count + 1)
+        return round(weight * WEIGHT_SCALE)
+
+
+def rotate(shuffle, monitors, interval, history=None, stop_event=None):
+    """Changes the wallpaper of every monitor every `interval` seconds until stop_event is set.
+
+    Each monitor gets its own pick from the shared shuffle, so two monitors never show the same wallpaper.
+    The running Komorebi instance of the monitor is told to reload; if it isn't running, the wallpaper is
+    still set in the config and shown the next time Komorebi starts.
+
+    Args:
+        shuffle (ShuffleEngine): The shuffle to pick from.
+        monitors (list): The monitor indexes, as strings.
+        interval (float): Seconds between changes.
+        history (HistoryStore): Records every change if given.
+        stop_event (threading.Event): Stops the rotation when set.
+    """
+    stop_event = stop_event if stop_event is not None else threading.Event()
+    configs = {monitor: KomorebiConfig(locate_config_file(f".Komorebi{monitor}.prop")) for monitor in monitors}
+    next_change = time.monotonic()
+    while not stop_event.wait(max(next_change - time.monotonic(), 0)):
+        next_change += interval
+        for monitor, config in configs.items():
+            wallpaper = shuffle.pick()
+            if wallpaper is None:
+                print("[WARNING] Nothing to pick from.")
+                return
+            shuffle.record(wallpaper)
+            config.set_wallpaper_name(wallpaper)
+            if history is not None:
+                history.append(wallpaper, monitor)
+            if reload_wallpaper(control_socket_path(config.path)):
+                print(f"[SHUFFLE] Monitor {monitor}: '{wallpaper}'")
+            else:
+                print(f"[WARNING] Monitor {monitor}: Komorebi did not respond, '{wallpaper}' is shown on the next start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Change the wallpaper of each monitor every N minutes, preferring favorites and avoiding repeats.")
+    parser.add_argument("--every", type=float, default=15.0, help="minutes between changes")
+    parser.add_argument("--monitor", action="append", help="monitor index (can be given more than once, default: 0)")
+    parser.add_argument("--window", type=int, default=20, help="how many of the last wallpapers are never repeated")
+    parser.add_argument("--favorite-weight", type=float, default=3.0, help="how much more likely favorites are")
+    parser.add_argument("--wallpaper-dir", default=KOMOREBI_WALLPAPER_DIRS_PATH, help="the Komorebi wallpaper directory")
+    args = parser.parse_args(argv)
+
+    project_dir = os.path.dirname(os.path.realpath(__file__))
+    library = LibraryIndex(args.wallpaper_dir)
+    library.load()
+    history = HistoryStore(os.path.join(project_dir, "data", "lists", "history.txt"))
+    favorites = FavoritesStore(os.path.join(project_dir, "data", "lists", "favorites.txt"))
+    favorites.load()
+    shuffle = ShuffleEngine(library.names, favorites, history.recent(100), window=args.window, favorite_weight=args.favorite_weight)
+
+    try:
+        rotate(shuffle, args.monitor or ["0"], args.every * 60, history)
+    except KeyboardInterrupt:
+        exit("\nRotation stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import codecs
+import os
+import selectors
+import sys
+import termios
+import tty
+
+# How long to wait for the rest of an escape sequence before treating ESC as a key of its own
+ESCAPE_TIMEOUT = 0.05
+
+# Escape sequences (without the leading ESC) -> key names. Terminals send either the CSI ('[') or the SS3 ('O') form
+ESCAPE_SEQUENCES = {
+    "[A": "up", "[B": "down", "[C": "right", "[D": "left",
+    "OA": "up", "OB": "down", "OC": "right", "OD": "left",
+    "[H": "home", "[F": "end", "OH": "home", "OF": "end",
+    "[1~": "home", "[4~": "end", "[7~": "home", "[8~": "end",
+    "[2~": "insert", "[3~": "delete", "[5~": "page up", "[6~": "page down",
+    "[Z": "shift+tab",
+}
+
+CONTROL_KEYS = {
+    "\r": "enter",
+    "\n": "enter",
+    "\t": "tab",
+    "\x7f": "backspace",
+    "\x08": "backspace",
+    "\x03": "ctrl+c",
+    "\x04": "ctrl+d",
+}
+
+
+def parse_keys(text, final=False):
+    """Splits terminal input into keys.
+
+    Printable characters are returned as they are (already shifted by the terminal, e.g., 'A' or '?'), other
+    keys by name (e.g., 'enter', 'up', 'backspace', 'esc'). Unknown escape sequences are dropped.
+
+    Args:
+        text (str): The input read from the terminal.
+        final (bool): Whether no more input is coming right away, so a trailing ESC is the ESC key and not
+            the start of an escape sequence.
+
+    Returns:
+        tuple: (keys, rest) where rest is an incomplete escape sequence at the end of text, to be parsed with
+            the next input.
+    """
+    keys = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char != "\x1b":
+            if char in CONTROL_KEYS:
+                keys.append(CONTROL_KEYS[char])
+            elif char.isprintable():
+                keys.append(char)
+            i += 1
+            continue
+
+        end = _escape_sequence_end(text, i + 1)
+        if end is None:
+            if not final:
+                return keys, text[i:]
+            keys.append("esc")
+            i += 1
+            continue
+        sequence = text[i + 1:end]
+        if sequence == "":
+            # ESC followed by something that isn't a sequence (e.g., Alt+key): keep the key
+            keys.append("esc")
+        elif sequence in ESCAPE_SEQUENCES:
+            keys.append(ESCAPE_SEQUENCES[sequence])
+        i = end
+    return keys, ""
+
+
+def _escape_sequence_end(text, start):
+    """Gets the end of the escape sequence starting at text[start] (right after ESC).
+
+    Returns:
+        int: The index after the sequence (start if it isn't a sequence), or None if it is incomplete.
+    """
+    if start >= len(text):
+        return None
+    if text[start] == "O":
+        return start + 2 if start + 1 < len(text) else None
+    if text[start] != "[":
+        return start
+    # CSI: parameter and intermediate bytes, then one final byte in '@'..'~'
+    i = start + 1
+    while i < len(text):
+        if "@" <= text[i] <= "~":
+            return i + 1
+        i += 1
+    return None
+
+
+class RawTerminal:
+    """Puts a terminal in cbreak mode (no line buffering, no echo) and reads keys from it without threads.
+
+    Ctrl+C still raises KeyboardInterrupt. Everything that is already waiting is read at once, so a burst of
+    keys (fast typing or a paste) comes back as one batch that can be handled with one search and one redraw.
+    Unlike a global keyboard hook, only the keys typed into this terminal are seen, and no root is needed.
+
+    Usage:
+        with RawTerminal() as terminal:
+            while True:
+                keys = terminal.read_keys()
+    """
+
+    def __init__(self, fd=None):
+        self.fd = fd if fd is not None else sys.stdin.fileno()
+        # Keeps the bytes of a character that was split between two reads
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.fd, selectors.EVENT_READ)
+        self._saved_attributes = None
+        self._pending = ""
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.restore()
+        self.selector.close()
+
+    def start(self):
+        if self._saved_attributes is None:
+            self._saved_attributes = termios.tcgetattr(self.fd)
+            tty.setcbreak(self.fd)
+
+    def restore(self):
+        """Gives the terminal back its normal (line buffered, echoing) mode, e.g., before calling input()."""
+        if self._saved_attributes is not None:
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self._saved_attributes)
+            self._saved_attributes = None
+
+    def read_keys(self, timeout=None):
+        """Waits for input and returns all the keys that are available.
+
+        Args:
+            timeout (float): Seconds to wait for the first key. Waits forever if None.
+
+        Returns:
+            list: The keys (see parse_keys). Empty if the timeout passed.
+
+        Raises:
+            EOFError: If the terminal was closed.
+        """
+        if not self._wait(timeout):
+            return []
+        text = self._pending + self._read_available()
+        keys, self._pending = parse_keys(text)
+        # An ESC at the end is either the ESC key or the start of a sequence that is still on its way
+        while self._pending != "":
+            if not self._wait(ESCAPE_TIMEOUT):
+                more_keys, self._pending = parse_keys(self._pending, final=True)
+                keys += more_keys
+                break
+            more_keys, self._pending = parse_keys(self._pending + self._read_available())
+            keys += more_keys
+        return keys
+
+    def has_input(self):
+        """Checks, without waiting, whether keys are waiting to be read."""
+        return self._pending != "" or self._wait(0)
+
+    # ----------------------------
+
+    def _wait(self, timeout):
+        return len(self.selector.select(timeout)) > 0
+
+    def _read_available(self):
+        chunks = []
+        while True:
+            data = os.read(self.fd, 4096)
+            if not data:
+                if len(chunks) == 0:
+                    raise EOFError
+                break
+            chunks.append(data)
+            if not self._wait(0):
+                break
+        return self.decoder.decode(b"".join(chunks))
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from bulk_import import bulk_import, derive_name
+
+# Writes something to the output file (its last argument), like a successful ffmpeg run
+FAKE_FFMPEG = "#!/bin/sh\nfor last; do :; done\necho frame > \"$last\"\n"
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "ffmpeg").write_text(FAKE_FFMPEG)
+    (bin_dir / "ffmpeg").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_derive_name():
+    assert derive_name("/videos/rain city.mp4", set()) == "rain city"
+    assert derive_name("/videos/a:b?.mp4", set()) == "a_b_"
+    assert derive_name("/videos/rain.mp4", {"rain", "rain_2"}) == "rain_3"
+    assert derive_name("/videos/ .mp4", set()) == "wallpaper"
+
+
+def test_import_skips_duplicates_and_names_around_plain_files(tmp_path, fake_ffmpeg, monkeypatch):
+    library = tmp_path / "library"
+    (library / "forest").mkdir(parents=True)
+    (library / "forest" / "config").write_text("[Info]\nWallpaperType=video\nVideoFileName=forest.mp4\n")
+    (library / "forest" / "forest.mp4").write_bytes(b"forest video")
+    # A plain file with the name the rain video would get
+    (library / "rain").write_text("notes")
+
+    videos = tmp_path / "videos"
+    videos.mkdir()
+    (videos / "rain.mp4").write_bytes(b"rain video")
+    (videos / "forest copy.mp4").write_bytes(b"forest video")
+    (videos / "readme.txt").write_text("not a video")
+
+    summary = bulk_import([str(videos)], str(library), jobs=1)
+    assert summary == {"imported": ["rain_2"], "duplicates": [str(videos / "forest copy.mp4")], "failed": []}
+    assert sorted(os.listdir(library / "rain_2")) == ["config", "rain.mp4", "wallpaper.jpg"]
+    assert (library / "rain_2" / "rain.mp4").read_bytes() == b"rain video"
+    assert (library / "rain").read_text() == "notes"
+
+
+def test_failed_import_leaves_no_folder(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "ffmpeg").write_text("#!/bin/sh\nexit 1\n")
+    (bin_dir / "ffmpeg").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    library = tmp_path / "library"
+    library.mkdir()
+    videos = tmp_path / "videos"
+    videos.mkdir()
+    (videos / "clip.mp4").write_bytes(b"clip")
+
+    assert bulk_import([str(videos)], str(library))["failed"] == ["clip"]
+    assert os.listdir(library) == []
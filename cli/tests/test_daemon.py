@@ -0,0 +1,69 @@
+import json
+import socket
+import threading
+
+import pytest
+
+from client import ClientError, request
+from daemon import WallpaperDaemon
+from service import ServiceError
+
+
+class FakeService:
+    def __init__(self):
+        self.changes_applied = 0
+
+    def apply_changes(self):
+        self.changes_applied += 1
+
+    def search(self, query=""):
+        return [name for name in ["rain", "forest"] if query in name]
+
+    def set(self, wallpaper, monitor="0"):
+        raise ServiceError(f"No wallpaper named '{wallpaper}'")
+
+    def status(self):
+        return {}["missing"]
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    server = WallpaperDaemon(FakeService(), str(tmp_path / "daemon.sock"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_commands_run_after_applying_changes(daemon):
+    assert request("search", {"query": "ra"}, socket_path=daemon.socket_path) == ["rain"]
+    assert daemon.service.changes_applied == 1
+
+
+def test_errors_are_answered(daemon):
+    with pytest.raises(ClientError, match="No wallpaper named 'ocean'"):
+        request("set", {"wallpaper": "ocean"}, socket_path=daemon.socket_path)
+    with pytest.raises(ClientError, match="Unknown command"):
+        request("format_disk", socket_path=daemon.socket_path)
+    with pytest.raises(ClientError, match="unexpected keyword"):
+        request("search", {"colour": "red"}, socket_path=daemon.socket_path)
+
+
+def test_unexpected_exceptions_keep_the_connection(daemon):
+    assert daemon.handle_command({"command": "status"}) == {"ok": False, "error": "KeyError: 'missing'"}
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(5)
+        connection.connect(daemon.socket_path)
+        lines = connection.makefile("rb")
+        for line in [b'{"command": "status"}', b"[1, 2]", b'{"command": "search", "args": {"query": "fo"}}']:
+            connection.sendall(line + b"\n")
+        responses = [json.loads(lines.readline()) for _ in range(3)]
+
+    assert responses == [
+        {"ok": False, "error": "KeyError: 'missing'"},
+        {"ok": False, "error": "Invalid request"},
+        {"ok": True, "result": ["forest"]},
+    ]
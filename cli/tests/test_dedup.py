@@ -0,0 +1,52 @@
+import os
+
+from dedup import PARTIAL_HASH_BYTES, Deduplicator, HashCache
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def make_deduplicator(tmp_path):
+    return Deduplicator(HashCache(str(tmp_path / "hashes.sqlite")), max_workers=2)
+
+
+def test_groups_files_with_the_same_contents(tmp_path):
+    big = os.urandom(3 * PARTIAL_HASH_BYTES)
+    # Same size, first and last PARTIAL_HASH_BYTES as big: only the full hash tells them apart
+    middle_differs = big[:PARTIAL_HASH_BYTES] + bytes(PARTIAL_HASH_BYTES) + big[-PARTIAL_HASH_BYTES:]
+    paths = [
+        write(tmp_path / "a.mp4", big),
+        write(tmp_path / "small.mp4", b"small"),
+        write(tmp_path / "b.mp4", middle_differs),
+        write(tmp_path / "c.mp4", big),
+        write(tmp_path / "small copy.mp4", b"small"),
+        write(tmp_path / "other small.mp4", b"other"),
+    ]
+    groups = make_deduplicator(tmp_path).find_duplicates(paths + [str(tmp_path / "missing.mp4")])
+    assert groups == [[paths[0], paths[3]], [paths[1], paths[4]]]
+
+
+def test_hashes_are_cached_until_the_file_changes(tmp_path):
+    first = write(tmp_path / "a.mp4", b"same")
+    second = write(tmp_path / "b.mp4", b"same")
+    assert make_deduplicator(tmp_path).find_duplicates([first, second]) == [[first, second]]
+
+    cache = HashCache(str(tmp_path / "hashes.sqlite"))
+    stat = os.stat(first)
+    assert cache.get(first, stat.st_size, stat.st_mtime_ns, "partial") is not None
+
+    write(tmp_path / "b.mp4", b"changed")
+    assert make_deduplicator(tmp_path).find_duplicates([first, second]) == []
+
+
+def test_hardlink_frees_the_copies(tmp_path):
+    data = os.urandom(1000)
+    group = [write(tmp_path / "a.mp4", data), write(tmp_path / "b.mp4", data), write(tmp_path / "c.mp4", data)]
+    deduplicator = make_deduplicator(tmp_path)
+    assert deduplicator.hardlink(group) == 2000
+    assert len({os.stat(path).st_ino for path in group}) == 1
+    assert (tmp_path / "c.mp4").read_bytes() == data
+    # Already linked
+    assert deduplicator.hardlink(group) == 0
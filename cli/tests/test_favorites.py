@@ -0,0 +1,48 @@
+import multiprocessing
+
+from favorites import FavoritesStore
+
+
+def add_favorites(path, prefix, count):
+    store = FavoritesStore(path)
+    for number in range(count):
+        store.add(f"{prefix}{number}")
+
+
+def test_add_remove_and_rename_keep_the_order(tmp_path):
+    path = str(tmp_path / "favorites.txt")
+    store = FavoritesStore(path)
+    assert store.add("rain")
+    assert store.add("forest")
+    assert not store.add("rain")
+    assert store.rename("rain", "storm")
+    assert not store.remove("ocean")
+    assert store.remove("forest")
+    assert list(store) == ["storm"]
+    assert FavoritesStore(path).load() == ["storm"]
+
+
+def test_changes_from_other_stores_are_merged(tmp_path):
+    path = str(tmp_path / "favorites.txt")
+    first, second = FavoritesStore(path), FavoritesStore(path)
+    first.load()
+    second.load()
+    first.add("rain")
+    # second never saw 'rain', but adds on top of what is on disk
+    second.add("forest")
+    assert FavoritesStore(path).load() == ["rain", "forest"]
+
+
+def test_concurrent_sessions_lose_no_favorites(tmp_path):
+    path = str(tmp_path / "favorites.txt")
+    context = multiprocessing.get_context("fork")
+    sessions = [context.Process(target=add_favorites, args=(path, f"monitor{index}-", 25)) for index in range(4)]
+    for session in sessions:
+        session.start()
+    for session in sessions:
+        session.join(timeout=30)
+        assert session.exitcode == 0
+
+    names = FavoritesStore(path).load()
+    assert len(names) == 100
+    assert set(names) == {f"monitor{index}-{number}" for index in range(4) for number in range(25)}
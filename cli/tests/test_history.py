@@ -0,0 +1,58 @@
+import pytest
+
+import history
+from history import HistoryStore
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # Lines are longer than a block, so most of them span two or more reads
+    monkeypatch.setattr(history, "READ_BLOCK_BYTES", 7)
+
+
+def write_history(path, data):
+    path.write_bytes(data.encode("utf-8"))
+    return HistoryStore(str(path))
+
+
+@pytest.mark.parametrize("block_bytes", [1, 2, 5, 7, 8, 13, 64, 8192])
+def test_lines_split_across_blocks_are_joined(tmp_path, monkeypatch, block_bytes):
+    monkeypatch.setattr(history, "READ_BLOCK_BYTES", block_bytes)
+    store = write_history(tmp_path / "history.txt", "first\t100\t0\nsecond-wallpaper\t200\t1\nthird\t300\t\n")
+    assert [entry.name for entry in store.iter_reversed()] == ["third", "second-wallpaper", "first"]
+    assert store.last() == history.HistoryEntry("third", 300.0, None)
+
+
+def test_last_line_without_newline_is_read(tmp_path, small_blocks):
+    store = write_history(tmp_path / "history.txt", "first\t100\t0\nbeing-written\t200")
+    assert [entry.name for entry in store.iter_reversed()] == ["being-written", "first"]
+
+
+def test_blank_lines_and_old_format_lines(tmp_path, small_blocks):
+    store = write_history(tmp_path / "history.txt", "\nold-format\n\n\nnew-format\t100\t0\n\n")
+    assert list(store.iter_reversed()) == [
+        history.HistoryEntry("new-format", 100.0, "0"),
+        history.HistoryEntry("old-format", None, None),
+    ]
+
+
+def test_multibyte_characters_split_across_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "READ_BLOCK_BYTES", 3)
+    store = write_history(tmp_path / "history.txt", "日本の夜\t100\t0\ncafé-rain\t200\t0\n")
+    assert [entry.name for entry in store.iter_reversed()] == ["café-rain", "日本の夜"]
+
+
+def test_recent_deduplicates_and_filters_by_monitor(tmp_path, small_blocks):
+    store = write_history(tmp_path / "history.txt", "a\t1\t0\nb\t2\t1\nold\na\t3\t1\nc\t4\t0\n")
+    assert store.recent(10) == ["c", "a", "old", "b"]
+    assert store.recent(2) == ["c", "a"]
+    store.reload()
+    assert store.recent(2, monitor=1) == ["a", "old"]
+    store.append("b", monitor=0, timestamp=5)
+    assert store.recent(3) == ["b", "c", "a"]
+
+
+def test_missing_file_is_empty(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.txt"))
+    assert store.last() is None
+    assert store.recent(5) == []
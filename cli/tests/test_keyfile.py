@@ -0,0 +1,43 @@
+import pytest
+
+from keyfile import KeyFile, escape, unescape
+
+VALUES = [
+    "plain",
+    " leading space",
+    "  two leading spaces",
+    "inner space",
+    "back\\slash",
+    "line\nbreak",
+    "tab\tand\rreturn",
+    "\\n is not a newline",
+    "",
+]
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_escape_round_trips(value):
+    assert unescape(escape(value)) == value
+
+
+def test_escape_matches_glib():
+    assert escape(" a b") == "\\sa b"
+    assert escape("a\\b\nc\td\r") == "a\\\\b\\nc\\td\\r"
+    assert escape("\\n") == "\\\\n"
+
+
+def test_unescape_matches_glib():
+    assert unescape("\\sa\\sb") == " a b"
+    assert unescape("a\\\\nb") == "a\\nb"
+    # Unknown escapes are kept as they are
+    assert unescape("c:\\x") == "c:\\x"
+    assert unescape("end\\") == "end\\"
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_strings_round_trip_through_the_file(value):
+    key_file = KeyFile()
+    key_file.set_string("Info", "Name", value)
+    loaded = KeyFile()
+    loaded.load_from_data(key_file.to_data())
+    assert loaded.get_string("Info", "Name") == value
@@ -0,0 +1,34 @@
+from komorebi_config import KomorebiConfig
+
+
+def test_wallpaper_name_is_cached_between_checks(tmp_path):
+    path = tmp_path / ".Komorebi0.prop"
+    path.write_text("[KomorebiProperties]\nWallpaperName=rain\n")
+    config = KomorebiConfig(str(path), check_interval=3600)
+    assert config.get_wallpaper_name() == "rain"
+
+    path.write_text("[KomorebiProperties]\nWallpaperName=forest\n")
+    assert config.get_wallpaper_name() == "rain"
+    config.invalidate()
+    assert config.get_wallpaper_name() == "forest"
+
+
+def test_set_keeps_keys_written_since_the_last_check(tmp_path):
+    path = tmp_path / ".Komorebi0.prop"
+    path.write_text("[KomorebiProperties]\nWallpaperName=rain\nTimeTwentyFour=true\n")
+    config = KomorebiConfig(str(path), check_interval=3600)
+    assert config.get_wallpaper_name() == "rain"
+
+    # Komorebi changes a setting right after the last check
+    path.write_text("[KomorebiProperties]\nWallpaperName=rain\nTimeTwentyFour=false\nShowDesktopIcons=true\n")
+    config.set_wallpaper_name("forest")
+    assert path.read_text() == "[KomorebiProperties]\nWallpaperName=forest\nTimeTwentyFour=false\nShowDesktopIcons=true\n"
+    assert config.get_wallpaper_name() == "forest"
+
+
+def test_missing_file_has_no_wallpaper(tmp_path):
+    config = KomorebiConfig(str(tmp_path / ".Komorebi0.prop"))
+    assert config.get_wallpaper_name() == ""
+    config.set_wallpaper_name("rain")
+    assert config.get_wallpaper_name() == "rain"
+    assert "WallpaperName=rain" in (tmp_path / ".Komorebi0.prop").read_text()
@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+
+import launcher
+from launcher import KomorebiLauncher, has_control_socket
+
+# Stands in for a Komorebi build without the control socket: it only keeps running
+PLAIN_APP = "#!{python}\nimport time\ntime.sleep(60)\n".format(python=os.path.realpath(sys.executable))
+# Stands in for a build with the control socket: it answers 'ping' on .Komorebi{N}.sock next to its config
+SOCKET_APP = """#!{python}
+# KomorebiControlChannel
+import os, socket, sys
+path = os.path.join({config_dir!r}, ".Komorebi" + sys.argv[1] + ".sock")
+server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+server.bind(path)
+server.listen()
+while True:
+    connection, _ = server.accept()
+    with connection:
+        connection.makefile("r").readline()
+        connection.sendall(b"ready\\n")
+"""
+
+
+def make_app(tmp_path, source):
+    app_path = tmp_path / "komorebi"
+    app_path.write_text(source)
+    app_path.chmod(0o755)
+    return str(app_path)
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    config_dir = tmp_path / "home"
+    config_dir.mkdir()
+    for index in ("0", "1"):
+        (config_dir / f".Komorebi{index}.prop").write_text("[KomorebiProperties]\nWallpaperName=rain\n")
+    return config_dir
+
+
+def make_launcher(tmp_path, config_dir, source):
+    return KomorebiLauncher(make_app(tmp_path, source), str(config_dir), None, str(tmp_path / "instances.json"))
+
+
+def group_alive(pid):
+    try:
+        os.killpg(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_has_control_socket(tmp_path):
+    assert not has_control_socket(make_app(tmp_path, PLAIN_APP))
+    assert has_control_socket(make_app(tmp_path, "x" * (1024 * 1024 - 5) + "KomorebiControlChannel"))
+    assert has_control_socket(str(tmp_path / "unreadable"))
+
+
+def test_start_without_control_socket_does_not_wait_for_it(tmp_path, config_dir):
+    komorebi = make_launcher(tmp_path, config_dir, PLAIN_APP)
+    start = time.monotonic()
+    try:
+        assert komorebi.start_all() == {"0": "started", "1": "started"}
+        assert time.monotonic() - start < launcher.READY_TIMEOUT / 2
+    finally:
+        komorebi.stop_all()
+
+
+def test_start_waits_for_the_control_socket(tmp_path, config_dir):
+    komorebi = make_launcher(tmp_path, config_dir, SOCKET_APP.format(python=os.path.realpath(sys.executable), config_dir=str(config_dir)))
+    try:
+        assert komorebi.start_all() == {"0": "ready", "1": "ready"}
+    finally:
+        komorebi.stop_all()
+
+
+def test_exited_instance_is_reported(tmp_path, config_dir):
+    komorebi = make_launcher(tmp_path, config_dir, "#!/bin/sh\nexit 3\n")
+    assert komorebi.start_all(timeout=5) == {"0": "exited with code 3", "1": "exited with code 3"}
+
+
+def test_start_stops_the_instances_of_the_previous_start(tmp_path, config_dir):
+    komorebi = make_launcher(tmp_path, config_dir, PLAIN_APP)
+    try:
+        komorebi.start_all()
+        first_pids = json.loads((tmp_path / "instances.json").read_text()).values()
+        komorebi.start_all()
+        second_pids = json.loads((tmp_path / "instances.json").read_text()).values()
+        assert not any(group_alive(pid) for pid in first_pids)
+        assert all(group_alive(pid) for pid in second_pids)
+    finally:
+        assert komorebi.stop_all()
+    assert not any(group_alive(pid) for pid in second_pids)
+    assert not komorebi.stop_all()
+
+
+def test_reused_pid_is_not_stopped(tmp_path, config_dir):
+    komorebi = make_launcher(tmp_path, config_dir, PLAIN_APP)
+    # The PID of this test process, which does not run the app
+    (tmp_path / "instances.json").write_text(json.dumps({"0": os.getpid()}))
+    assert komorebi.stop_all()
+    assert not (tmp_path / "instances.json").exists()
@@ -0,0 +1,43 @@
+import os
+
+from library_index import LibraryIndex, index_file_path
+
+
+def make_library(root, names):
+    for name in names:
+        os.makedirs(root / name)
+        (root / name / "config").write_text(f"[Info]\nWallpaperType=video\nVideoFileName={name}.mp4\n")
+        (root / name / f"{name}.mp4").write_bytes(b"video")
+
+
+def test_each_root_has_its_own_index_file(tmp_path):
+    make_library(tmp_path / "main", ["rain", "city"])
+    make_library(tmp_path / "other", ["forest"])
+    cache_dir = str(tmp_path / "cache")
+    main_path = index_file_path(str(tmp_path / "main"), cache_dir)
+    other_path = index_file_path(str(tmp_path / "other"), cache_dir)
+    assert main_path != other_path
+    assert index_file_path(str(tmp_path / "main") + "/", cache_dir) == main_path
+
+    assert sorted(LibraryIndex(str(tmp_path / "main"), main_path).load()) == ["city", "rain"]
+    assert LibraryIndex(str(tmp_path / "other"), other_path).load() == ["forest"]
+
+    # The main index is still up to date: loading it reads no folder
+    main = LibraryIndex(str(tmp_path / "main"), main_path)
+    main.read_entry = None
+    assert sorted(main.load()) == ["city", "rain"]
+
+
+def test_load_reads_only_modified_folders(tmp_path):
+    make_library(tmp_path / "lib", ["rain", "city"])
+    index_path = str(tmp_path / "index.sqlite")
+    LibraryIndex(str(tmp_path / "lib"), index_path).load()
+    make_library(tmp_path / "lib", ["forest"])
+
+    library = LibraryIndex(str(tmp_path / "lib"), index_path)
+    read = []
+    read_entry = library.read_entry
+    library.read_entry = lambda name, mtime=None: read.append(name) or read_entry(name, mtime)
+    assert sorted(library.load()) == ["city", "forest", "rain"]
+    assert read == ["forest"]
+    assert library.get("forest").video_file == "forest.mp4"
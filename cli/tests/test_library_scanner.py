@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from library_scanner import check_folder, fix_folder, scan_library
+
+
+def make_folder(root, name, config=None, files=()):
+    folder = root / name
+    folder.mkdir(parents=True)
+    if config is not None:
+        (folder / "config").write_text(config)
+    for file_name in files:
+        (folder / file_name).write_bytes(b"data")
+    return folder
+
+
+def video_config(video_file_name):
+    return f"[Info]\nWallpaperType=video\nVideoFileName={video_file_name}\n"
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / "library"
+    make_folder(root, "fine", video_config("clip.mp4"), ["clip.mp4", "wallpaper.jpg"])
+    make_folder(root, "image", "[Info]\nWallpaperType=image\n", ["wallpaper.jpg"])
+    make_folder(root, "empty_video", video_config("gone.mp4"), ["wallpaper.jpg"])
+    make_folder(root, "renamed_video", video_config("old.mp4"), ["new.webm", "wallpaper.jpg"])
+    make_folder(root, "no_name", video_config(""), ["clip.mp4", "wallpaper.jpg"])
+    make_folder(root, "no_config", None, ["clip.mp4", "wallpaper.jpg"])
+    make_folder(root, "bad_config", None, ["wallpaper.jpg"])
+    (root / "bad_config" / "config").write_bytes(b"\xff\xfe not utf-8")
+    (root / "not_a_folder.txt").write_text("")
+    return root
+
+
+def test_scan_reports_the_problems_of_each_folder(library):
+    problems = {report.name: report.problems for report in scan_library(str(library), max_workers=4)}
+    assert problems == {
+        "fine": [],
+        "image": [],
+        "empty_video": ["no_video"],
+        "renamed_video": ["video_file_missing"],
+        "no_name": ["no_video_file_name"],
+        "no_config": ["missing_config"],
+        "bad_config": ["bad_config"],
+    }
+
+
+def test_fix_repairs_configs(library):
+    for name in ("renamed_video", "no_name", "no_config"):
+        fix_folder(str(library), check_folder(str(library / name)))
+        assert check_folder(str(library / name)).problems == []
+    assert "VideoFileName=new.webm" in (library / "renamed_video" / "config").read_text()
+
+
+def test_only_video_wallpapers_without_a_video_are_deleted(library):
+    for name in ("empty_video", "image", "bad_config"):
+        assert fix_folder(str(library), check_folder(str(library / name))) == []
+    assert os.path.isdir(library / "empty_video")
+
+    reports = scan_library(str(library))
+    deleted = [report.name for report in reports if fix_folder(str(library), report, repair=False, delete_empty=True) == ["deleted"]]
+    assert deleted == ["empty_video"]
+    assert sorted(os.listdir(library)) == ["bad_config", "fine", "image", "no_config", "no_name", "not_a_folder.txt", "renamed_video"]
@@ -0,0 +1,94 @@
+import json
+import os
+
+import pytest
+
+from library_index import LibraryIndex
+from media_metadata import MediaFilter, MediaInfo, MediaMetadata, MetadataCache, matches, parse_filters
+
+# Prints the ffprobe output stored next to the video (its last argument), fails if there is none
+FAKE_FFPROBE = "#!/bin/sh\nfor last; do :; done\necho probed >> \"$(dirname \"$0\")/calls\"\nexec cat \"$last.json\"\n"
+
+HD_H264 = MediaInfo(duration=30.0, width=1920, height=1080, codec="h264", bitrate=8_000_000, fps=29.97, size=100)
+
+
+def test_parse_filters():
+    assert parse_filters("rain city") == ("rain city", [])
+    assert parse_filters("rain res<=1080p codec:H264 city") == ("rain city", [
+        MediaFilter("height", "<=", 1080), MediaFilter("codec", "=", "h264"),
+    ])
+    assert parse_filters("dur<2m size>=1.5g bitrate<8m") == ("", [
+        MediaFilter("duration", "<", 120), MediaFilter("size", ">=", 1.5 * 1024 ** 3), MediaFilter("bitrate", "<", 8_000_000),
+    ])
+    # Not valid filters: kept as search words
+    assert parse_filters("codec>h264 res<=big fps=") == ("codec>h264 res<=big fps=", [])
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("res<=1080", True),
+    ("res<1080", False),
+    ("width>=3840", False),
+    ("codec=h264 fps>=29", True),
+    ("codec!=h264", False),
+    ("codec=hevc", False),
+    ("dur<=30 bitrate<=8m size<1k", True),
+])
+def test_matches(query, expected):
+    assert matches(HD_H264, parse_filters(query)[1]) is expected
+
+
+def test_unknown_metadata_never_matches():
+    assert not matches(None, parse_filters("res<=1080")[1])
+    assert not matches(HD_H264._replace(fps=None), parse_filters("fps>=1")[1])
+    assert not matches(HD_H264._replace(codec=None), parse_filters("codec!=hevc")[1])
+
+
+def add_wallpaper(root, name, probe_output):
+    (root / name).mkdir()
+    (root / name / "config").write_text(f"[Info]\nWallpaperType=video\nVideoFileName={name}.mp4\n")
+    (root / name / f"{name}.mp4").write_bytes(name.encode())
+    if probe_output is not None:
+        (root / name / f"{name}.mp4.json").write_text(json.dumps(probe_output))
+
+
+def test_fill_probes_each_video_once_and_filters_on_the_results(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "ffprobe").write_text(FAKE_FFPROBE)
+    (bin_dir / "ffprobe").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    root = tmp_path / "library"
+    root.mkdir()
+    add_wallpaper(root, "city", {
+        "streams": [{"codec_name": "hevc", "width": 3840, "height": 2160, "avg_frame_rate": "60/1"}],
+        "format": {"duration": "12.5", "bit_rate": "20000000"},
+    })
+    add_wallpaper(root, "rain", {
+        "streams": [{"codec_name": "h264", "width": 1920, "height": 1080, "avg_frame_rate": "30000/1001", "bit_rate": "6000000"}],
+        "format": {"duration": "95.0"},
+    })
+    add_wallpaper(root, "broken", None)
+    library = LibraryIndex(str(root), str(tmp_path / "index.sqlite"))
+    library.load()
+    cache_path = str(tmp_path / "media.sqlite")
+
+    errors = []
+    media = MediaMetadata(library, MetadataCache(cache_path), max_workers=2)
+    assert media.fill(on_progress=lambda done, total, name, error: errors.append((name, error))) == 3
+    assert [name for name, error in errors if error is not None] == ["broken"]
+    assert media.get("rain") == MediaInfo(duration=95.0, width=1920, height=1080, codec="h264", bitrate=6_000_000, fps=29.97, size=4)
+    assert media.get("city").bitrate == 20_000_000
+
+    names = sorted(library.names)
+    assert media.filter(names, parse_filters("res<=1080")[1]) == ["rain"]
+    assert media.filter(names, parse_filters("fps>=50 dur<1m")[1]) == ["city"]
+    assert media.filter(names, []) == names
+
+    # Cached: only the video that failed is probed again
+    (bin_dir / "calls").unlink()
+    media = MediaMetadata(library, MetadataCache(cache_path))
+    assert media.load() == ["broken"]
+    assert media.filter(names, parse_filters("codec=h264")[1]) == ["rain"]
+    assert media.fill() == 1
+    assert (bin_dir / "calls").read_text() == "probed\n"
@@ -0,0 +1,40 @@
+import pytest
+
+from media_metadata import MediaInfo
+from optimize import MonitorMode, plan_rendition, rendition_file_name, rendition_target
+
+FHD_60 = MonitorMode(1920, 1080, 60)
+
+
+def video(width, height, codec="h264", fps=30.0):
+    return MediaInfo(duration=10.0, width=width, height=height, codec=codec, bitrate=None, fps=fps, size=1)
+
+
+@pytest.mark.parametrize("info, mode", [
+    # Scaled down to just cover the monitor
+    (video(3840, 2160, "hevc", 60.0), MonitorMode(1920, 1080, 60.0)),
+    (video(5120, 1440), MonitorMode(3840, 1080, 30.0)),
+    (video(2160, 3840), MonitorMode(1920, 3412, 30.0)),
+    # Already fits
+    (video(1920, 1080), None),
+    (video(1280, 720), None),
+    (video(2000, 1100), None),
+    (video(1920, 1080, fps=60.5), None),
+    # Never scaled up, but re-encoded for the codec or the frame rate
+    (video(1280, 720, "vp9"), MonitorMode(1280, 720, 30.0)),
+    (video(1920, 1080, fps=120.0), MonitorMode(1920, 1080, 60)),
+    (video(999, 561, "hevc"), MonitorMode(998, 560, 30.0)),
+    # Unknown frame rate: capped at the target's
+    (video(3840, 2160, fps=None), MonitorMode(1920, 1080, 60)),
+    # Unknown size
+    (video(None, None, "hevc"), None),
+])
+def test_plan_rendition(info, mode):
+    assert plan_rendition(info, FHD_60) == mode
+
+
+def test_rendition_suits_every_monitor():
+    target = rendition_target([MonitorMode(2560, 1440, 60), MonitorMode(1920, 1200, 144)])
+    assert target == MonitorMode(2560, 1440, 144)
+    assert plan_rendition(video(3840, 2160, fps=60.0), target) == MonitorMode(2560, 1440, 60.0)
+    assert rendition_file_name("clip.webm", target) == "clip.2560x1440-144.mp4"
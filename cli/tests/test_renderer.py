@@ -0,0 +1,108 @@
+import io
+import re
+
+from renderer import ScreenRenderer, result_window, visible_length
+
+CSI_PATTERN = re.compile(r"\x1b\[([0-9;]*)([A-Za-z])")
+
+
+class FakeTerminal:
+    """Applies the escape sequences the renderer writes to a grid of characters."""
+
+    def __init__(self, columns=40, lines=10):
+        self.columns = columns
+        self.grid = [[" "] * columns for _ in range(lines)]
+        self.row = self.column = 0
+
+    def feed(self, data):
+        position = 0
+        for match in CSI_PATTERN.finditer(data):
+            self._write(data[position:match.start()])
+            self._command(match.group(1), match.group(2))
+            position = match.end()
+        self._write(data[position:])
+
+    def screen(self):
+        return ["".join(row).rstrip() for row in self.grid]
+
+    def _write(self, text):
+        for char in text:
+            self.grid[self.row][self.column] = char
+            self.column += 1
+
+    def _command(self, arguments, command):
+        numbers = [int(number) for number in arguments.split(";") if number != ""]
+        if command == "H":
+            row, column = (numbers + [1, 1])[:2] if numbers else (1, 1)
+            self.row, self.column = row - 1, column - 1
+        elif command == "K":
+            self.grid[self.row][self.column:] = [" "] * (self.columns - self.column)
+        elif command == "J":
+            if numbers == [2]:
+                self.grid = [[" "] * self.columns for _ in self.grid]
+            else:
+                self.grid[self.row][self.column:] = [" "] * (self.columns - self.column)
+                for row in range(self.row + 1, len(self.grid)):
+                    self.grid[row] = [" "] * self.columns
+        # Color codes (m) don't change the characters
+
+
+def render(renderer, stream, terminal, lines):
+    stream.seek(0)
+    stream.truncate()
+    renderer.render(lines)
+    terminal.feed(stream.getvalue())
+    return stream.getvalue()
+
+
+def test_frames_are_drawn_exactly_and_only_changed_lines_are_written():
+    stream = io.StringIO()
+    renderer = ScreenRenderer(stream)
+    terminal = FakeTerminal()
+
+    first = ["Active Wallpaper: rain", "", "rain-city", "rainbow", "> rai"]
+    render(renderer, stream, terminal, first)
+    assert terminal.screen()[:5] == first
+    assert (terminal.row, terminal.column) == (4, len("> rai"))
+
+    second = ["Active Wallpaper: rain", "", "rain-city", "> rain-c"]
+    output = render(renderer, stream, terminal, second)
+    assert terminal.screen() == second + [""] * 6
+    assert "Active Wallpaper" not in output
+    assert "rain-city" not in output.replace("> rain-c", "")
+
+    # Nothing changed: only the cursor is moved
+    output = render(renderer, stream, terminal, second)
+    assert CSI_PATTERN.sub("", output) == ""
+
+
+def test_invalidate_redraws_everything():
+    stream = io.StringIO()
+    renderer = ScreenRenderer(stream)
+    terminal = FakeTerminal()
+    render(renderer, stream, terminal, ["a", "b"])
+    # Something printed over the screen outside of the renderer
+    terminal.feed("\x1b[1;1Hgarbage")
+    renderer.invalidate()
+    render(renderer, stream, terminal, ["a", "b"])
+    assert terminal.screen()[:3] == ["a", "b", ""]
+
+
+def test_cursor_ignores_color_codes():
+    stream = io.StringIO()
+    renderer = ScreenRenderer(stream)
+    terminal = FakeTerminal()
+    render(renderer, stream, terminal, ["\x1b[32mgreen\x1b[0m", "\x1b[1m>\x1b[0m q"])
+    assert terminal.screen()[:2] == ["green", "> q"]
+    assert (terminal.row, terminal.column) == (1, 3)
+    assert visible_length("\x1b[32mgreen\x1b[0m") == 5
+
+
+def test_result_window_keeps_the_selection_visible():
+    assert result_window(5, 3, 10) == (0, 5)
+    assert result_window(100, 0, 10) == (0, 10)
+    assert result_window(100, 50, 10) == (45, 55)
+    assert result_window(100, 99, 10) == (90, 100)
+    for index in range(100):
+        start, end = result_window(100, index, 7)
+        assert start <= index < end and end - start == 7
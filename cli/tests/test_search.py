@@ -0,0 +1,48 @@
+from search import SearchEngine
+
+NAMES = ["rain-city", "neon-city", "forest-rain", "ocean", "city-lights", "rainbow"]
+
+
+def make_engine(names=NAMES):
+    engine = SearchEngine(names, build_index=False)
+    engine.build_trigrams()
+    return engine
+
+
+def test_trigram_search_finds_substrings():
+    engine = make_engine()
+    assert engine.search("rain") == ["rain-city", "forest-rain", "rainbow"]
+    assert engine.search("CITY") == ["rain-city", "neon-city", "city-lights"]
+    assert engine.search("xyz") == []
+
+
+def test_narrowing_after_remove_drops_the_removed_name():
+    engine = make_engine()
+    assert engine.search("rai") == ["rain-city", "forest-rain", "rainbow"]
+    engine.remove("forest-rain")
+    # "rain" extends the previous query, which must not reuse results from before the removal
+    assert engine.search("rain") == ["rain-city", "rainbow"]
+    assert engine.search("forest") == []
+    assert engine.search("") == ["rain-city", "neon-city", "ocean", "city-lights", "rainbow"]
+
+
+def test_narrowing_after_rename_finds_the_new_name_only():
+    engine = make_engine()
+    assert engine.search("oce") == ["ocean"]
+    engine.rename("ocean", "deep-ocean-rain")
+    assert engine.search("ocea") == ["deep-ocean-rain"]
+    assert engine.search("ocean-rain") == ["deep-ocean-rain"]
+    assert engine.search("rain") == ["rain-city", "forest-rain", "rainbow", "deep-ocean-rain"]
+
+    engine.rename("rain-city", "storm-city")
+    assert engine.search("rain") == ["forest-rain", "rainbow", "deep-ocean-rain"]
+    assert engine.search("storm") == ["storm-city"]
+
+
+def test_names_added_before_the_index_is_built_are_indexed():
+    engine = SearchEngine(NAMES, build_index=False)
+    engine.add("misty-lake")
+    engine.build_trigrams()
+    assert engine.search("misty") == ["misty-lake"]
+    engine.remove("misty-lake")
+    assert engine.search("misty") == []
@@ -0,0 +1,66 @@
+from shuffle import FenwickSampler
+
+
+class CountingRandom:
+    """Returns every target of randrange in turn, so sample visits each unit of weight once."""
+
+    def __init__(self):
+        self.next_target = 0
+
+    def randrange(self, stop):
+        target = self.next_target % stop
+        self.next_target += 1
+        return target
+
+
+def prefix_sums(sampler):
+    return [sampler._prefix_sum(count) for count in range(len(sampler) + 1)]
+
+
+def sample_counts(sampler):
+    rng = CountingRandom()
+    counts = [0] * len(sampler)
+    for _ in range(sampler.total()):
+        counts[sampler.sample(rng)] += 1
+    return counts
+
+
+def test_append_builds_the_same_tree_as_the_constructor():
+    weights = [3, 0, 7, 1, 4, 4, 0, 9, 2, 5, 1, 6, 8]
+    sampler = FenwickSampler()
+    for index, weight in enumerate(weights):
+        assert sampler.append(weight) == index
+        assert sampler.tree == FenwickSampler(weights[:index + 1]).tree
+    assert prefix_sums(sampler) == [sum(weights[:count]) for count in range(len(weights) + 1)]
+
+
+def test_update_then_append_keeps_prefix_sums():
+    weights = [5, 1, 2, 8, 3]
+    sampler = FenwickSampler(weights)
+    sampler.update(1, 6)
+    sampler.update(3, 0)
+    weights[1], weights[3] = 6, 0
+    for weight in (4, 0, 2, 7):
+        sampler.append(weight)
+        weights.append(weight)
+    assert sampler.total() == sum(weights)
+    assert prefix_sums(sampler) == [sum(weights[:count]) for count in range(len(weights) + 1)]
+
+
+def test_sample_is_proportional_to_the_weights():
+    weights = [2, 0, 5, 1, 0, 3, 4]
+    sampler = FenwickSampler(weights)
+    assert sample_counts(sampler) == weights
+
+    sampler.update(0, 0)
+    sampler.update(4, 6)
+    sampler.append(2)
+    assert sample_counts(sampler) == [0, 0, 5, 1, 6, 3, 4, 2]
+
+
+def test_sample_without_weight_returns_none():
+    assert FenwickSampler().sample() is None
+    sampler = FenwickSampler([0, 0])
+    assert sampler.sample() is None
+    sampler.update(1, 1)
+    assert sampler.sample() == 1
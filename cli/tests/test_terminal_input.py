@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from terminal_input import RawTerminal, parse_keys
+
+
+@pytest.mark.parametrize("text, keys", [
+    ("ab?", ["a", "b", "?"]),
+    ("\x1b[A\x1bOB\x1b[C\x1b[D", ["up", "down", "right", "left"]),
+    ("\x1b[5~\x1b[6~\x1b[3~\x1b[Z", ["page up", "page down", "delete", "shift+tab"]),
+    ("x\r\t\x7f\x03", ["x", "enter", "tab", "backspace", "ctrl+c"]),
+    # Unknown sequences (F5, Ctrl+Up) are dropped, other control characters too
+    ("\x1b[15~a\x1b[1;5Ab\x01", ["a", "b"]),
+    # Alt+key
+    ("\x1bx", ["esc", "x"]),
+    ("ré", ["r", "é"]),
+])
+def test_parse_keys(text, keys):
+    assert parse_keys(text) == (keys, "")
+
+
+def test_incomplete_escape_sequences_are_kept_for_the_next_input():
+    assert parse_keys("a\x1b") == (["a"], "\x1b")
+    assert parse_keys("a\x1b[") == (["a"], "\x1b[")
+    assert parse_keys("a\x1b[1") == (["a"], "\x1b[1")
+    assert parse_keys("\x1bO") == ([], "\x1bO")
+    assert parse_keys("\x1b[1" + "~") == (["home"], "")
+    # No more input is coming: ESC was pressed on its own
+    assert parse_keys("a\x1b", final=True) == (["a", "esc"], "")
+
+
+@pytest.fixture
+def pipe_terminal():
+    read_fd, write_fd = os.pipe()
+    terminal = RawTerminal(read_fd)
+    yield terminal, write_fd
+    terminal.selector.close()
+    os.close(read_fd)
+    os.close(write_fd)
+
+
+def test_read_keys_reads_bursts_and_split_input(pipe_terminal):
+    terminal, write_fd = pipe_terminal
+    assert terminal.read_keys(timeout=0) == []
+    os.write(write_fd, b"rain\x1b[B\r")
+    assert terminal.read_keys(timeout=1) == ["r", "a", "i", "n", "down", "enter"]
+
+    # A character split between two reads
+    os.write(write_fd, "é".encode()[:1])
+    assert terminal.read_keys(timeout=1) == []
+    os.write(write_fd, "é".encode()[1:])
+    assert terminal.read_keys(timeout=1) == ["é"]
+
+    # A lone ESC comes back once nothing follows it
+    os.write(write_fd, b"\x1b")
+    assert terminal.read_keys(timeout=1) == ["esc"]
+    assert not terminal.has_input()
+
+
+def test_read_keys_raises_eof_when_closed():
+    read_fd, write_fd = os.pipe()
+    os.close(write_fd)
+    terminal = RawTerminal(read_fd)
+    with pytest.raises(EOFError):
+        terminal.read_keys(timeout=1)
+    terminal.selector.close()
+    os.close(read_fd)
@@ -0,0 +1,67 @@
+import os
+import subprocess
+
+import pytest
+
+from dedup import HashCache
+from thumbnails import ThumbnailCache, make_thumbnail
+
+# $5 is the -ss position, the last argument the output file. FAKE_FFMPEG_MODE picks how it behaves when
+# seeking past the start: 'ok', 'short' (writes nothing, like ffmpeg on a video shorter than the position),
+# 'fails' (leaves a partial file and exits with an error) or 'broken' (the same at every position)
+FAKE_FFMPEG = """#!/bin/sh
+for last; do :; done
+echo "$5" >> "$(dirname "$0")/positions"
+case "$FAKE_FFMPEG_MODE:$5" in
+    short:2) exit 0 ;;
+    fails:2|broken:*) echo partial > "$last"; exit 1 ;;
+esac
+echo "frame at $5" > "$last"
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "ffmpeg").write_text(FAKE_FFMPEG)
+    (bin_dir / "ffmpeg").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    def run(mode):
+        monkeypatch.setenv("FAKE_FFMPEG_MODE", mode)
+        (bin_dir / "positions").unlink(missing_ok=True)
+        destination = tmp_path / f"{mode}.jpg"
+        try:
+            make_thumbnail("video.mp4", str(destination), 160)
+        finally:
+            positions = (bin_dir / "positions").read_text().split()
+            assert not os.path.exists(f"{destination}.part")
+        return destination.read_text(), positions
+
+    return run
+
+
+def test_frame_at_the_thumbnail_position(fake_ffmpeg):
+    assert fake_ffmpeg("ok") == ("frame at 2\n", ["2"])
+
+
+@pytest.mark.parametrize("mode", ["short", "fails"])
+def test_falls_back_to_the_first_frame(fake_ffmpeg, mode):
+    assert fake_ffmpeg(mode) == ("frame at 0\n", ["2", "0"])
+
+
+def test_raises_only_after_both_positions_failed(fake_ffmpeg, tmp_path):
+    with pytest.raises(subprocess.CalledProcessError):
+        fake_ffmpeg("broken")
+    assert not (tmp_path / "broken.jpg").exists()
+
+
+def test_cache_makes_thumbnails_once(fake_ffmpeg, tmp_path):
+    video = tmp_path / "rain.mp4"
+    video.write_bytes(b"rain video")
+    with ThumbnailCache(str(tmp_path / "thumbnails"), hash_cache=HashCache(str(tmp_path / "hashes.sqlite"))) as thumbnails:
+        path = thumbnails.get(str(video), "small", wait=True)
+        assert path is not None and path.endswith("-small.jpg")
+        assert thumbnails.get(str(video), "small") == path
+    assert (tmp_path / "bin" / "positions").read_text().split() == ["2"]
@@ -0,0 +1,69 @@
+import os
+import time
+
+import pytest
+
+from watcher import LibraryWatcher, WatchEvent
+
+
+class Collector:
+    def __init__(self, watcher):
+        self.watcher = watcher
+        self.events = []
+
+    def wait_for(self, event, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            self.events += self.watcher.drain()
+            if event in self.events:
+                return True
+            time.sleep(0.01)
+        return False
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def watched(request, tmp_path):
+    root = tmp_path / "library"
+    root.mkdir()
+    (root / "rain").mkdir()
+    lists = tmp_path / "lists"
+    lists.mkdir()
+    favorites = lists / "favorites.txt"
+    favorites.write_text("rain\n")
+
+    watcher = LibraryWatcher(str(root), [str(favorites)], poll_interval=0.02, use_inotify=request.param == "inotify")
+    watcher.start()
+    if request.param == "inotify" and watcher.backend != "inotify":
+        watcher.stop()
+        pytest.skip("inotify is not available")
+    yield root, favorites, Collector(watcher)
+    watcher.stop()
+
+
+def test_folders_added_renamed_and_removed(watched):
+    root, _, events = watched
+    (root / "forest").mkdir()
+    assert events.wait_for(WatchEvent("added", "forest"))
+    os.rename(root / "forest", root / "deep-forest")
+    assert events.wait_for(WatchEvent("renamed", "forest", "deep-forest"))
+    os.rmdir(root / "rain")
+    assert events.wait_for(WatchEvent("removed", "rain"))
+    # Plain files are not wallpapers
+    (root / "notes.txt").write_text("")
+    assert not events.wait_for(WatchEvent("added", "notes.txt"), timeout=0.3)
+
+
+def test_files_written_into_a_new_folder_are_noticed(watched):
+    root, _, events = watched
+    (root / "forest").mkdir()
+    assert events.wait_for(WatchEvent("added", "forest"))
+    (root / "forest" / "config").write_text("[Info]\nWallpaperType=video\nVideoFileName=forest.mp4\n")
+    assert events.wait_for(WatchEvent("changed", "forest"))
+
+
+def test_list_files_replaced_by_other_programs(watched):
+    _, favorites, events = watched
+    replacement = favorites.with_name("favorites.txt.tmp")
+    replacement.write_text("rain\nforest\n")
+    os.replace(replacement, favorites)
+    assert events.wait_for(WatchEvent("list_changed", str(favorites)))
@@ -0,0 +1,279 @@
+"""Small, medium and large thumbnails of the wallpaper videos, made on demand and kept in a size-capped cache.
+
+Usage:
+    python thumbnails.py [--size medium] [--jobs 4] [--max-mb 512] [names ...]
+
+Thumbnails are stored by the contents of the video (the partial hash of dedup.py), so wallpapers with the
+same video share them and a modified video gets new ones. Hashes are cached by (size, mtime), so a video
+is only read again when it changes. When the cache grows over its cap, the least recently used thumbnails
+are deleted.
+"""
+import argparse
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from dedup import HashCache, partial_hash
+from library_index import KOMOREBI_WALLPAPER_DIRS_PATH, LibraryIndex
+
+# Thumbnail size -> width in pixels (the height keeps the aspect ratio)
+THUMBNAIL_WIDTHS = {"small": 160, "medium": 320, "large": 640}
+THUMBNAIL_SECONDS = 2
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def make_thumbnail(video_file_path, destination_path, width, seconds=THUMBNAIL_SECONDS):
+    """Saves a scaled frame of a video as a JPEG with ffmpeg. Runs in a worker thread.
+
+    -ss is given before -i so ffmpeg seeks instead of decoding every frame up to that point. Videos shorter
+    than `seconds` have no frame there (ffmpeg either writes nothing or fails), so the first frame is tried
+    next.
+
+    Raises:
+        subprocess.CalledProcessError: If neither position gave an image and ffmpeg failed at one of them.
+        OSError: If ffmpeg succeeded at both positions without making an image.
+    """
+    temp_path = destination_path + ".part"
+    returncode = 0
+    try:
+        for position in (seconds, 0):
+            # Don't take a file left by a failed attempt for a thumbnail
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            result = subprocess.run(
+                [
+                    "ffmpeg", "-y", "-loglevel", "error", "-ss", str(position), "-i", video_file_path,
+                    "-frames:v", "1", "-vf", f"scale={width}:-2", "-q:v", "4", "-f", "image2", temp_path,
+                ],
+                stdin=subprocess.DEVNULL,
+            )
+            if result.returncode == 0 and os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
+                os.replace(temp_path, destination_path)
+                return destination_path
+            returncode = result.returncode or returncode
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, "ffmpeg")
+    raise OSError(f"ffmpeg made no thumbnail of '{video_file_path}'")
+
+
+class ThumbnailCache:
+    """Thumbnails in a directory named by video contents and size (e.g., 3fa9...-small.jpg), made by ffmpeg processes
+    started from a thread pool.
+
+    get never waits for ffmpeg: a missing thumbnail is queued and get returns None until it is ready (or use
+    wait). Every get marks the thumbnail as used by touching its mtime, so the least recently used ones can be
+    evicted, even across processes.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=MAX_CACHE_BYTES, max_workers=None, hash_cache=None):
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data", "cache", "thumbnails")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_workers = max_workers
+        self.hash_cache = hash_cache if hash_cache is not None else HashCache()
+        self.executor = None
+        # file name -> size in bytes, least recently used first
+        self.files = OrderedDict()
+        self.total_bytes = 0
+        # file name -> Future of the thumbnails being made
+        self.pending = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        self.hash_cache.save()
+
+    def get(self, video_file_path, size="medium", wait=False):
+        """Gets the path of a thumbnail of a video, queueing it if it doesn't exist yet.
+
+        Args:
+            video_file_path (str): The path to the video.
+            size (str): 'small', 'medium' or 'large'.
+            wait (bool): Wait until the thumbnail is made instead of returning None.
+
+        Returns:
+            str: The path of the thumbnail, or None if it is being made (or the video can't be read).
+        """
+        path, future = self._request(video_file_path, size)
+        if future is None or not wait:
+            return path
+        try:
+            return future.result()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def fill(self, video_file_paths, sizes=("medium",), on_progress=None):
+        """Makes every missing thumbnail of the videos and waits for them.
+
+        Args:
+            on_progress (callable): Called with (done, total, video_file_path, error) after each thumbnail.
+
+        Returns:
+            int: The number of thumbnails made.
+        """
+        queued = []
+        queued_futures = set()
+        for video_file_path in video_file_paths:
+            for size in sizes:
+                path, future = self._request(video_file_path, size)
+                # Wallpapers with the same video share their thumbnails
+                if path is None and future not in queued_futures:
+                    queued.append((video_file_path, future))
+                    if future is not None:
+                        queued_futures.add(future)
+
+        made = 0
+        for done, (video_file_path, future) in enumerate(queued, start=1):
+            error = "video can't be read" if future is None else future.exception()
+            made += error is None
+            if on_progress is not None:
+                on_progress(done, len(queued), video_file_path, error)
+        self.hash_cache.save()
+        return made
+
+    # ----------------------------
+
+    def _request(self, video_file_path, size):
+        """Gets a thumbnail from the cache or queues it.
+
+        Returns:
+            tuple: (path, None) if the thumbnail is cached, (None, future) if it is being made, or (None, None)
+                if the video can't be read.
+        """
+        file_name = self._file_name(video_file_path, size)
+        if file_name is None:
+            return None, None
+        path = os.path.join(self.cache_dir, file_name)
+
+        with self._lock:
+            if file_name not in self.files:
+                future = self.pending.get(file_name)
+                if future is None:
+                    future = self.pending[file_name] = self._submit(video_file_path, path, size)
+                return None, future
+            self.files.move_to_end(file_name)
+        try:
+            os.utime(path)
+            return path, None
+        except FileNotFoundError:
+            # Evicted by another process, make it again
+            with self._lock:
+                self._forget(file_name)
+            return self._request(video_file_path, size)
+
+    def _file_name(self, video_file_path, size):
+        if size not in THUMBNAIL_WIDTHS:
+            raise ValueError(f"Unknown thumbnail size '{size}'")
+        try:
+            stat = os.stat(video_file_path)
+        except OSError:
+            return None
+        with self._lock:
+            digest = self.hash_cache.get(video_file_path, stat.st_size, stat.st_mtime_ns, "partial")
+        if digest is None:
+            try:
+                digest = partial_hash(video_file_path, stat.st_size)
+            except OSError:
+                return None
+            with self._lock:
+                self.hash_cache.put(video_file_path, stat.st_size, stat.st_mtime_ns, "partial", digest)
+        return f"{digest}-{size}.jpg"
+
+    def _submit(self, video_file_path, path, size):
+        # Called with the lock held
+        if self.executor is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Threads only wait for ffmpeg, and unlike a process pool they don't fork the daemon or the UI
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers or os.cpu_count() or 1)
+        future = self.executor.submit(make_thumbnail, video_file_path, path, THUMBNAIL_WIDTHS[size])
+        future.add_done_callback(lambda future: self._on_done(os.path.basename(path), future))
+        return future
+
+    def _on_done(self, file_name, future):
+        with self._lock:
+            self.pending.pop(file_name, None)
+            if future.exception() is not None:
+                return
+            try:
+                file_size = os.path.getsize(os.path.join(self.cache_dir, file_name))
+            except OSError:
+                return
+            self._forget(file_name)
+            self.files[file_name] = file_size
+            self.total_bytes += file_size
+            self._evict()
+
+    def _evict(self):
+        # Called with the lock held
+        while self.total_bytes > self.max_bytes and len(self.files) > 1:
+            file_name, file_size = self.files.popitem(last=False)
+            self.total_bytes -= file_size
+            try:
+                os.remove(os.path.join(self.cache_dir, file_name))
+            except FileNotFoundError:
+                pass
+
+    def _forget(self, file_name):
+        file_size = self.files.pop(file_name, None)
+        if file_size is not None:
+            self.total_bytes -= file_size
+
+    def _load(self):
+        try:
+            entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".jpg")]
+        except FileNotFoundError:
+            return
+        entries = [(entry.stat(), entry.name) for entry in entries]
+        for stat, file_name in sorted(entries, key=lambda entry: entry[0].st_mtime_ns):
+            self.files[file_name] = stat.st_size
+            self.total_bytes += stat.st_size
+        self._evict()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Make the missing thumbnails of the wallpaper videos.")
+    parser.add_argument("names", nargs="*", help="only these wallpapers (default: all)")
+    parser.add_argument("--size", choices=[*THUMBNAIL_WIDTHS, "all"], default="medium", help="thumbnail size")
+    parser.add_argument("--jobs", type=int, default=None, help="thumbnails made at the same time (default: number of CPUs)")
+    parser.add_argument("--max-mb", type=int, default=MAX_CACHE_BYTES // (1024 * 1024), help="size cap of the thumbnail cache")
+    parser.add_argument("--wallpaper-dir", default=KOMOREBI_WALLPAPER_DIRS_PATH, help="the Komorebi wallpaper directory")
+    args = parser.parse_args(argv)
+
+    library = LibraryIndex(args.wallpaper_dir)
+    library.load()
+    names = args.names or library.names
+    video_file_paths = [
+        os.path.join(library.root_path, name, library.get(name).video_file)
+        for name in names
+        if name in library and library.get(name).video_file != ""
+    ]
+    sizes = tuple(THUMBNAIL_WIDTHS) if args.size == "all" else (args.size,)
+
+    def print_progress(done, total, video_file_path, error):
+        if error is not None:
+            print(f"[WARNING] No thumbnail of '{video_file_path}': {error}")
+        elif done % 100 == 0 or done == total:
+            print(f"[THUMBNAILS] {done}/{total}")
+
+    with ThumbnailCache(max_bytes=args.max_mb * 1024 * 1024, max_workers=args.jobs) as thumbnails:
+        made = thumbnails.fill(video_file_paths, sizes, print_progress)
+        print(f"[THUMBNAILS] Made {made}, cache holds {len(thumbnails.files)} thumbnails ({thumbnails.total_bytes / (1024 * 1024):.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Timing of the stages of the hot paths (switching wallpapers, importing, searching, drawing), as spans.
+
+Tracing is off unless one of these environment variables is set:
+    KOMOREBI_TRACE=trace.jsonl    append every span to a JSON lines file
+    KOMOREBI_TRACE_SUMMARY=1      print the p50/p95 of each stage when the program exits
+
+Each line of the trace file is one finished span:
+    {"name": "refresh.reload_komorebi", "parent": "refresh_with_new", "start": 1718000000.123,
+     "duration_ms": 4.2, "pid": 1234, "thread": "MainThread"}
+
+Usage:
+    with span("search"):
+        ...
+
+    @traced("update_results")
+    def update_results(self): ...
+
+    python tracing.py trace.jsonl [--pid 1234] [--json]    per-stage p50/p95 of a trace file
+
+When tracing is off, span returns one shared object whose enter and exit do nothing, and traced returns
+the function unchanged, so the instrumentation costs (almost) nothing.
+"""
+import argparse
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+from latency import LatencyHistogram
+
+TRACE_PATH_VARIABLE = "KOMOREBI_TRACE"
+TRACE_SUMMARY_VARIABLE = "KOMOREBI_TRACE_SUMMARY"
+SUMMARY_PERCENTS = (50, 95)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "parent", "start_time", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        self.parent = stack[-1] if stack else None
+        stack.append(self.name)
+        self.start_time = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        self.tracer._stack().pop()
+        self.tracer.record(self.name, self.parent, self.start_time, seconds)
+        return False
+
+
+class Tracer:
+    """Records spans to a JSON lines file and/or per-stage histograms. Thread safe.
+
+    Spans nest per thread: a span started inside another has it as its parent.
+    """
+
+    def __init__(self, path=None, summary=False):
+        self.path = path
+        self.summary_enabled = summary
+        self.enabled = path is not None or summary
+        # stage name -> LatencyHistogram
+        self.histograms = {}
+        self._file = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @classmethod
+    def from_environment(cls, environ=None):
+        environ = os.environ if environ is None else environ
+        return cls(environ.get(TRACE_PATH_VARIABLE) or None, environ.get(TRACE_SUMMARY_VARIABLE, "") not in ("", "0"))
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def record(self, name, parent, start_time, seconds):
+        with self._lock:
+            if self.summary_enabled:
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    histogram = self.histograms[name] = LatencyHistogram()
+                histogram.record(seconds)
+            if self.path is not None:
+                if self._file is None:
+                    # Line buffered, so the trace is complete up to the last span even if the program is killed
+                    self._file = open(self.path, "a", buffering=1)
+                self._file.write(json.dumps({
+                    "name": name,
+                    "parent": parent,
+                    "start": round(start_time, 6),
+                    "duration_ms": round(seconds * 1000, 3),
+                    "pid": os.getpid(),
+                    "thread": threading.current_thread().name,
+                }) + "\n")
+
+    def summary(self):
+        """Gets the count, mean, max, p50 and p95 of each stage, in milliseconds (see LatencyHistogram.summary)."""
+        with self._lock:
+            return {name: histogram.summary(SUMMARY_PERCENTS) for name, histogram in sorted(self.histograms.items())}
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ----------------------------
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+
+def print_summary(summary, file=None):
+    file = file if file is not None else sys.stderr
+    if not summary:
+        print("[TRACE] No spans recorded", file=file)
+        return
+    width = max(len(name) for name in summary)
+    print(f"{'stage':<{width}} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}", file=file)
+    for name, stage in summary.items():
+        print(f"{name:<{width}} {stage['count']:>7} {stage['p50_ms']:>10.3f} {stage['p95_ms']:>10.3f} {stage['max_ms']:>10.3f}", file=file)
+
+
+def summarize_file(path, pid=None):
+    """Gets the per-stage summary of a trace file (see Tracer.summary), optionally only of one process."""
+    histograms = {}
+    with open(path, "r") as trace_file:
+        for line in trace_file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a killed process
+                continue
+            if pid is not None and record.get("pid") != pid:
+                continue
+            histogram = histograms.get(record["name"])
+            if histogram is None:
+                histogram = histograms[record["name"]] = LatencyHistogram()
+            histogram.record(record["duration_ms"] / 1000)
+    return {name: histogram.summary(SUMMARY_PERCENTS) for name, histogram in sorted(histograms.items())}
+
+
+tracer = Tracer.from_environment()
+
+
+def span(name):
+    """Times a stage: 'with span("refresh.set_wallpaper"): ...'."""
+    return tracer.span(name)
+
+
+def traced(name):
+    """Decorator that times every call of a function as a span. Decided when the function is defined."""
+    def decorate(function):
+        if not tracer.enabled:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _close_at_exit():
+    if tracer.summary_enabled:
+        print_summary(tracer.summary())
+    tracer.close()
+
+
+if tracer.enabled:
+    atexit.register(_close_at_exit)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the p50/p95 of each stage in a trace file.")
+    parser.add_argument("trace_file", help=f"a file written with {TRACE_PATH_VARIABLE} set")
+    parser.add_argument("--pid", type=int, default=None, help="only the spans of this process (one session)")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    summary = summarize_file(args.trace_file, args.pid)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
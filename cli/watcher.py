@@ -0,0 +1,275 @@
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import threading
+import time
+from collections import namedtuple
+
+# kind is 'added', 'removed', 'renamed' or 'changed' (name is a wallpaper folder, new_name is only set for 'renamed';
+# 'changed' means files in a folder added during the session were written, e.g., its config or video after a
+# mkdir), 'list_changed' (name is the path of the list file) or 'rescan' (changes were missed, reload everything)
+WatchEvent = namedtuple("WatchEvent", ["kind", "name", "new_name"], defaults=[None])
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+
+# Seconds a moved-out folder waits for its moved-in half before it counts as removed
+MOVE_PAIR_TIMEOUT = 0.1
+# Seconds a folder added during the session is watched for after the last write to it. Importers create the
+# folder first and then write the config and the video into it
+FOLDER_SETTLE_TIME = 60.0
+# Writes to the files of a watched folder. IN_MODIFY only keeps the watch alive during long copies
+FOLDER_EVENTS = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+
+class LibraryWatcher:
+    """Watches the wallpaper directory and the list files (favorites, history) for changes made by any program.
+
+    Changes are queued as WatchEvents and taken with drain(), so they can be applied to the in-memory
+    library and search index on the thread that owns them. Uses inotify where available and falls back
+    to polling the mtimes otherwise.
+
+    Only the wallpaper directory itself is watched, plus the folders added while watching until they settle
+    (see FOLDER_SETTLE_TIME), since a new folder is usually still empty when it is created.
+    """
+
+    def __init__(self, root_path, list_paths=(), poll_interval=1.0, use_inotify=True):
+        self.root_path = root_path
+        self.list_paths = [os.path.abspath(path) for path in list_paths]
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.events = queue.Queue()
+        self.backend = None
+        self._stop = threading.Event()
+        self._thread = None
+        # inotify watch descriptor -> [name of a folder added while watching, time of its last event]
+        self._folder_watches = {}
+
+    def start(self):
+        """Starts watching in a background thread."""
+        self._stop.clear()
+        inotify_fd = self._start_inotify() if self.use_inotify else None
+        if inotify_fd is not None:
+            self.backend = "inotify"
+            self._thread = threading.Thread(target=self._watch_inotify, args=(inotify_fd,), daemon=True)
+        else:
+            self.backend = "polling"
+            self._thread = threading.Thread(target=self._watch_polling, args=(self._snapshot(),), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def drain(self):
+        """Takes every event queued since the last call.
+
+        Returns:
+            list: The WatchEvents, oldest first.
+        """
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    # ----------------------------
+
+    def _start_inotify(self):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            return None
+        try:
+            libc = ctypes.CDLL(libc_name, use_errno=True)
+            inotify_fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if inotify_fd < 0:
+            return None
+
+        self._libc = libc
+        self._inotify_fd = inotify_fd
+        self._folder_watches = {}
+        self._watch_dirs = {}
+        root_wd = libc.inotify_add_watch(inotify_fd, os.fsencode(self.root_path), IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR)
+        if root_wd < 0:
+            os.close(inotify_fd)
+            return None
+        self._root_wd = root_wd
+        # List files are usually replaced rather than written in place, so their directories are watched
+        for list_dir in {os.path.dirname(path) for path in self.list_paths}:
+            wd = libc.inotify_add_watch(inotify_fd, os.fsencode(list_dir), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE)
+            if wd >= 0:
+                self._watch_dirs[wd] = list_dir
+        return inotify_fd
+
+    def _watch_inotify(self, inotify_fd):
+        # cookie -> name of a folder moved out of the wallpaper directory, waiting for the matching move in
+        moved_from = {}
+        try:
+            while not self._stop.is_set():
+                readable, _, _ = select.select([inotify_fd], [], [], MOVE_PAIR_TIMEOUT if moved_from else 0.5)
+                self._unwatch_settled_folders()
+                if not readable:
+                    # The folder was moved somewhere outside the wallpaper directory
+                    for name in moved_from.values():
+                        self.events.put(WatchEvent("removed", name))
+                    moved_from.clear()
+                    continue
+                try:
+                    data = os.read(inotify_fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                self._handle_inotify_events(data, moved_from)
+        finally:
+            os.close(inotify_fd)
+
+    def _handle_inotify_events(self, data, moved_from):
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = INOTIFY_EVENT_HEADER.unpack_from(data, offset)
+            offset += INOTIFY_EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                moved_from.clear()
+                self.events.put(WatchEvent("rescan", None))
+            elif wd == self._root_wd:
+                if not mask & IN_ISDIR:
+                    continue
+                if mask & IN_MOVED_FROM:
+                    moved_from[cookie] = name
+                elif mask & IN_MOVED_TO:
+                    old_name = moved_from.pop(cookie, None)
+                    if old_name is None:
+                        self._add_folder(name)
+                    else:
+                        for watch in self._folder_watches.values():
+                            if watch[0] == old_name:
+                                watch[0] = name
+                        self.events.put(WatchEvent("renamed", old_name, name))
+                elif mask & IN_CREATE:
+                    self._add_folder(name)
+                elif mask & IN_DELETE:
+                    self.events.put(WatchEvent("removed", name))
+            elif wd in self._folder_watches:
+                watch = self._folder_watches[wd]
+                if mask & IN_IGNORED:
+                    # The folder was deleted
+                    del self._folder_watches[wd]
+                else:
+                    watch[1] = time.monotonic()
+                    if not mask & IN_MODIFY:
+                        self.events.put(WatchEvent("changed", watch[0]))
+            elif wd in self._watch_dirs:
+                path = os.path.join(self._watch_dirs[wd], name)
+                if path in self.list_paths:
+                    self.events.put(WatchEvent("list_changed", path))
+
+    def _add_folder(self, name):
+        # Watched before the event is queued, so whatever is written after the folder is read gets noticed
+        wd = self._libc.inotify_add_watch(self._inotify_fd, os.fsencode(os.path.join(self.root_path, name)), FOLDER_EVENTS | IN_ONLYDIR)
+        if wd >= 0:
+            self._folder_watches[wd] = [name, time.monotonic()]
+        self.events.put(WatchEvent("added", name))
+
+    def _unwatch_settled_folders(self):
+        now = time.monotonic()
+        for wd, (name, last_event_time) in list(self._folder_watches.items()):
+            if now - last_event_time > FOLDER_SETTLE_TIME:
+                del self._folder_watches[wd]
+                self._libc.inotify_rm_watch(self._inotify_fd, wd)
+
+    def _snapshot(self):
+        return self._root_mtime(), self._list_folders(), {path: self._stat_key(path) for path in self.list_paths}
+
+    def _watch_polling(self, snapshot):
+        root_mtime, folders, list_keys = snapshot
+        # name of a folder added while watching -> [its mtime, time it last changed]
+        added_folders = {}
+        while not self._stop.wait(self.poll_interval):
+            mtime = self._root_mtime()
+            if mtime != root_mtime:
+                root_mtime = mtime
+                new_folders = self._list_folders()
+                self._put_folder_changes(folders, new_folders, added_folders)
+                folders = new_folders
+            self._put_added_folder_changes(added_folders)
+
+            for path in self.list_paths:
+                key = self._stat_key(path)
+                if key != list_keys[path]:
+                    list_keys[path] = key
+                    self.events.put(WatchEvent("list_changed", path))
+
+    def _put_folder_changes(self, old_folders, new_folders, added_folders):
+        # A folder that kept its inode but changed its name was renamed
+        for inode, name in old_folders.items():
+            new_name = new_folders.get(inode)
+            if new_name is None:
+                added_folders.pop(name, None)
+                self.events.put(WatchEvent("removed", name))
+            elif new_name != name:
+                if name in added_folders:
+                    added_folders[new_name] = added_folders.pop(name)
+                self.events.put(WatchEvent("renamed", name, new_name))
+        for inode, name in new_folders.items():
+            if inode not in old_folders:
+                added_folders[name] = [self._folder_mtime(name), time.monotonic()]
+                self.events.put(WatchEvent("added", name))
+
+    def _put_added_folder_changes(self, added_folders):
+        # Creating or replacing a file in a folder changes the folder's mtime
+        now = time.monotonic()
+        for name, folder in list(added_folders.items()):
+            mtime = self._folder_mtime(name)
+            if mtime != folder[0]:
+                added_folders[name] = [mtime, now]
+                self.events.put(WatchEvent("changed", name))
+            elif now - folder[1] > FOLDER_SETTLE_TIME:
+                del added_folders[name]
+
+    def _folder_mtime(self, name):
+        try:
+            return os.stat(os.path.join(self.root_path, name)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _list_folders(self):
+        try:
+            with os.scandir(self.root_path) as entries:
+                return {entry.inode(): entry.name for entry in entries if entry.is_dir()}
+        except OSError:
+            return {}
+
+    def _root_mtime(self):
+        try:
+            return os.stat(self.root_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _stat_key(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
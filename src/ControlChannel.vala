@@ -0,0 +1,81 @@
+using GLib;
+
+using Komorebi.OnScreen;
+using Komorebi.Utilities;
+
+namespace Komorebi {
+
+	/* Listens on a Unix socket for commands from the CLI, one command per line.
+	   The socket lives next to the config file and is named after it (.Komorebi{N}.prop -> .Komorebi{N}.sock),
+	   the same way cli/control.py finds it (the CLI runs as root, so it can't rely on $HOME)
+
+	   Commands:
+	     ping    replies "ready" once the background window is shown
+	     reload  re-reads the .prop file and swaps the wallpaper in place, replies "ok <name>" */
+	public class ControlChannel : Object {
+
+		string socketPath;
+		SocketService service;
+		int monitorIndex;
+
+		public ControlChannel (int monitorIndex) {
+
+			this.monitorIndex = monitorIndex;
+			socketPath = controlSocketPath(configFilePath);
+
+			// Remove the socket left behind by a previous instance
+			FileUtils.unlink(socketPath);
+
+			service = new SocketService();
+
+			try {
+				service.add_address(new UnixSocketAddress(socketPath), SocketType.STREAM, SocketProtocol.DEFAULT, null, null);
+			} catch (Error e) {
+				print(@"[ERROR]: could not open control socket $socketPath: $(e.message)\n");
+				return;
+			}
+
+			service.incoming.connect(onIncoming);
+			service.start();
+		}
+
+		/* Gets the path of the control socket of the instance that reads a config file */
+		public static string controlSocketPath (string propFilePath) {
+
+			var stem = propFilePath.has_suffix(".prop") ? propFilePath.substring(0, propFilePath.length - ".prop".length) : propFilePath;
+			return stem + ".sock";
+		}
+
+		bool onIncoming (SocketConnection connection, Object? sourceObject) {
+
+			var input = new DataInputStream(connection.input_stream);
+			var output = new DataOutputStream(connection.output_stream);
+
+			try {
+				var command = input.read_line(null);
+				var reply = handleCommand(command == null ? "" : command.strip());
+				output.put_string(reply + "\n");
+				connection.close();
+			} catch (Error e) {
+				print(@"[ERROR]: control socket: $(e.message)\n");
+			}
+
+			return true;
+		}
+
+		string handleCommand (string command) {
+
+			if(command == "ping")
+				return "ready";
+
+			if(command == "reload") {
+				readConfigurationFile(monitorIndex);
+				readWallpaperFile();
+				backgroundWindows[monitorIndex].reloadWallpaper();
+				return @"ok $wallpaperName";
+			}
+
+			return @"error unknown command '$command'";
+		}
+	}
+}
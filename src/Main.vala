@@ -4,6 +4,7 @@ using Komorebi.Utilities;
 namespace Komorebi {
 
     BackgroundWindow[] backgroundWindows;
+    ControlChannel controlChannel;
     public static int monitorCount;
     public static int targetMonitor;
 
@@ -59,6 +60,9 @@ public static void main (string [] args) {
         }
     }
 
+    // Lets the CLI switch the wallpaper of this instance without restarting it
+    controlChannel = new ControlChannel(targetMonitor);
+
     Clutter.main();
 }
 }
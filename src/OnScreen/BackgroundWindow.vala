@@ -107,38 +107,58 @@ namespace Komorebi.OnScreen {
 
 			// Don't get duration constant until the video is started (in initializeConfigFile())
 			initializeConfigFile(); 
-			if (wallpaperType == "video") {
-
-				// [UPDATE] Switch to listening for eos signal (end of stream)
-				videoPlayback.eos.connect(() => {
-					// This code block will be executed when the "eos" signal is emitted
-					// Set the playback progress to the beginning and restart playback
-					videoPlayback.set_playing(false);
-					videoPlayback.set_progress(0.35);
-					videoPlayback.set_playing(true);
-				});
-
-				// [UPDATE] Connect a callback function to the "error" signal
-				videoPlayback.error.connect((error) => {
-					// This code block will be executed when the "error" signal is emitted
-					stdout.printf("\nError occurred:\n");
-					// Flush and recreate the Playback object
-					//  videoPlayback = null;
-					//  videoPlayback = new ClutterGst.Playback();
-					//  var videoPath = @"file:///System/Resources/Komorebi/$wallpaperName/$videoFileName";
-					//  videoPlayback.uri = videoPath;
-					//  videoPlayback.set_audio_volume(0.0);
-					//  videoContent.player = videoPlayback;
-					videoPlayback.set_playing(false);
-					videoPlayback.set_progress(0.05);
-					videoPlayback.set_playing(true);
-
-					// Prettify and log the properties of the Error object
-					stdout.printf("Message: %s\n", error.message);
-					stdout.printf("Domain: %" + uint32.FORMAT + "\n", error.domain);
-					stdout.printf("Code: %d\n", error.code);
-				});
+
+			// Connected whatever the first wallpaper is, since reloadWallpaper can switch to a video later
+			// [UPDATE] Switch to listening for eos signal (end of stream)
+			videoPlayback.eos.connect(() => {
+				// This code block will be executed when the "eos" signal is emitted
+				// Set the playback progress to the beginning and restart playback
+				videoPlayback.set_playing(false);
+				videoPlayback.set_progress(0.35);
+				videoPlayback.set_playing(true);
+			});
+
+			// [UPDATE] Connect a callback function to the "error" signal
+			videoPlayback.error.connect((error) => {
+				// This code block will be executed when the "error" signal is emitted
+				stdout.printf("\nError occurred:\n");
+				// Flush and recreate the Playback object
+				//  videoPlayback = null;
+				//  videoPlayback = new ClutterGst.Playback();
+				//  var videoPath = @"file:///System/Resources/Komorebi/$wallpaperName/$videoFileName";
+				//  videoPlayback.uri = videoPath;
+				//  videoPlayback.set_audio_volume(0.0);
+				//  videoContent.player = videoPlayback;
+				videoPlayback.set_playing(false);
+				videoPlayback.set_progress(0.05);
+				videoPlayback.set_playing(true);
+
+				// Prettify and log the properties of the Error object
+				stdout.printf("Message: %s\n", error.message);
+				stdout.printf("Domain: %" + uint32.FORMAT + "\n", error.domain);
+				stdout.printf("Code: %d\n", error.code);
+			});
+		}
+
+		/* Applies the wallpaper that was just read from the config files without recreating the window.
+		   The existing ClutterGst.Playback is reused, only its uri changes. The wallpaper type may change too:
+		   setWallpaper creates or detaches the web view as needed */
+		public void reloadWallpaper () {
+
+			videoPlayback.playing = false;
+
+			if(dateTimeVisible && dateTimeBox == null) {
+				dateTimeBox = new DateTimeBox(this);
+				mainActor.add_child(dateTimeBox);
+			} else if(!dateTimeVisible && dateTimeBox != null) {
+				// Stop its clock and drop it, so a later reload that shows the date and time again starts from a new one
+				if(dateTimeBox.timeout > 0)
+					Source.remove(dateTimeBox.timeout);
+				mainActor.remove_child(dateTimeBox);
+				dateTimeBox = null;
 			}
+
+			initializeConfigFile();
 		}
 
 		void getMonitorSize(int monitorIndex) {
@@ -194,6 +214,10 @@ namespace Komorebi.OnScreen {
 			}
 
 				
+				// Only web page wallpapers show the web view (it would cover a video or an image)
+				if(wallpaperType != "web_page")
+					hideWebView();
+
 				if(wallpaperType == "video") {
 
 					var videoPath = @"file:///System/Resources/Komorebi/$wallpaperName/$videoFileName";
@@ -217,16 +241,9 @@ namespace Komorebi.OnScreen {
 				wallpaperActor.set_content(null);
 				wallpaperPixbuf = null;
 
-				if(webViewActor.get_parent() != wallpaperActor)
-					wallpaperActor.add_child(webViewActor);
+				showWebView();
 
 				return;
-
-			} else {
-
-				// remove webViewActor
-				if(webViewActor.get_parent() == wallpaperActor)
-					wallpaperActor.remove_child(webViewActor);
 			}
 
 			wallpaperActor.set_content(wallpaperImage);
@@ -239,6 +256,29 @@ namespace Komorebi.OnScreen {
 							 wallpaperPixbuf.get_rowstride());
 		}
 
+		/* Creates the web view actor if the first wallpaper wasn't a web page, and shows it if it was hidden */
+		void showWebView() {
+
+			if(webViewActor == null) {
+				webViewActor = new GtkClutter.Actor.with_contents(webView);
+				webViewActor.set_size(screenWidth, screenHeight);
+			}
+
+			if(webViewActor.get_parent() == null)
+				wallpaperActor.add_child(webViewActor);
+		}
+
+		/* Detaches the web view actor from wherever it was added (the stage or the wallpaper actor) */
+		void hideWebView() {
+
+			if(webViewActor == null)
+				return;
+
+			var parent = webViewActor.get_parent();
+			if(parent != null)
+				parent.remove_child(webViewActor);
+		}
+
 		// loads a web page from a URL
 		public void wallpaperFromUrl(owned string url) {
 